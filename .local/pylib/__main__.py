@@ -2,9 +2,6 @@ from __future__ import annotations
 
 import sys
 
-from .addhost_app import run_addhost
-from .vmsmenu_app import run_vmsmenu
-
 
 # TODO: refactor return codes and error handling? last_msg pattern is awkward - use PromptResult?
 def main(argv: list[str] | None = None) -> int:
@@ -13,22 +10,45 @@ def main(argv: list[str] | None = None) -> int:
     cmd = argv[0] if argv else "help"
     rest = argv[1:] if argv else []
 
+    # the whole command is one span when VMSMENU_TRACE is set, the stages inside it nest under it
+    from .tracing import span
+    with span(f"pylib {cmd}", "command"):
+        return _dispatch(cmd, rest)
+
+
+def _dispatch(cmd: str, rest: list[str]) -> int:
     if cmd in {"-h", "--help", "help"}:
         print("Usage:")
         print("  vmsmenu [--help]")
+        print("  vmsmenu [--ssh|--telnet] [--wait] [-l user] <alias-or-nickname>")
+        print("  vmsmenu --push [--sftp] [-l user] [-j JOBS] [--retries N] <group> <local-path>... <remote-path>")
         print("  addhost [--help]")
+        print("  probe --export <file.prom> [--interval SECONDS] [-j JOBS] [--timeout SECONDS]")
+        print("  find [--ssh|--telnet] <ip|cidr|hostname|port|algorithm>")
         print()
         print("Commands:")
         print("  vmsmenu   Interactive menu to connect to hosts via SSH or Telnet")
         print("  addhost   Interactive editor to add/edit host entries for SSH/Telnet")
+        print("  startup-report [--top N]   Import-time report per command, checked against the startup budget")
+        print("  memory-report [--hosts N]  Memory held per host by the host tree, menu and parsed entries")
+        print("  benchmark [--sizes N,...] [--save FILE] [--compare FILE] [--threshold PERCENT]")
+        print("            Times parsing, lookups, grouping, edits and menu drawing on synthetic configs")
+        print("            (10 to 100k hosts); --compare flags regressions against a saved JSON baseline")
+        print("  probe     Probe every SSH/Telnet host's port and write up/down and connect time gauges")
+        print("            for the node-exporter textfile collector; repeats every --interval seconds")
+        print("  find      Which aliases (and clusters) an IP, CIDR range, hostname, port or algorithm belongs to;")
+        print("            the vmsmenu main menu searches the same way with /")
+        print("  trace-summary [--last N] [--clear] [file]")
+        print("            Per-stage time (parse, render, resolve, probe, spawn) from spans recorded with")
+        print("            VMSMENU_TRACE=1 (to ~/.local/state/vmsmenu/trace.json) or VMSMENU_TRACE=<file>;")
+        print("            the file also opens in chrome://tracing or Perfetto")
         print()
         print("Config files:")
         print("  SSH:    ~/.ssh/config")
         print("  Telnet: ~/.telnet/config")
         print()
         print("Notes:")
-        print("  - Both commands are interactive.")
-        print("  - Extra CLI args are ignored (except --help / -h).")
+        print("  - Both commands are interactive unless vmsmenu is given a host.")
         print("  - Hosts can be grouped as 'group.NICKNAME' (e.g. l2.IA21).")
         print("  - Set NO_COLOR=1 to disable ANSI colors.")
         return 0
@@ -36,51 +56,185 @@ def main(argv: list[str] | None = None) -> int:
     if cmd == "vmsmenu" and any(a in {"-h", "--help"} for a in rest):
         print("Usage:")
         print("  vmsmenu")
+        print("  vmsmenu [--ssh|--telnet] [--wait] [-l user] <alias-or-nickname>")
         print("  vmsmenu --help")
         print()
         print("What it does:")
-        print("  - Prompts for SSH vs Telnet")
-        print("  - Reads hosts from ~/.ssh/config or ~/.telnet/config")
+        print("  - Prompts for SSH, Telnet or All (both, each host tagged with its transport)")
+        print("  - Reads hosts from ~/.ssh/config and/or ~/.telnet/config (Include files are followed)")
         print("  - Lets you pick a host (or group) and launches ssh/telnet")
+        print("  - Given a host alias or nickname, connects to it directly without menus")
         print()
         print("Controls:")
         print("  - Enter a number to select")
+        print("  - Enter R1, R2, ... to pick from the recent and frequent hosts")
         print("  - E to exit, B to go back (in group menus)")
+        print("  - On a terminal: arrows/PgUp/PgDn move, Enter selects, numbers pick without Enter")
+        print("    (set VMSMENU_LINE_INPUT=1 to type selections line by line instead)")
+        print()
+        print("Direct connect:")
+        print("  --ssh / --telnet   Only look in that config (default: SSH, then Telnet)")
+        print("  -l user            Log in as user instead of the host's User (SSH only)")
+        print("  -w, --wait         Wait until the host is up (e.g. rebooting), then connect")
+        print()
+        print("Waiting for a host:")
+        print("  - When a host times out or refuses the connection, you are asked whether to wait for it.")
+        print("  - It is then probed with growing pauses (2s up to 30s) and connected as soon as the port")
+        print("    answers. Any key cancels.")
+        print()
+        print("Resident server (optional):")
+        print("  --serve            Keep configs and DNS lookups warm for direct connects")
+        print("  --server-status    Show whether the server is running")
+        print("  --stop-server      Stop a running server")
+        print("  While it runs, `vmsmenu <host>` is answered by the server without starting python.")
+        print()
+        print("Pushing files to a group:")
+        print("  --push GROUP LOCAL... REMOTE   Copy files/directories to every SSH host in GROUP (and its")
+        print("                                 subgroups), JOBS (8) at a time, each retried up to N (2) times")
+        print("  --sftp             Use sftp instead of scp")
+        print("  Transfers run in batch mode, so hosts need a key or an open ControlMaster connection")
+        print("  (ssh's own ControlMaster/ControlPath settings are used).")
         print()
         print("Notes:")
-        print("  - Interactive; ignores other CLI arguments.")
         print("  - Set NO_COLOR=1 to disable ANSI colors.")
         return 0
 
     if cmd == "addhost" and any(a in {"-h", "--help"} for a in rest):
         print("Usage:")
         print("  addhost")
+        print("  addhost import [--ssh|--telnet] [--replace] [--dry-run] [--yes] <file>")
+        print("  addhost export [--ssh|--telnet] [--group G] [--format jsonl|csv] [-o FILE]")
+        print("  addhost lint [--ssh|--telnet] [--fix] [--yes]")
+        print("  addhost discover [--group G] [--concurrency N] [--rate PER_SEC] [--timeout SEC] [--yes] <cidr> [ports]")
+        print("  addhost history [--ssh|--telnet] [-n COUNT]")
+        print("  addhost diff [--ssh|--telnet] [FROM [TO]]")
+        print("  addhost undo [--ssh|--telnet] [VERSION]")
+        print("  addhost shard|unshard [--ssh|--telnet] [--yes]")
         print("  addhost --help")
         print()
         print("What it does:")
         print("  - Prompts for SSH vs Telnet")
         print("  - Adds/edits Host entries in ~/.ssh/config or ~/.telnet/config")
         print("  - Supports grouped aliases as 'group.nickname' (e.g. l2.IA21)")
+        print("  - An SSH host can keep its login User, vmsmenu then connects without asking")
+        print()
+        print("Subcommands:")
+        print("  import   Bulk add hosts from CSV (with a header row) or JSON-lines, columns:")
+        print("           transport, group, nickname, hostname, port, user, hostkey_algorithms, kex_algorithms, macs")
+        print("           Shows what would change, then writes each config in one atomic rewrite.")
+        print("  export   Stream every host as JSON-lines (default) or CSV to stdout or FILE,")
+        print("           optionally only one transport or one group (and its subgroups).")
+        print("  lint     Report duplicate Host blocks, blocks without a Hostname, nicknames")
+        print("           shared across groups and aliases sharing a hostname:port.")
+        print("           Included files (config.d shards too) are checked along with the config.")
+        print("           --fix removes empty duplicate or hostname-less blocks, one atomic rewrite per file.")
+        print("  discover Scan a subnet (default ports 22,23, at most a /20) for SSH banners and telnet")
+        print("           greetings, skip addresses already configured and offer the rest as new hosts.")
+        print("           Connections are capped by --concurrency (256) and --rate per second (500).")
+        print("  history  List the recorded versions of a config (SSH unless --telnet).")
+        print("           Every write made by addhost/import/lint is snapshotted first.")
+        print("  diff     Show the changes between two versions (default: the last change).")
+        print("  undo     Restore the version before the current one, or VERSION, atomically.")
+        print("           An undo is recorded too, so it can be undone again.")
+        print("           --group G works on the file of group G in a sharded config.")
+        print("  shard    Move each top-level group into its own config.d/<group>.conf, pulled in")
+        print("           with an Include line; saves then only rewrite the file of the host's group.")
+        print("  unshard  Merge the config.d files back into the single config file.")
         print()
         print("Notes:")
-        print("  - Interactive; ignores other CLI arguments.")
+        print("  - Without a subcommand it is interactive and ignores other CLI arguments.")
         print("  - Set NO_COLOR=1 to disable ANSI colors.")
         return 0
 
+    # subcommand modules are imported on demand so the direct connect path only loads what it needs
+    if cmd == "vmsmenu" and rest and rest[0] in {"--serve", "--server-status", "--stop-server"}:
+        from .menu_server import run_menu_server
+        return run_menu_server(rest[0])
+
+    if cmd == "vmsmenu" and rest and rest[0] == "--push":
+        from .file_push import run_push
+        return run_push(rest[1:])
+
+    if cmd == "vmsmenu" and rest:
+        from .direct_connect import run_direct_connect
+        try:
+            return run_direct_connect(rest)
+        except KeyboardInterrupt:
+            print()
+            return 130
+
     if cmd == "vmsmenu":
+        from .vmsmenu_app import run_vmsmenu
         try:
             return run_vmsmenu()
         except KeyboardInterrupt:
             print()
             return 0
 
+    if cmd == "addhost" and rest and rest[0] == "import":
+        from .addhost_import import run_import
+        try:
+            return run_import(rest[1:])
+        except KeyboardInterrupt:
+            print()
+            return 130
+
+    if cmd == "addhost" and rest and rest[0] == "export":
+        from .addhost_export import run_export
+        return run_export(rest[1:])
+
+    if cmd == "addhost" and rest and rest[0] == "lint":
+        from .config_lint import run_lint
+        return run_lint(rest[1:])
+
+    if cmd == "addhost" and rest and rest[0] == "discover":
+        from .addhost_discover import run_discover
+        try:
+            return run_discover(rest[1:])
+        except KeyboardInterrupt:
+            print()
+            return 130
+
+    if cmd == "addhost" and rest and rest[0] in {"history", "diff", "undo"}:
+        from .config_history import run_history
+        return run_history(rest[0], rest[1:])
+
+    if cmd == "addhost" and rest and rest[0] in {"shard", "unshard"}:
+        from .config_shards import run_shard
+        return run_shard(rest[0], rest[1:])
+
     if cmd == "addhost":
+        from .addhost_app import run_addhost
         try:
             return run_addhost()
         except KeyboardInterrupt:
             print()
             return 0
 
+    if cmd == "startup-report":
+        from .startup_report import run_startup_report
+        return run_startup_report(rest)
+
+    if cmd == "memory-report":
+        from .memory_report import run_memory_report
+        return run_memory_report(rest)
+
+    if cmd == "trace-summary":
+        from .trace_summary import run_trace_summary
+        return run_trace_summary(rest)
+
+    if cmd == "benchmark":
+        from .benchmark import run_benchmark
+        return run_benchmark(rest)
+
+    if cmd == "find":
+        from .host_index import run_find
+        return run_find(rest)
+
+    if cmd == "probe":
+        from .host_probe import run_probe
+        return run_probe(rest)
+
     print(f"Unknown command: {cmd}")
     print("Try: vmsmenu --help or addhost --help")
     return 2
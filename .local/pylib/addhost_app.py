@@ -4,17 +4,20 @@ from .ansi import Ansi, clear_screen
 from .prompting import prompt_yes_no
 from .types import PromptCancel, PromptInvalid, PromptOk, HostEntry
 from .menu_utils import add_or_list_menu, format_host_display, setup_menu
+from .host_checks import HostChecker
 from .config_utils import (
+    build_host_tree,
     load_host_aliases,
     read_host_values, 
     remove_host_entry, 
     upsert_host_entry, 
-    host_entry_exists,
+    host_block_file,
 )
 from .addhost_prompts import (
     prompt_nickname, 
     prompt_hostname, 
     prompt_port, 
+    prompt_user,
     prompt_alias_change, 
     prompt_configure_algorithms,
 )
@@ -22,6 +25,7 @@ from .addhost_prompts import (
 
 def run_addhost() -> int:
     last_msg = [""]
+    checker = HostChecker()
 
     while True:
         menu_vars = setup_menu()
@@ -46,10 +50,14 @@ def run_addhost() -> int:
             print(f"{Ansi.RED}{last_msg[0]}{Ansi.RESET}\n")
             last_msg[0] = ""
 
+        check_lines = checker.drain()
+        if check_lines:
+            print("\n".join(check_lines) + "\n")
+
         host_alias: str = edit_host or ""
         if not host_alias:
             aliases = load_host_aliases(transport.config_file)
-            nickname_result = prompt_nickname(aliases, last_msg)
+            nickname_result = prompt_nickname(build_host_tree(aliases), last_msg)
             match nickname_result:
                 case PromptCancel():
                     clear_screen()
@@ -66,13 +74,17 @@ def run_addhost() -> int:
         hostkey = ""
         kex = ""
         macs = ""
+        user = ""
 
-        if host_alias and host_entry_exists(host_alias, transport.config_file):
+        # a host defined in an included file is edited there, a second block in the main config
+        # would be ignored by ssh in favour of the first
+        block_file = host_block_file(host_alias, transport.config_file) if host_alias else None
+        if block_file is not None:
             is_editing = True
             original_alias = host_alias
 
         if is_editing:
-            hostname, port, hostkey, kex, macs = read_host_values(original_alias, transport.config_file)
+            hostname, port, hostkey, kex, macs, user = read_host_values(original_alias, transport.config_file)
             while True:
                 updated_result = prompt_alias_change(original_alias, last_msg)
                 match updated_result:
@@ -120,6 +132,21 @@ def run_addhost() -> int:
             continue
 
         if transport.key == "ssh":
+            while True:
+                user_result = prompt_user(user, last_msg)
+                match user_result:
+                    case PromptOk(value=user):
+                        break
+                    case PromptCancel():
+                        break
+                    case PromptInvalid():
+                        if last_msg[0]:
+                            print(f"{Ansi.RED}{last_msg[0]}{Ansi.RESET}\n")
+                            last_msg[0] = ""
+                        continue
+            if isinstance(user_result, PromptCancel):
+                continue
+
             while True:
                 algo_result = prompt_configure_algorithms(host_alias, hostname, port, hostkey, kex, macs, last_msg)
                 match algo_result:
@@ -135,17 +162,21 @@ def run_addhost() -> int:
             if isinstance(algo_result, PromptCancel):
                 continue
 
+        target_file = transport.config_file
         if is_editing and host_alias != original_alias:
-            remove_host_entry(original_alias, transport.config_file)
+            remove_host_entry(original_alias, block_file)
+        elif is_editing:
+            target_file = block_file
 
         entry = HostEntry(alias=host_alias, hostname=hostname, port=port, 
-                          hostkey_algorithms=hostkey, kex_algorithms=kex, macs=macs)
-        upsert_host_entry(entry, transport.config_file)
+                          hostkey_algorithms=hostkey, kex_algorithms=kex, macs=macs, user=user)
+        upsert_host_entry(entry, target_file)
+        checker.submit(transport.key, entry)
 
         print(
             f"Saved host {format_host_display(host_alias)} ("
             f"{Ansi.GREEN}{hostname}{Ansi.RESET}:{Ansi.MAGENTA}{port}{Ansi.RESET}) "
-            f"to {Ansi.MAGENTA}{transport.config_file}{Ansi.RESET}"
+            f"to {Ansi.MAGENTA}{target_file}{Ansi.RESET}"
         )
 
         if not prompt_yes_no("Add or edit another host?"):
@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import asyncio
+import ipaddress
+import socket
+import time
+from dataclasses import dataclass
+
+from .addhost_import import TransportPlan, plan_entry, validate_record
+from .ansi import Ansi
+from .config_paths import ensure_config_file, ssh_config, telnet_config
+from .config_utils import build_host_tree, iter_host_entries, split_alias, write_host_entries
+from .ident import normalize_identifier
+from .menu_utils import format_host_display
+from .prompting import prompt_text, prompt_yes_no
+
+
+_DEFAULT_PORTS = "22,23"
+_DEFAULT_CONCURRENCY = 256
+_DEFAULT_RATE = 500.0
+_DEFAULT_TIMEOUT = 1.5
+
+# a /20, larger ranges have to be split up on purpose
+_MAX_ADDRESSES = 4096
+
+_BANNER_MAX_BYTES = 512
+_TELNET_IAC = 0xFF
+
+DISCOVER_USAGE = (
+    "Usage: addhost discover [--group G] [--concurrency N] [--rate PER_SEC] [--timeout SEC] [--yes] "
+    "<cidr> [ports]"
+)
+
+
+@dataclass(frozen=True)
+class Candidate:
+    address: str
+    port: int
+    transport_key: str
+    banner: str
+
+
+class _RateLimiter:
+    """Spaces connection attempts evenly so a scan never exceeds rate per second."""
+
+    def __init__(self, rate: float) -> None:
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_slot = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        async with self.lock:
+            now = time.monotonic()
+            delay = self.next_slot - now
+            self.next_slot = max(now, self.next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+# printable text of a telnet greeting with the option negotiation (IAC sequences) removed
+def _telnet_text(data: bytes) -> str:
+    out = bytearray()
+    i = 0
+    while i < len(data):
+        if data[i] == _TELNET_IAC and i + 1 < len(data):
+            i += 3 if 251 <= data[i + 1] <= 254 else 2
+            continue
+        out.append(data[i])
+        i += 1
+    return " ".join(out.decode("ascii", errors="ignore").split())
+
+
+def classify(port: int, data: bytes) -> tuple[str, str]:
+    text = data.split(b"\n", 1)[0].decode("ascii", errors="replace").strip()
+    if text.startswith("SSH-"):
+        return "ssh", text
+    if data[:1] == bytes([_TELNET_IAC]) or port != 22:
+        return "telnet", _telnet_text(data)
+    return "ssh", text
+
+
+async def _probe(address: str, port: int, *, timeout: float,
+                 limiter: _RateLimiter, slots: asyncio.Semaphore) -> Candidate | None:
+    async with slots:
+        await limiter.wait()
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(address, port), timeout)
+        except (OSError, asyncio.TimeoutError):
+            return None
+        try:
+            data = await asyncio.wait_for(reader.read(_BANNER_MAX_BYTES), timeout)
+        except (OSError, asyncio.TimeoutError):
+            data = b""
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+    transport_key, banner = classify(port, data)
+    return Candidate(address=address, port=port, transport_key=transport_key, banner=banner)
+
+
+async def scan(addresses: list[str], ports: list[int], *, concurrency: int = _DEFAULT_CONCURRENCY,
+               rate: float = _DEFAULT_RATE, timeout: float = _DEFAULT_TIMEOUT) -> list[Candidate]:
+    limiter = _RateLimiter(rate)
+    slots = asyncio.Semaphore(concurrency)
+    tasks = [_probe(a, p, timeout=timeout, limiter=limiter, slots=slots) for a in addresses for p in ports]
+    return [c for c in await asyncio.gather(*tasks) if c is not None]
+
+
+async def _reverse_names(addresses: list[str], timeout: float) -> dict[str, str]:
+    loop = asyncio.get_running_loop()
+
+    async def _one(address: str) -> str:
+        try:
+            host, _ = await asyncio.wait_for(loop.run_in_executor(None, socket.getnameinfo, (address, 0), 0), timeout)
+        except (OSError, asyncio.TimeoutError):
+            return ""
+        return "" if host == address else host
+
+    names = await asyncio.gather(*(_one(a) for a in addresses))
+    return dict(zip(addresses, names))
+
+
+# addresses each configured hostname resolves to, bounded like the scan itself; a name that does not
+# resolve in time maps to no address
+async def _resolve_hostnames(hostnames: list[str], *, concurrency: int, timeout: float) -> dict[str, list[str]]:
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(concurrency)
+
+    async def _one(hostname: str) -> list[str]:
+        async with slots:
+            try:
+                infos = await asyncio.wait_for(
+                    loop.run_in_executor(None, socket.getaddrinfo, hostname, None, 0, socket.SOCK_STREAM), timeout)
+            except (OSError, UnicodeError, asyncio.TimeoutError):
+                return []
+        return sorted({str(info[4][0]) for info in infos})
+
+    addresses = await asyncio.gather(*(_one(h) for h in hostnames))
+    return dict(zip(hostnames, addresses))
+
+
+def _ip_literal(hostname: str) -> str:
+    try:
+        return str(ipaddress.ip_address(hostname))
+    except ValueError:
+        return ""
+
+
+# first label of the reverse DNS name, or H plus the last two octets (10.1.2.5 -> H2005)
+def propose_nickname(address: str, dns_name: str) -> str:
+    nick = normalize_identifier(dns_name.split(".", 1)[0], case_mode="upper")
+    if nick.ok:
+        return nick.value
+    octets = address.split(".")
+    if len(octets) == 4:
+        return f"H{octets[2]}{int(octets[3]):03}"
+    return "H" + "".join(ch for ch in address if ch.isalnum()).upper()[-8:]
+
+
+def _parse_ports(text: str) -> list[int] | None:
+    ports: list[int] = []
+    for part in text.split(","):
+        if not part.strip().isdigit() or not (1 <= int(part) <= 65535):
+            return None
+        ports.append(int(part))
+    return ports
+
+
+def run_discover(args: list[str]) -> int:
+    group = ""
+    concurrency, rate, timeout = _DEFAULT_CONCURRENCY, _DEFAULT_RATE, _DEFAULT_TIMEOUT
+    assume_yes = False
+    positional: list[str] = []
+    it = iter(args)
+    try:
+        for arg in it:
+            if arg == "--group":
+                group = next(it)
+            elif arg == "--concurrency":
+                concurrency = max(1, int(next(it)))
+            elif arg == "--rate":
+                rate = float(next(it))
+            elif arg == "--timeout":
+                timeout = float(next(it))
+            elif arg in ("-y", "--yes"):
+                assume_yes = True
+            elif arg.startswith("-"):
+                raise ValueError(arg)
+            else:
+                positional.append(arg)
+        if len(positional) not in (1, 2):
+            raise ValueError("arguments")
+        network = ipaddress.ip_network(positional[0], strict=False)
+        ports = _parse_ports(positional[1] if len(positional) == 2 else _DEFAULT_PORTS)
+        if ports is None:
+            raise ValueError("ports")
+    except (StopIteration, ValueError):
+        print(DISCOVER_USAGE)
+        return 2
+
+    if network.num_addresses > _MAX_ADDRESSES:
+        print(f"{Ansi.RED}{network} has {network.num_addresses} addresses, scan at most {_MAX_ADDRESSES} at a time.{Ansi.RESET}")
+        return 2
+
+    transports = {"ssh": ssh_config(), "telnet": telnet_config()}
+    # address index over both configs, addresses already configured are not proposed again; hosts
+    # configured by name are resolved first so they are recognised by the address they answer on
+    known: dict[str, str] = {}
+    by_name: dict[str, str] = {}
+    aliases: dict[str, list[str]] = {}
+    for key, transport in transports.items():
+        aliases[key] = []
+        for entry in iter_host_entries(transport.config_file):
+            aliases[key].append(entry.alias)
+            if not entry.hostname:
+                continue
+            address = _ip_literal(entry.hostname)
+            if address:
+                known.setdefault(address, entry.alias)
+            else:
+                by_name.setdefault(entry.hostname.lower(), entry.alias)
+
+    unresolved = 0
+    if by_name:
+        resolved = asyncio.run(_resolve_hostnames(sorted(by_name), concurrency=concurrency, timeout=timeout))
+        for hostname, found in resolved.items():
+            unresolved += not found
+            for address in found:
+                known.setdefault(address, by_name[hostname])
+
+    addresses = [str(a) for a in (network.hosts() if network.num_addresses > 2 else network)]
+    skipped = [a for a in addresses if a in known]
+    addresses = [a for a in addresses if a not in known]
+
+    print(f"Scanning {len(addresses)} address(es) in {network} on port(s) {','.join(map(str, ports))} "
+          f"({len(skipped)} already configured)...")
+    if unresolved:
+        print(f"{Ansi.YELLOW}{unresolved} configured hostname(s) did not resolve, hosts behind them "
+              f"may be offered again.{Ansi.RESET}")
+    started = time.monotonic()
+    candidates = asyncio.run(scan(addresses, ports, concurrency=concurrency, rate=rate, timeout=timeout))
+    print(f"Found {len(candidates)} open service(s) in {time.monotonic() - started:.1f}s.")
+    if not candidates:
+        return 1
+
+    names = asyncio.run(_reverse_names(sorted({c.address for c in candidates}), timeout))
+    if not group and not assume_yes:
+        group = prompt_text("Group for the new hosts (blank for none): ").strip()
+    if not normalize_identifier(group, case_mode="lower", allow_empty=True).ok:
+        print(f"{Ansi.RED}Group names must consist of letters and/or numbers.{Ansi.RESET}")
+        return 2
+
+    plans: dict[str, TransportPlan] = {}
+    errors: list[str] = []
+    seen: set[tuple[str, str]] = set()
+    for candidate in sorted(candidates, key=lambda c: (ipaddress.ip_address(c.address), c.port)):
+        # one entry per address and transport, the first open port wins
+        if (candidate.address, candidate.transport_key) in seen:
+            continue
+        seen.add((candidate.address, candidate.transport_key))
+
+        record = {
+            "transport": candidate.transport_key,
+            "group": group,
+            "nickname": propose_nickname(candidate.address, names.get(candidate.address, "")),
+            "hostname": candidate.address,
+            "port": str(candidate.port),
+        }
+        result = validate_record(record, candidate.transport_key)
+        if isinstance(result, str):
+            errors.append(f"{candidate.address}:{candidate.port}: {result}")
+            continue
+        transport_key, entry = result
+        plan = plans.get(transport_key)
+        if plan is None:
+            plan = TransportPlan(transport=transports[transport_key], tree=build_host_tree(aliases[transport_key]))
+            plans[transport_key] = plan
+        problem = plan_entry(plan, entry, split_alias(entry.alias)[1], replace=False)
+        if problem:
+            errors.append(f"{candidate.address}:{candidate.port}: {problem}")
+            continue
+        print(f"  {Ansi.GREEN}+{Ansi.RESET} {plan.transport.label:<6} {format_host_display(entry.alias)} "
+              f"({entry.hostname}:{entry.port})  {candidate.banner[:60]}")
+
+    for error in errors:
+        print(f"{Ansi.RED}  ! {error}{Ansi.RESET}")
+
+    total = sum(len(plan.entries) for plan in plans.values())
+    if total == 0:
+        return 1
+    if not assume_yes and not prompt_yes_no(f"Add these {total} host(s)?"):
+        print("Nothing written.")
+        return 0
+
+    for plan in plans.values():
+        if plan.entries:
+            ensure_config_file(plan.transport.config_file)
+            write_host_entries(plan.entries, plan.transport.config_file,
+                               note=f"discover {len(plan.entries)} host(s) in {network}")
+    print(f"Wrote {total} host(s).")
+    return 0
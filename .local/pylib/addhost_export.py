@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import csv
+import json
+import sys
+from pathlib import Path
+from typing import Iterator, TextIO
+
+from .config_paths import ssh_config, telnet_config
+from .config_utils import GROUP_DELIMITER, iter_host_entries, split_alias
+from .types import Transport
+
+
+EXPORT_FIELDS = (
+    "transport",
+    "alias",
+    "group",
+    "nickname",
+    "hostname",
+    "port",
+    "user",
+    "hostkey_algorithms",
+    "kex_algorithms",
+    "macs",
+)
+
+EXPORT_USAGE = "Usage: addhost export [--ssh|--telnet] [--group G] [--format jsonl|csv] [-o FILE]"
+
+
+def _in_group(group_path: str, wanted: str) -> bool:
+    return group_path == wanted or group_path.startswith(wanted + GROUP_DELIMITER)
+
+
+# one flat record per host, streamed straight from the config parser
+def iter_export_records(transports: list[Transport], *, group: str = "") -> Iterator[dict[str, str]]:
+    for transport in transports:
+        for entry in iter_host_entries(transport.config_file):
+            group_path, nickname = split_alias(entry.alias)
+            if group and not _in_group(group_path, group):
+                continue
+            yield {
+                "transport": transport.key,
+                "alias": entry.alias,
+                "group": group_path,
+                "nickname": nickname,
+                "hostname": entry.hostname,
+                "port": entry.port,
+                "user": entry.user,
+                "hostkey_algorithms": entry.hostkey_algorithms,
+                "kex_algorithms": entry.kex_algorithms,
+                "macs": entry.macs,
+            }
+
+
+def write_export(records: Iterator[dict[str, str]], out: TextIO, *, fmt: str) -> int:
+    count = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(out, fieldnames=EXPORT_FIELDS, lineterminator="\n")
+        writer.writeheader()
+        for record in records:
+            writer.writerow(record)
+            count += 1
+        return count
+
+    for record in records:
+        out.write(json.dumps(record, separators=(",", ":")) + "\n")
+        count += 1
+    return count
+
+
+def run_export(args: list[str]) -> int:
+    transports = [ssh_config(), telnet_config()]
+    group = ""
+    fmt = "jsonl"
+    output = ""
+
+    it = iter(args)
+    for arg in it:
+        if arg in ("--ssh", "--telnet"):
+            transports = [ssh_config() if arg == "--ssh" else telnet_config()]
+            continue
+        value = next(it, None) if arg in ("--group", "--format", "-o", "--output") else None
+        if value is None:
+            print(EXPORT_USAGE, file=sys.stderr)
+            return 2
+        if arg == "--group":
+            group = value.lower()
+        elif arg == "--format":
+            fmt = value
+        else:
+            output = value
+    if fmt not in ("jsonl", "csv"):
+        print(EXPORT_USAGE, file=sys.stderr)
+        return 2
+
+    records = iter_export_records(transports, group=group)
+    if not output or output == "-":
+        try:
+            write_export(records, sys.stdout, fmt=fmt)
+            sys.stdout.flush()
+        except BrokenPipeError:
+            # reader (head, grep -m) went away early, keep python from complaining on exit
+            sys.stdout = None  # type: ignore[assignment]
+        return 0
+
+    with Path(output).expanduser().open("w", encoding="utf-8", newline="") as f:
+        count = write_export(records, f, fmt=fmt)
+    print(f"Exported {count} host(s) to {output}", file=sys.stderr)
+    return 0
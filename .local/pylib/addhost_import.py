@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import csv
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator
+
+from .ansi import Ansi
+from .config_paths import ensure_config_file, ssh_config, telnet_config
+from .config_utils import GROUP_DELIMITER, build_host_tree, find_aliases_for_nickname, load_host_aliases, write_host_entries
+from .ident import normalize_identifier, normalize_port
+from .menu_utils import format_host_display
+from .prompting import prompt_yes_no
+from .types import HostEntry, HostTree, Transport
+
+
+_DEFAULT_PORTS = {"ssh": "22", "telnet": "23"}
+
+# rows shown in the dry-run listing before it is summarised
+_PREVIEW_ROWS = 50
+
+IMPORT_USAGE = "Usage: addhost import [--ssh|--telnet] [--replace] [--dry-run] [--yes] <file.csv|file.jsonl>"
+
+
+@dataclass
+class TransportPlan:
+    transport: Transport
+    tree: HostTree
+    entries: list[HostEntry] = field(default_factory=list)
+    replace: set[str] = field(default_factory=set)
+    seen_aliases: set[str] = field(default_factory=set)
+    seen_nicknames: dict[str, str] = field(default_factory=dict)
+
+
+# yields (line number, record) from a CSV file with a header row or a JSON-lines file
+def iter_import_records(path: Path) -> Iterator[tuple[int, dict[str, str]]]:
+    with path.open(encoding="utf-8-sig", newline="") as f:
+        first = f.read(1)
+        f.seek(0)
+        if path.suffix.lower() in (".jsonl", ".ndjson", ".json") or first == "{":
+            for line_no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_no, {"__error__": f"invalid JSON ({e.msg})"}
+                    continue
+                if not isinstance(record, dict):
+                    yield line_no, {"__error__": "expected a JSON object"}
+                    continue
+                yield line_no, {str(k).lower(): "" if v is None else str(v) for k, v in record.items()}
+            return
+
+        reader = csv.DictReader(f)
+        for record in reader:
+            # DictReader files the surplus of a row longer than the header under a None key
+            if None in record:
+                yield reader.line_num, {"__error__": "more fields than the header"}
+                continue
+            yield reader.line_num, {k.strip().lower(): (v or "").strip() for k, v in record.items()}
+
+
+# a value that goes onto a config line as a single word, so it can't start another line or keyword
+def _single_word(value: str) -> bool:
+    return len(value.split()) == 1 and value.isprintable()
+
+
+# checks a record with the same rules as the interactive prompts, returns (transport key, entry) or an error
+def validate_record(record: dict[str, str], default_transport: str) -> tuple[str, HostEntry] | str:
+    if "__error__" in record:
+        return record["__error__"]
+
+    transport_key = (record.get("transport") or default_transport).strip().lower()
+    if transport_key not in _DEFAULT_PORTS:
+        return f"unknown transport '{transport_key}'"
+
+    nick = normalize_identifier(record.get("nickname", ""), case_mode="upper")
+    if not nick.ok:
+        return "nickname is required" if nick.error == "empty" else "nicknames must consist of letters and/or numbers"
+
+    # a multi-level group (site.cluster, as export writes it) is checked one level at a time
+    group_path = record.get("group", "").strip()
+    groups = [normalize_identifier(part, case_mode="lower") for part in group_path.split(GROUP_DELIMITER)] if group_path else []
+    if not all(g.ok for g in groups):
+        return "group names must consist of letters and/or numbers"
+    group_value = GROUP_DELIMITER.join(g.value for g in groups)
+
+    hostname = record.get("hostname", "").strip()
+    if not hostname:
+        return "hostname/IP is required"
+    if not _single_word(hostname):
+        return "hostname/IP must not contain spaces or control characters"
+
+    port = normalize_port(record.get("port", ""), default=_DEFAULT_PORTS[transport_key])
+    if not port.ok:
+        return "port must be a number between 1 and 65535"
+
+    user = record.get("user", "").strip()
+    if user and not _single_word(user):
+        return "user must not contain spaces or control characters"
+
+    algorithms = {key: record.get(key, "").strip() for key in ("hostkey_algorithms", "kex_algorithms", "macs")}
+    for key, value in algorithms.items():
+        if value and not _single_word(value):
+            return f"{key} must be a comma-separated list without spaces"
+
+    alias = f"{group_value}{GROUP_DELIMITER}{nick.value}" if group_value else nick.value
+    entry = HostEntry(
+        alias=alias,
+        hostname=hostname,
+        port=port.value,
+        hostkey_algorithms=algorithms["hostkey_algorithms"],
+        kex_algorithms=algorithms["kex_algorithms"],
+        macs=algorithms["macs"],
+        user=user if transport_key == "ssh" else "",
+    )
+    return transport_key, entry
+
+
+def plan_entry(plan: TransportPlan, entry: HostEntry, nickname: str, *, replace: bool) -> str:
+    alias_key = entry.alias.upper()
+    if alias_key in plan.seen_aliases:
+        return f"duplicate alias {entry.alias} in import"
+    if nickname in plan.seen_nicknames:
+        return f"nickname {nickname} already used by {plan.seen_nicknames[nickname]} in import"
+
+    existing = find_aliases_for_nickname(nickname, plan.tree)
+    others = [a for a in existing if a.upper() != alias_key]
+    if others:
+        return f"nickname {nickname} already used by {', '.join(others)}"
+    if alias_key in plan.tree.by_alias:
+        if not replace:
+            return f"{entry.alias} already exists (use --replace to overwrite)"
+        plan.replace.update(plan.tree.by_alias[alias_key])
+
+    plan.seen_aliases.add(alias_key)
+    plan.seen_nicknames[nickname] = entry.alias
+    plan.entries.append(entry)
+    return ""
+
+
+def run_import(args: list[str]) -> int:
+    default_transport = "ssh"
+    replace = dry_run = assume_yes = False
+    files: list[str] = []
+    for arg in args:
+        if arg in ("--ssh", "--telnet"):
+            default_transport = arg[2:]
+        elif arg == "--replace":
+            replace = True
+        elif arg == "--dry-run":
+            dry_run = True
+        elif arg in ("-y", "--yes"):
+            assume_yes = True
+        elif arg.startswith("-"):
+            print(IMPORT_USAGE)
+            return 2
+        else:
+            files.append(arg)
+    if len(files) != 1:
+        print(IMPORT_USAGE)
+        return 2
+
+    path = Path(files[0]).expanduser()
+    if not path.is_file():
+        print(f"{Ansi.RED}No such file: {path}{Ansi.RESET}")
+        return 2
+
+    plans: dict[str, TransportPlan] = {}
+    errors: list[str] = []
+    for line_no, record in iter_import_records(path):
+        result = validate_record(record, default_transport)
+        if isinstance(result, str):
+            errors.append(f"line {line_no}: {result}")
+            continue
+
+        transport_key, entry = result
+        plan = plans.get(transport_key)
+        if plan is None:
+            transport = ssh_config() if transport_key == "ssh" else telnet_config()
+            plan = TransportPlan(transport=transport, tree=build_host_tree(load_host_aliases(transport.config_file)))
+            plans[transport_key] = plan
+
+        problem = plan_entry(plan, entry, entry.alias.rsplit(GROUP_DELIMITER, 1)[-1], replace=replace)
+        if problem:
+            errors.append(f"line {line_no}: {problem}")
+
+    shown = 0
+    for plan in plans.values():
+        print(f"\n{plan.transport.label}: {Ansi.MAGENTA}{plan.transport.config_file}{Ansi.RESET}")
+        replacing = {alias.upper() for alias in plan.replace}
+        for entry in plan.entries:
+            if shown >= _PREVIEW_ROWS:
+                break
+            shown += 1
+            mark = f"{Ansi.YELLOW}~{Ansi.RESET}" if entry.alias.upper() in replacing else f"{Ansi.GREEN}+{Ansi.RESET}"
+            print(f"  {mark} {format_host_display(entry.alias)} ({entry.hostname}:{entry.port})")
+
+    total = sum(len(plan.entries) for plan in plans.values())
+    if total > shown:
+        print(f"  ... and {total - shown} more")
+    for error in errors:
+        print(f"{Ansi.RED}  ! {error}{Ansi.RESET}")
+
+    replaced = sum(len(plan.replace) for plan in plans.values())
+    print(f"\n{total} host(s) to write ({replaced} replacing existing entries), {len(errors)} rejected.")
+
+    if dry_run or total == 0:
+        return 1 if errors else 0
+    if not assume_yes and not prompt_yes_no("Write these hosts?"):
+        print("Nothing written.")
+        return 0
+
+    for plan in plans.values():
+        if plan.entries:
+            ensure_config_file(plan.transport.config_file)
+            write_host_entries(plan.entries, plan.transport.config_file, replace=plan.replace,
+                               note=f"import {len(plan.entries)} host(s) from {path.name}")
+    print(f"Wrote {total} host(s).")
+    return 1 if errors else 0
@@ -1,14 +1,14 @@
 from __future__ import annotations
 
 from .ansi import Ansi
-from .ident import normalize_identifier
+from .ident import normalize_identifier, normalize_port
 from .prompting import prompt_yes_no, prompt_text
 from .config_utils import find_aliases_for_nickname
 from .menu_utils import format_host_details, format_host_display
-from .types import PromptCancel, PromptInvalid, PromptOk, PromptResult
+from .types import HostTree, PromptCancel, PromptInvalid, PromptOk, PromptResult
 
 
-def prompt_nickname(aliases: list[str], last_msg: list[str]) -> PromptResult[str]:
+def prompt_nickname(hosts: HostTree, last_msg: list[str]) -> PromptResult[str]:
     raw = prompt_text(f"Enter unique {Ansi.GREEN}nickname{Ansi.RESET} for the host (or {Ansi.RED}E{Ansi.RESET} to exit): ").strip()
     if raw.lower() == "e":
         return PromptCancel()
@@ -19,7 +19,7 @@ def prompt_nickname(aliases: list[str], last_msg: list[str]) -> PromptResult[str
         return PromptInvalid()
 
     nickname = norm.value
-    matches = find_aliases_for_nickname(nickname, aliases)
+    matches = find_aliases_for_nickname(nickname, hosts)
     if matches:
         resolved_result = select_existing_alias(nickname, matches, last_msg)
         match resolved_result:
@@ -90,7 +90,7 @@ def prompt_alias_change(current_alias: str, last_msg: list[str]) -> PromptResult
     current_group = ""
     current_nick = current_alias
     if "." in current_alias:
-        current_group, current_nick = current_alias.split(".", 1)
+        current_group, current_nick = current_alias.rsplit(".", 1)
 
     host_display = format_host_display(current_alias)
     print(f"\nEditing existing host {host_display}")
@@ -162,11 +162,33 @@ def prompt_port(current: str, last_msg: list[str]) -> PromptResult[str]:
     if raw.lower() == "e":
         last_msg[0] = "Port entry cancelled. Any changes to host were not saved."
         return PromptCancel()
-    if raw:
-        if not raw.isdigit() or not (1 <= int(raw) <= 65535):
-            last_msg[0] = "Port must be a number between 1 and 65535."
-            return PromptInvalid()
-    return PromptOk(raw or cur)
+    norm = normalize_port(raw, default=cur)
+    if not norm.ok:
+        last_msg[0] = "Port must be a number between 1 and 65535."
+        return PromptInvalid()
+    return PromptOk(norm.value)
+
+
+def prompt_user(current: str, last_msg: list[str]) -> PromptResult[str]:
+    prompt = "Enter login user"
+    if current:
+        prompt += f" [{Ansi.GREEN}{current}{Ansi.RESET}] ({Ansi.GREEN}Enter{Ansi.RESET} keeps current, {Ansi.MAGENTA}-{Ansi.RESET} removes,"
+    else:
+        prompt += f" ({Ansi.GREEN}Enter{Ansi.RESET} to be asked at each connect,"
+    prompt += f" {Ansi.RED}E{Ansi.RESET} to cancel): "
+
+    raw = prompt_text(prompt).strip()
+    if raw.lower() == "e":
+        last_msg[0] = "User entry cancelled. Any changes to host were not saved."
+        return PromptCancel()
+    if raw == "-":
+        return PromptOk("")
+    if not raw:
+        return PromptOk(current)
+    if len(raw.split()) != 1:
+        last_msg[0] = "Login user must not contain spaces."
+        return PromptInvalid()
+    return PromptOk(raw)
 
 
 def prompt_configure_algorithms(
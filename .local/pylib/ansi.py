@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import re
+import shutil
 import sys
 
 
@@ -12,11 +14,73 @@ class Ansi:
     RESET = "\033[0m"
 
 
+_ESCAPE_RE = re.compile(r"\033\[[0-9;?]*[A-Za-z]|\033\][^\007]*\007")
+
+# lines kept free below a frame for the prompt and any follow-up prompt (e.g. login as:)
+_PROMPT_MARGIN = 4
+
+
+def visible_width(text: str) -> int:
+    return len(_ESCAPE_RE.sub("", text))
+
+
+class _FrameState:
+    """Last frame written to the terminal, used to redraw only changed lines."""
+
+    def __init__(self) -> None:
+        self.lines: list[str] = []
+        self.widths: list[int] = []
+        self.valid = False
+
+    def invalidate(self) -> None:
+        self.lines = []
+        self.widths = []
+        self.valid = False
+
+
+_frame = _FrameState()
+
+
 def clear_screen() -> None:
+    _frame.invalidate()
     sys.stdout.write("\033[2J\033[H")
     sys.stdout.flush()
 
 
+def invalidate_frame() -> None:
+    _frame.invalidate()
+
+
+# write a full screen of lines in a single write, only touching lines that changed since the last frame
+def write_frame(lines: list[str]) -> None:
+    prev, prev_widths = _frame.lines, _frame.widths
+    widths = [
+        prev_widths[i] if i < len(prev) and (prev[i] is line or prev[i] == line) else visible_width(line)
+        for i, line in enumerate(lines)
+    ]
+
+    # a diff redraw addresses rows absolutely, so the frame must fit without wrapping or scrolling
+    size = shutil.get_terminal_size()
+    fits = len(lines) + _PROMPT_MARGIN <= size.lines and all(w < size.columns for w in widths)
+
+    if _frame.valid and fits:
+        out = [
+            f"\033[{row};1H\033[2K{line}"
+            for row, line in enumerate(lines, start=1)
+            if row > len(prev) or not (prev[row - 1] is line or prev[row - 1] == line)
+        ]
+        # park the cursor below the frame and wipe the previous prompt/input
+        out.append(f"\033[{len(lines) + 1};1H\033[J")
+        sys.stdout.write("".join(out))
+    else:
+        sys.stdout.write("\033[2J\033[H" + "\n".join(lines) + "\n")
+    sys.stdout.flush()
+
+    _frame.lines = lines
+    _frame.widths = widths
+    _frame.valid = fits
+
+
 def set_title(title: str) -> None:
     # xterm title escape
     sys.stdout.write(f"\033]0;{title}\007")
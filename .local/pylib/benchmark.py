@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager, redirect_stdout
+from dataclasses import replace
+from pathlib import Path
+from typing import Callable, Iterator, Sequence
+
+from .ansi import Ansi, invalidate_frame
+from .config_utils import (
+    categorize_hosts,
+    clear_alias_cache,
+    format_host_block,
+    load_host_aliases,
+    read_host_values,
+    remove_host_entry,
+    upsert_host_entry,
+)
+from .memory_report import synthetic_entries
+from .menu_utils import build_menu_lists, render_menu
+from .types import HostEntry
+
+
+BENCH_USAGE = (
+    "Usage: benchmark [--sizes 10,100,1000,10000,100000] [--repeat N] [--only op,...]\n"
+    "                 [--save baseline.json] [--compare baseline.json] [--threshold PERCENT]"
+)
+
+_DEFAULT_SIZES = (10, 100, 1_000, 10_000, 100_000)
+_DEFAULT_REPEAT = 5
+_DEFAULT_THRESHOLD_PERCENT = 20.0
+
+# differences below these are noise however large the ratio, a 0.1 ms operation doubling isn't a regression
+_NOISE_SECONDS = 0.0005
+_NOISE_BYTES = 64 * 1024
+
+_FORMAT = 1
+
+# one telnet host for every few ssh hosts, the way mixed inventories usually look
+_TELNET_SHARE = 4
+
+
+def _telnet_entries(count: int) -> list[HostEntry]:
+    return [
+        HostEntry(alias=f"vms{i % 7}.N{i}" if i % 10 else f"VAX{i}",
+                  hostname=f"172.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}", port="23")
+        for i in range(max(1, count // _TELNET_SHARE))
+    ]
+
+
+def _write_config(path: Path, entries: list[HostEntry]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8", newline="") as f:
+        for entry in entries:
+            f.writelines(format_host_block(entry))
+            f.write("\n")
+
+
+# state (snapshots, usage, indexes) goes to the scratch home, never the real one
+@contextmanager
+def _scratch_home(home: Path) -> Iterator[None]:
+    saved = {k: os.environ.get(k) for k in ("HOME", "USERPROFILE")}
+    os.environ["HOME"] = os.environ["USERPROFILE"] = str(home)
+    try:
+        yield
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+class _Operations:
+    """The timed operations for one inventory size, each a setup step and the call that is measured."""
+
+    def __init__(self, root: Path, count: int) -> None:
+        entries = synthetic_entries(count)
+        self.ssh_config = root / ".ssh" / "config"
+        self.telnet_config = root / ".telnet" / "config"
+        _write_config(self.ssh_config, entries)
+        _write_config(self.telnet_config, _telnet_entries(count))
+        self.aliases = [e.alias for e in entries]
+        # edits and lookups hit a host in the middle and the last one, not the cheap first block
+        self.middle = entries[count // 2]
+        self.last = entries[-1].alias
+        self.flip = 0
+        self.labels: Sequence[str] = []
+        self.types: Sequence[str] = []
+
+    def table(self) -> dict[str, tuple[Callable[[], None], Callable[[], object]]]:
+        nothing = lambda: None
+        return {
+            "load_host_aliases": (clear_alias_cache, lambda: load_host_aliases(self.ssh_config)),
+            "load_host_aliases_cached": (nothing, lambda: load_host_aliases(self.ssh_config)),
+            "load_host_aliases_all": (clear_alias_cache,
+                                      lambda: [load_host_aliases(p) for p in (self.ssh_config, self.telnet_config)]),
+            "read_host_values": (nothing, lambda: read_host_values(self.last, self.ssh_config)),
+            "categorize_hosts": (nothing, lambda: categorize_hosts(self.aliases)),
+            "upsert_host_entry": (nothing, self._upsert),
+            "remove_host_entry": (self._restore, lambda: remove_host_entry(self.middle.alias, self.ssh_config)),
+            "render_menu": (self._menu, lambda: render_menu("MAIN", "benchmark", self.labels, types=self.types)),
+        }
+
+    # alternates the hostname so every save really changes the block
+    def _upsert(self) -> None:
+        self.flip ^= 1
+        upsert_host_entry(replace(self.middle, hostname=f"{self.middle.hostname}{'x' * self.flip}"), self.ssh_config)
+
+    def _restore(self) -> None:
+        if not read_host_values(self.middle.alias, self.ssh_config)[0]:
+            upsert_host_entry(self.middle, self.ssh_config)
+
+    # fresh labels and a cleared screen, so the draw formats every row of the main menu again
+    def _menu(self) -> None:
+        categorized = categorize_hosts(self.aliases)
+        self.labels, self.types, _ = build_menu_lists(categorized.main_hosts, categorized.group_names,
+                                                       ssh_config=self.ssh_config)
+        invalidate_frame()
+
+
+# (fastest of repeat runs, the least disturbed by the rest of the machine; peak traced bytes of one
+# more run), output goes to the null device
+def _measure(setup: Callable[[], None], run: Callable[[], object], repeat: int) -> tuple[float, int]:
+    times: list[float] = []
+    with open(os.devnull, "w", encoding="utf-8") as null, redirect_stdout(null):
+        for _ in range(repeat):
+            setup()
+            gc.collect()
+            started = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - started)
+
+        setup()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            result = run()
+            peak = tracemalloc.get_traced_memory()[1] - before
+        finally:
+            tracemalloc.stop()
+        del result
+    return min(times), peak
+
+
+def run_benchmarks(sizes: list[int], *, repeat: int, only: set[str] | None = None) -> dict[str, dict[str, dict]]:
+    results: dict[str, dict[str, dict]] = {}
+    print(f"{'operation':<28}{'hosts':>8}{'ms':>11}{'peak MB':>10}")
+    for count in sizes:
+        with tempfile.TemporaryDirectory() as tmp, _scratch_home(Path(tmp)):
+            ops = _Operations(Path(tmp), count)
+            for name, (setup, run) in ops.table().items():
+                if only and name not in only:
+                    continue
+                seconds, peak = _measure(setup, run, repeat)
+                results.setdefault(name, {})[str(count)] = {"seconds": seconds, "peak_bytes": peak}
+                print(f"{name:<28}{count:>8}{seconds * 1000:>11.2f}{peak / 1e6:>10.2f}", flush=True)
+            clear_alias_cache()
+    return results
+
+
+def _change(base: float, current: float) -> str:
+    return f"{(current - base) / base * 100:+.0f}%" if base else "new"
+
+
+# regressions are changes over the threshold that are also bigger than the noise floor
+def compare_results(baseline: dict, results: dict, *, threshold: float) -> int:
+    limit = 1 + threshold / 100
+    regressions = 0
+    print()
+    print(f"{'operation':<28}{'hosts':>8}{'base ms':>10}{'ms':>10}{'time':>8}{'peak':>8}")
+    for name, by_size in results.items():
+        for size, current in by_size.items():
+            base = baseline.get("results", {}).get(name, {}).get(size)
+            if base is None:
+                continue
+            slower = (current["seconds"] > base["seconds"] * limit
+                      and current["seconds"] - base["seconds"] > _NOISE_SECONDS)
+            bigger = (current["peak_bytes"] > base["peak_bytes"] * limit
+                      and current["peak_bytes"] - base["peak_bytes"] > _NOISE_BYTES)
+            status = f"{Ansi.RED}REGRESSION{Ansi.RESET}" if slower or bigger else f"{Ansi.GREEN}ok{Ansi.RESET}"
+            regressions += slower or bigger
+            print(f"{name:<28}{size:>8}{base['seconds'] * 1000:>10.2f}{current['seconds'] * 1000:>10.2f}"
+                  f"{_change(base['seconds'], current['seconds']):>8}"
+                  f"{_change(base['peak_bytes'], current['peak_bytes']):>8}  {status}")
+    if regressions:
+        print(f"{Ansi.RED}{regressions} regression(s) over {threshold:g}%{Ansi.RESET}")
+    else:
+        print(f"No regressions over {threshold:g}%.")
+    return regressions
+
+
+def run_benchmark(args: list[str]) -> int:
+    sizes = list(_DEFAULT_SIZES)
+    repeat = _DEFAULT_REPEAT
+    threshold = _DEFAULT_THRESHOLD_PERCENT
+    only: set[str] | None = None
+    save: Path | None = None
+    compare: Path | None = None
+    it = iter(args)
+    try:
+        for arg in it:
+            if arg == "--sizes":
+                sizes = [max(1, int(s)) for s in next(it).split(",") if s]
+            elif arg == "--repeat":
+                repeat = max(1, int(next(it)))
+            elif arg == "--only":
+                only = {s for s in next(it).split(",") if s}
+            elif arg == "--save":
+                save = Path(next(it)).expanduser()
+            elif arg == "--compare":
+                compare = Path(next(it)).expanduser()
+            elif arg == "--threshold":
+                threshold = max(0.0, float(next(it)))
+            else:
+                raise ValueError(arg)
+    except (StopIteration, ValueError):
+        print(BENCH_USAGE)
+        return 2
+
+    baseline = None
+    if compare is not None:
+        try:
+            baseline = json.loads(compare.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            print(f"{Ansi.RED}Cannot read baseline {compare}: {e}{Ansi.RESET}")
+            return 2
+        # a baseline is only comparable at the sizes it was taken at
+        if "--sizes" not in args:
+            sizes = sorted({int(s) for by_size in baseline.get("results", {}).values() for s in by_size})
+
+    results = run_benchmarks(sizes, repeat=repeat, only=only)
+
+    if save is not None:
+        data = {
+            "format": _FORMAT,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": sys.platform,
+            "repeat": repeat,
+            "results": results,
+        }
+        save.write_text(json.dumps(data, indent=2) + "\n", encoding="utf-8")
+        print(f"Baseline saved to {save}")
+
+    if baseline is not None:
+        return 1 if compare_results(baseline, results, threshold=threshold) else 0
+    return 0
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import difflib
+import re
+import time
+from dataclasses import replace
+
+from .ansi import Ansi
+from .config_paths import shard_file, ssh_config, telnet_config
+from .config_utils import write_config_text
+from .snapshot_store import Snapshot, block_changes, list_snapshots, load_snapshot
+from .types import Transport
+
+
+HISTORY_USAGE = (
+    "Usage: addhost history [--ssh|--telnet] [--group G] [-n COUNT]\n"
+    "       addhost diff [--ssh|--telnet] [--group G] [FROM [TO]]\n"
+    "       addhost undo [--ssh|--telnet] [--group G] [VERSION]"
+)
+
+_UNDO_RE = re.compile(r"^undo to #(?P<id>\d+)$")
+
+_DEFAULT_HISTORY_ROWS = 20
+
+
+def _find(history: list[Snapshot], version: str) -> Snapshot | None:
+    target = version.lstrip("#")
+    for snapshot in history:
+        if str(snapshot.id) == target:
+            return snapshot
+    return None
+
+
+# the version the config currently corresponds to, following undo records back to what they restored
+def _base_id(history: list[Snapshot]) -> int:
+    m = _UNDO_RE.match(history[-1].note)
+    return int(m.group("id")) if m else history[-1].id
+
+
+def _print_history(transport: Transport, history: list[Snapshot], rows: int) -> None:
+    print(f"{transport.label}: {Ansi.MAGENTA}{transport.config_file}{Ansi.RESET} ({len(history)} version(s))\n")
+    start = max(0, len(history) - rows)
+    for i in range(start, len(history)):
+        snapshot = history[i]
+        added, removed = block_changes(history[i - 1] if i else None, snapshot)
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(snapshot.time))
+        change = f"{Ansi.GREEN}+{added}{Ansi.RESET} {Ansi.RED}-{removed}{Ansi.RESET}"
+        print(f"  #{snapshot.id:<5} {stamp}  {snapshot.blocks:>6} block(s)  {change}  {snapshot.note}")
+
+
+def _print_diff(old: str, new: str, old_label: str, new_label: str) -> None:
+    for line in difflib.unified_diff(old.splitlines(True), new.splitlines(True), old_label, new_label):
+        # bytes that aren't UTF-8 are kept as surrogates in snapshots, shown as U+FFFD
+        line = line.rstrip("\n").encode("utf-8", errors="surrogateescape").decode("utf-8", errors="replace")
+        if line.startswith("+") and not line.startswith("+++"):
+            print(f"{Ansi.GREEN}{line}{Ansi.RESET}")
+        elif line.startswith("-") and not line.startswith("---"):
+            print(f"{Ansi.RED}{line}{Ansi.RESET}")
+        else:
+            print(line)
+
+
+def run_history(command: str, args: list[str]) -> int:
+    transport = ssh_config()
+    group = ""
+    rows = _DEFAULT_HISTORY_ROWS
+    versions: list[str] = []
+    it = iter(args)
+    for arg in it:
+        if arg in ("--ssh", "--telnet"):
+            transport = ssh_config() if arg == "--ssh" else telnet_config()
+        elif arg == "--group":
+            group = next(it, "")
+            if not group:
+                print(HISTORY_USAGE)
+                return 2
+        elif arg == "-n" and command == "history":
+            value = next(it, "")
+            if not value.isdigit():
+                print(HISTORY_USAGE)
+                return 2
+            rows = int(value)
+        elif not arg.startswith("-"):
+            versions.append(arg)
+        else:
+            print(HISTORY_USAGE)
+            return 2
+
+    max_versions = {"history": 0, "diff": 2, "undo": 1}[command]
+    if len(versions) > max_versions:
+        print(HISTORY_USAGE)
+        return 2
+
+    # a sharded config keeps each group's history with its own file under config.d
+    if group:
+        transport = replace(transport, config_file=shard_file(transport.config_file, group.split(".", 1)[0]))
+
+    history = list_snapshots(transport.config_file)
+    if not history:
+        print(f"No snapshots recorded for {transport.config_file} yet.")
+        return 1
+
+    if command == "history":
+        _print_history(transport, history, rows)
+        return 0
+
+    picked: list[Snapshot] = []
+    for version in versions:
+        snapshot = _find(history, version)
+        if snapshot is None:
+            print(f"{Ansi.RED}No version {version} for {transport.config_file}{Ansi.RESET}")
+            return 2
+        picked.append(snapshot)
+
+    try:
+        if command == "diff":
+            if not picked:
+                if len(history) < 2:
+                    print("Only one version recorded, nothing to compare.")
+                    return 0
+                picked = history[-2:]
+            if len(picked) == 1:
+                picked.append(history[-1])
+            _print_diff(load_snapshot(picked[0]), load_snapshot(picked[1]), f"#{picked[0].id}", f"#{picked[1].id}")
+            return 0
+
+        if picked:
+            target = picked[0]
+        else:
+            target = _find(history, str(_base_id(history) - 1))
+            if target is None:
+                print("Already at the oldest recorded version.")
+                return 1
+
+        content = load_snapshot(target)
+    except OSError as e:
+        print(f"{Ansi.RED}Could not read snapshot: {e}{Ansi.RESET}")
+        return 1
+
+    write_config_text(transport.config_file, content, note=f"undo to #{target.id}")
+    print(f"Restored {transport.config_file} to version #{target.id} ({target.note or 'no note'}).")
+    return 0
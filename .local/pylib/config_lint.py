@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .ansi import Ansi
+from .config_paths import ssh_config, telnet_config
+from .config_utils import (
+    config_setting,
+    host_line_aliases,
+    included_files,
+    is_host_pattern,
+    read_config_text,
+    split_alias,
+    write_config_text,
+)
+from .menu_utils import format_host_display
+from .prompting import prompt_yes_no
+from .types import Transport
+
+
+_DEFAULT_PORTS = {"ssh": "22", "telnet": "23"}
+
+LINT_USAGE = "Usage: addhost lint [--ssh|--telnet] [--fix] [--yes]"
+
+
+@dataclass
+class _Block:
+    path: Path  # the config or included file holding the block
+    start: int
+    end: int
+    aliases: list[str]
+    hostname: str = ""
+    port: str = ""
+    settings: int = 0  # keyword lines in the block
+
+
+@dataclass
+class LintReport:
+    transport: Transport
+    # every file read, the config first and then its includes, with their lines
+    files: dict[Path, list[str]]
+    # blocks in the order ssh reads them, included files' blocks where their Include line is
+    blocks: list[_Block]
+    # alias -> blocks after the first one (ssh merges them, the first value of each keyword wins)
+    duplicate_blocks: dict[str, list[_Block]] = field(default_factory=dict)
+    # nickname -> every alias using it
+    shared_nicknames: dict[str, list[str]] = field(default_factory=dict)
+    # hostname:port -> every alias pointing at it
+    shared_endpoints: dict[str, list[str]] = field(default_factory=dict)
+    missing_hostname: list[_Block] = field(default_factory=list)
+
+    def issue_count(self) -> int:
+        return (sum(len(b) for b in self.duplicate_blocks.values()) + len(self.shared_nicknames)
+                + len(self.shared_endpoints) + len(self.missing_hostname))
+
+    # blocks --fix removes: flagged single-alias blocks without a single setting, removing one changes
+    # nothing ssh does; a block with settings is only reported, its values may be the ones in use
+    def removable(self) -> list[_Block]:
+        blocks = {id(b): b for dups in self.duplicate_blocks.values() for b in dups}
+        blocks.update((id(b), b) for b in self.missing_hostname)
+        return [b for b in self.blocks if id(b) in blocks and len(b.aliases) == 1 and not b.settings]
+
+
+# reads a file's blocks into blocks and its lines into files, following Include where it stands;
+# a file already read is not read again, which also ends include cycles
+def _load_blocks(config_file: Path, files: dict[Path, list[str]], blocks: list[_Block]) -> None:
+    if config_file in files:
+        return
+    try:
+        lines = read_config_text(config_file).splitlines(True)
+    except OSError:
+        return
+    files[config_file] = lines
+
+    current: _Block | None = None
+    for i, line in enumerate(lines):
+        aliases = host_line_aliases(line)
+        if aliases is not None:
+            if current is not None:
+                current.end = i
+            current = _Block(path=config_file, start=i, end=len(lines), aliases=aliases)
+            blocks.append(current)
+            continue
+        setting = config_setting(line)
+        if setting is None:
+            continue
+        key, value = setting
+        if current is not None:
+            current.settings += 1
+        if key == "include":
+            for path in included_files(line, config_file):
+                _load_blocks(path, files, blocks)
+        elif current is None:
+            continue
+        elif key == "hostname" and not current.hostname:
+            current.hostname = value
+        elif key == "port" and not current.port:
+            current.port = value
+
+
+# one pass over the blocks of the config and its includes, every check is a dict lookup so the cost
+# stays linear in the config size
+def lint_config(transport: Transport) -> LintReport:
+    files: dict[Path, list[str]] = {}
+    blocks: list[_Block] = []
+    _load_blocks(transport.config_file, files, blocks)
+    report = LintReport(transport=transport, files=files, blocks=blocks)
+
+    # upper-cased alias -> (alias as first written, every block naming it in the order ssh reads them)
+    by_alias: dict[str, tuple[str, list[_Block]]] = {}
+    for block in report.blocks:
+        for alias in block.aliases:
+            if not is_host_pattern(alias):
+                by_alias.setdefault(alias.upper(), (alias, []))[1].append(block)
+
+    nicknames: dict[str, list[str]] = {}
+    endpoints: dict[str, list[str]] = {}
+    missing: dict[int, _Block] = {}
+    default_port = _DEFAULT_PORTS.get(transport.key, "")
+    for alias, blocks in by_alias.values():
+        if len(blocks) > 1:
+            report.duplicate_blocks[alias] = blocks[1:]
+        nicknames.setdefault(split_alias(alias)[1].upper(), []).append(alias)
+        # repeated blocks merge, so the host's values are the first ones set in any of them
+        hostname = next((b.hostname for b in blocks if b.hostname), "")
+        port = next((b.port for b in blocks if b.port), "")
+        if hostname:
+            endpoints.setdefault(f"{hostname.lower()}:{port or default_port}", []).append(alias)
+        else:
+            missing.setdefault(id(blocks[0]), blocks[0])
+
+    report.missing_hostname = [b for b in report.blocks if id(b) in missing]
+
+    report.shared_nicknames = {n: a for n, a in nicknames.items() if len(a) > 1}
+    report.shared_endpoints = {e: a for e, a in endpoints.items() if len(a) > 1}
+    return report
+
+
+# removes the removable blocks from the files holding them, one atomic rewrite per file;
+# returns how many blocks were removed from each file
+def apply_fixes(report: LintReport) -> dict[Path, int]:
+    by_file: dict[Path, list[_Block]] = {}
+    for block in report.removable():
+        by_file.setdefault(block.path, []).append(block)
+
+    removed: dict[Path, int] = {}
+    for path, blocks in by_file.items():
+        lines = report.files[path]
+        out: list[str] = []
+        pos = 0
+        for block in sorted(blocks, key=lambda b: b.start):
+            out.extend(lines[pos:block.start])
+            pos = block.end
+        out.extend(lines[pos:])
+        write_config_text(path, "".join(out), note=f"lint --fix removed {len(blocks)} block(s)",
+                          previous="".join(lines))
+        removed[path] = len(blocks)
+    return removed
+
+
+def _aliases_display(aliases: list[str]) -> str:
+    return ", ".join(format_host_display(a) for a in aliases)
+
+
+# "line N" in the config itself, "<file> line N" in an included file
+def _location(report: LintReport, block: _Block) -> str:
+    if block.path == report.transport.config_file:
+        return f"line {block.start + 1}"
+    return f"{block.path} line {block.start + 1}"
+
+
+def print_report(report: LintReport) -> None:
+    transport = report.transport
+    included = f", {len(report.files) - 1} included file(s)" if len(report.files) > 1 else ""
+    print(f"\n{transport.label}: {Ansi.MAGENTA}{transport.config_file}{Ansi.RESET} "
+          f"({len(report.blocks)} block(s){included}, {report.issue_count()} issue(s))")
+
+    if report.duplicate_blocks:
+        print(f"\n  {Ansi.YELLOW}Duplicate Host blocks{Ansi.RESET} (ssh merges them, the first value of each setting wins):")
+        for alias, blocks in report.duplicate_blocks.items():
+            where = ", ".join(_location(report, b) for b in blocks)
+            print(f"    {format_host_display(alias)}: extra block(s) at {where}")
+    if report.missing_hostname:
+        print(f"\n  {Ansi.YELLOW}Hosts without a Hostname{Ansi.RESET} (ssh connects to the alias as the hostname):")
+        for block in report.missing_hostname:
+            print(f"    {_location(report, block)}: {_aliases_display(block.aliases)}")
+    if report.shared_nicknames:
+        print(f"\n  {Ansi.YELLOW}Nickname used in several groups{Ansi.RESET} (rename to keep lookups unambiguous):")
+        for nickname, aliases in report.shared_nicknames.items():
+            print(f"    {nickname}: {_aliases_display(aliases)}")
+    if report.shared_endpoints:
+        print(f"\n  {Ansi.YELLOW}Same hostname:port under several aliases{Ansi.RESET}:")
+        for endpoint, aliases in report.shared_endpoints.items():
+            print(f"    {endpoint}: {_aliases_display(aliases)}")
+
+
+def run_lint(args: list[str]) -> int:
+    transports = [ssh_config(), telnet_config()]
+    fix = assume_yes = False
+    for arg in args:
+        if arg in ("--ssh", "--telnet"):
+            transports = [ssh_config() if arg == "--ssh" else telnet_config()]
+        elif arg == "--fix":
+            fix = True
+        elif arg in ("-y", "--yes"):
+            assume_yes = True
+        else:
+            print(LINT_USAGE)
+            return 2
+
+    reports = [lint_config(t) for t in transports]
+    for report in reports:
+        print_report(report)
+
+    issues = sum(r.issue_count() for r in reports)
+    removable = sum(len(r.removable()) for r in reports)
+    print(f"\n{issues} issue(s) found, {removable} empty block(s) can be removed with --fix.")
+    if not fix or removable == 0:
+        return 1 if issues else 0
+    if not assume_yes and not prompt_yes_no(f"Remove {removable} empty duplicate or hostname-less block(s)?"):
+        print("Nothing written.")
+        return 1
+
+    for report in reports:
+        for path, removed in apply_fixes(report).items():
+            print(f"Removed {removed} block(s) from {path}")
+    return 0
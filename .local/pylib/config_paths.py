@@ -13,6 +13,50 @@ def telnet_config() -> Transport:
     return Transport(key="telnet", label="Telnet", config_file=Path.home() / ".telnet" / "config")
 
 
+# merged view over every transport, hosts carry their own transport (see MenuVars.host_transports)
+def all_config() -> Transport:
+    return Transport(key="all", label="All", config_file=None)
+
+
+def concrete_transports() -> list[Transport]:
+    return [ssh_config(), telnet_config()]
+
+
+# the config files behind a transport, every concrete one for the "all" view
+def transport_config_files(transport: Transport) -> list[Path]:
+    if transport.config_file is None:
+        return [t.config_file for t in concrete_transports()]  # type: ignore[misc]
+    return [transport.config_file]
+
+
+# per-user state that is not part of the ssh/telnet configs (usage history etc.)
+def state_dir() -> Path:
+    return Path.home() / ".local" / "state" / "vmsmenu"
+
+
+def usage_file() -> Path:
+    return state_dir() / "usage"
+
+
+# last login user typed per host, offered as the default at the login prompt
+def users_file() -> Path:
+    return state_dir() / "users"
+
+
+# port and token of a running `vmsmenu --serve`
+def server_file() -> Path:
+    return state_dir() / "server"
+
+
+# per-group include files of a sharded config (see addhost shard)
+def shard_dir(config_file: Path) -> Path:
+    return config_file.parent / "config.d"
+
+
+def shard_file(config_file: Path, group: str) -> Path:
+    return shard_dir(config_file) / f"{group}.conf"
+
+
 def ensure_config_file(path: Path) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     path.touch(exist_ok=True)
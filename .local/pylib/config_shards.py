@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import re
+
+from .ansi import Ansi
+from .config_paths import shard_dir, shard_file, ssh_config, telnet_config
+from .config_utils import (
+    SHARD_INCLUDE,
+    SHARD_INCLUDE_RE,
+    SHARD_MARKER,
+    block_end,
+    block_prefix,
+    is_host_pattern,
+    is_sharded,
+    line_ending,
+    read_config_text,
+    shard_group,
+    write_config_text,
+)
+from .prompting import prompt_yes_no
+from .types import Transport
+
+
+SHARD_USAGE = (
+    "Usage: addhost shard [--ssh|--telnet] [--yes]\n"
+    "       addhost unshard [--ssh|--telnet] [--yes]"
+)
+
+
+_BLOCK_START_RE = re.compile(r"^(?P<keyword>Host|Match)[ \t]+(?P<args>[^\r\n]*\S)[ \t]*\r?$", re.MULTILINE)
+
+
+# a block that stays in the main config
+_KEPT = ""
+# a kept block that can apply to grouped hosts (a pattern, a Match, a grouped alias next to others), so the
+# grouped blocks must not move ahead of it: ssh takes the first value it finds for each setting
+_ORDERED = "!"
+
+
+# (text before the first Host or Match line, [(top-level group, _KEPT or _ORDERED, block with the comments
+# leading into it)])
+def _split_config(text: str) -> tuple[str, list[tuple[str, str]]]:
+    starts = [m for m in _BLOCK_START_RE.finditer(text)]
+    if not starts:
+        return text, []
+
+    blocks: list[tuple[str, str]] = []
+    preamble = text[:starts[0].start()]
+    lead_start = starts[0].start()
+    for i, m in enumerate(starts):
+        next_start = starts[i + 1].start() if i + 1 < len(starts) else len(text)
+        end = block_end(text, m.start(), next_start)
+        if m.group("keyword") == "Match":
+            group = _ORDERED
+        else:
+            aliases = m.group("args").split()
+            groups = {shard_group(a) for a in aliases}
+            # only blocks whose aliases all belong to one group move, patterns and ungrouped hosts stay put
+            if any(is_host_pattern(a) for a in aliases):
+                group = _ORDERED
+            elif len(groups) == 1:
+                group = groups.pop() or _KEPT
+            else:
+                group = _ORDERED
+        blocks.append((group, text[lead_start:end]))
+        lead_start = end
+    return preamble, blocks
+
+
+def _join(blocks: list[str], newline: str) -> str:
+    parts: list[str] = []
+    for block in blocks:
+        parts.append(block_prefix(parts[-1], newline) if parts else "")
+        parts.append(block)
+    return "".join(parts)
+
+
+def shard_config(transport: Transport) -> int:
+    config_file = transport.config_file
+    text = read_config_text(config_file)
+    newline = line_ending(text)
+    preamble, blocks = _split_config(text)
+
+    shards: dict[str, list[str]] = {}
+    kept: list[str] = []
+    ordered: str | None = None
+    for group, block in blocks:
+        if group in (_KEPT, _ORDERED):
+            kept.append(block)
+            if group == _ORDERED and ordered is None:
+                ordered = block
+            continue
+        # the shards are included ahead of every kept block, which would give the grouped hosts' settings
+        # precedence over the ones this block sets for them
+        if ordered is not None:
+            start = _BLOCK_START_RE.search(ordered)
+            print(f"{Ansi.RED}{transport.label}: '{start.group(0).strip() if start else ordered.strip()}' comes "
+                  f"before grouped hosts in {config_file}. Sharding would move them ahead of it and change which "
+                  f"settings ssh applies, so the config is left as it is.{Ansi.RESET}")
+            return 1
+        shards.setdefault(group, []).append(block)
+    if not shards:
+        print(f"{transport.label}: no grouped hosts in {config_file}, nothing to shard.")
+        return 0
+
+    shards_path = shard_dir(config_file)
+    # the include picks up every .conf file in there, so it has to start out as ours alone
+    if shards_path.is_dir() and any(shards_path.glob("*.conf")):
+        print(f"{Ansi.RED}{shards_path} already has .conf files, move them away before sharding.{Ansi.RESET}")
+        return 1
+
+    # shards are written first, an interrupted migration leaves the hosts in the main config still working
+    shards_path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    for group, group_blocks in sorted(shards.items()):
+        write_config_text(shard_file(config_file, group), _join(group_blocks, newline), note=f"shard from {config_file.name}")
+
+    # the include has to come before the first Host line, ssh would otherwise only apply it to that host
+    main = preamble + block_prefix(preamble, newline) + SHARD_MARKER + newline + SHARD_INCLUDE + newline
+    if kept:
+        main += newline + _join(kept, newline)
+    moved = sum(len(b) for b in shards.values())
+    write_config_text(config_file, main, note=f"moved {moved} block(s) into {len(shards)} shard(s)", previous=text)
+    print(f"{transport.label}: moved {moved} block(s) into {len(shards)} file(s) in "
+          f"{Ansi.MAGENTA}{shards_path}{Ansi.RESET}, {len(kept)} block(s) stay in {config_file.name}.")
+    return 0
+
+
+# folds every shard back in where the include line was, the order ssh sees the blocks in does not change
+def unshard_config(transport: Transport) -> int:
+    config_file = transport.config_file
+    text = read_config_text(config_file)
+    newline = line_ending(text)
+    m = SHARD_INCLUDE_RE.search(text)
+    if m is None:
+        print(f"{transport.label}: {config_file} is not sharded.")
+        return 0
+
+    shards = sorted(shard_dir(config_file).glob("*.conf"))
+    merged = _join([read_config_text(p) for p in shards], newline)
+    before = text[:m.start()]
+    after = text[m.end():].lstrip("\r\n")
+    content = before + merged
+    if after:
+        content += block_prefix(content, newline) + after
+    write_config_text(config_file, content, note=f"merged {len(shards)} shard(s) back in", previous=text)
+
+    # only removed once the main config holds everything, the snapshots keep their history
+    for path in shards:
+        path.unlink()
+    try:
+        shard_dir(config_file).rmdir()
+    except OSError:
+        pass
+    print(f"{transport.label}: merged {len(shards)} shard(s) back into {Ansi.MAGENTA}{config_file}{Ansi.RESET}.")
+    return 0
+
+
+def run_shard(command: str, args: list[str]) -> int:
+    transports = [ssh_config(), telnet_config()]
+    assume_yes = False
+    for arg in args:
+        if arg in ("--ssh", "--telnet"):
+            transports = [ssh_config() if arg == "--ssh" else telnet_config()]
+        elif arg in ("-y", "--yes"):
+            assume_yes = True
+        else:
+            print(SHARD_USAGE)
+            return 2
+
+    transports = [t for t in transports if t.config_file.exists()
+                  and is_sharded(t.config_file) == (command == "unshard")]
+    if not transports:
+        print("Nothing to do." if command == "shard" else "No sharded config found.")
+        return 0
+
+    files = " and ".join(str(t.config_file) for t in transports)
+    question = (f"Split {files} into one file per group under config.d?" if command == "shard"
+                else f"Merge the config.d files back into {files}?")
+    if not assume_yes and not prompt_yes_no(question):
+        print("Nothing written.")
+        return 1
+
+    status = 0
+    for transport in transports:
+        run = shard_config if command == "shard" else unshard_config
+        status = max(status, run(transport))
+    return status
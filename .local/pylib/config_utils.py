@@ -1,11 +1,19 @@
 from __future__ import annotations
 
+import glob
+import os
 import re
+import shutil
+import sys
+import tempfile
+from collections.abc import Mapping
 from pathlib import Path
-from tempfile import NamedTemporaryFile
-from typing import Iterable
+from typing import Iterable, Iterator
 
-from .types import CategorizedHosts, HostEntry
+from .config_paths import shard_dir, shard_file
+from .snapshot_store import record_baseline, record_snapshot
+from .tracing import traced
+from .types import AliasIndex, CategorizedHosts, GroupNode, HostEntry, HostTree
 
 
 # global delimiter constant for host entries (e.g. group.MEMBER)
@@ -15,57 +23,264 @@ GROUP_DELIMITER = "."
 _HOST_EXACT_RE = re.compile(r"^Host\s+(?P<alias>[^\s]+)\s*$")
 _HOST_ANY_RE = re.compile(r"^Host\s+(?P<aliases>.+)$")
 _KEYVAL_RE = re.compile(r"^\s*(?P<key>[A-Za-z][A-Za-z0-9]*)\s+(?P<value>.+?)\s*$")
+_GROUP_RE = re.compile(r"[a-z0-9]+")
+_HOST_LINE_RE = re.compile(r"^Host[ \t]+(?P<aliases>[^\r\n]*\S)[ \t]*\r?$", re.MULTILINE)
+_INCLUDE_RE = re.compile(r"^\s*Include\s+(?P<paths>.+?)\s*$", re.IGNORECASE)
+
+# the line a sharded config pulls its per-group files in with, relative paths resolve next to the config
+SHARD_INCLUDE = "Include config.d/*.conf"
+# written by addhost shard right above its include: only a config carrying it has its writes go to the
+# shard files, a hand-written include of config.d is read like any other and left alone
+SHARD_MARKER = "# vmsmenu: grouped hosts are kept in config.d, one file per group (addhost unshard merges them back)"
+SHARD_INCLUDE_RE = re.compile(
+    rf"^{re.escape(SHARD_MARKER)}[ \t]*\r?\nInclude[ \t]+config\.d/\*\.conf[ \t]*\r?$", re.MULTILINE)
+
+# guards against include cycles, same limit ssh uses
+_MAX_INCLUDE_DEPTH = 16
+
+# up to this many aliases, blocks are located by searching for each alias instead of walking every Host line
+_TARGETED_SEARCH_MAX = 8
+
+
+def file_version(path: Path) -> tuple[int, int] | None:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+# cheap change detection for caches built from a config file, folds in the shard files of a sharded config
+def config_version(config_file: Path) -> tuple[int, int] | None:
+    version = file_version(config_file)
+    shards = shard_dir(config_file)
+    if version is None or not shards.is_dir():
+        return version
+    mtime, size = version
+    try:
+        # the directory's own mtime catches shards being added or removed
+        mtime = max(mtime, shards.stat().st_mtime_ns)
+        with os.scandir(shards) as it:
+            for dir_entry in it:
+                st = dir_entry.stat()
+                mtime = max(mtime, st.st_mtime_ns)
+                size += st.st_size
+    except OSError:
+        pass
+    return mtime, size
+
+
+# per config: (main file version, whether addhost shard's marker and include are in it)
+_SHARDED_CACHE: dict[Path, tuple[tuple[int, int] | None, bool]] = {}
+
+
+# a config is sharded once it has a config.d directory and addhost shard's marked include; every read and
+# write asks, so the answer is kept until the main file changes and only the part above its first block is read
+def is_sharded(config_file: Path) -> bool:
+    if not shard_dir(config_file).is_dir():
+        return False
+    version = file_version(config_file)
+    cached = _SHARDED_CACHE.get(config_file)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    head: list[str] = []
+    try:
+        with config_file.open(encoding="utf-8", errors="replace") as f:
+            for line in f:
+                if line.startswith(("Host", "Match")):
+                    break
+                head.append(line)
+    except OSError:
+        return False
+    sharded = SHARD_INCLUDE_RE.search("".join(head)) is not None
+    _SHARDED_CACHE[config_file] = (version, sharded)
+    return sharded
 
 
-def load_host_aliases(config_file: Path) -> list[str]:
-    aliases: list[str] = []
-    if not config_file.exists():
-        return aliases
+# top-level group of an alias, the shard it is kept in ("" for ungrouped hosts)
+def shard_group(alias: str) -> str:
+    return split_alias(alias)[0].split(GROUP_DELIMITER, 1)[0]
 
-    for line in config_file.read_text(encoding="utf-8", errors="replace").splitlines():
-        m = _HOST_ANY_RE.match(line)
-        if not m:
-            continue
-        for alias in m.group("aliases").split():
-            aliases.append(alias)
+
+# the file a host's block is written to: its group's shard when the config is sharded, else the config itself
+def host_config_file(alias: str, config_file: Path, *, sharded: bool | None = None) -> Path:
+    group = shard_group(alias)
+    if not group or not (is_sharded(config_file) if sharded is None else sharded):
+        return config_file
+    return shard_file(config_file, group)
+
+
+def _include_paths(patterns: str, base_dir: Path) -> list[Path]:
+    paths: list[Path] = []
+    for pattern in patterns.split():
+        expanded = Path(os.path.expanduser(pattern))
+        if not expanded.is_absolute():
+            expanded = base_dir / expanded
+        paths.extend(Path(p) for p in sorted(glob.glob(str(expanded))))
+    return paths
+
+
+# the files an `Include` line pulls in, in the order ssh reads them; empty for any other line
+def included_files(line: str, config_file: Path) -> list[Path]:
+    if line.lstrip()[:7].lower() != "include":
+        return []
+    m = _INCLUDE_RE.match(line.rstrip("\r\n"))
+    return _include_paths(m.group("paths"), config_file.parent) if m else []
+
+
+# yields the lines of a config with Include directives expanded in place, read lazily
+# so callers that stop early never read the rest of the file
+def iter_config_lines(config_file: Path, *, _depth: int = 0) -> Iterator[str]:
+    try:
+        f = config_file.open(encoding="utf-8", errors="replace")
+    except OSError:
+        return
+    with f:
+        for raw_line in f:
+            line = raw_line.rstrip("\r\n")
+            if _depth < _MAX_INCLUDE_DEPTH and line.lstrip()[:7].lower() == "include":
+                m = _INCLUDE_RE.match(line)
+                if m:
+                    for path in _include_paths(m.group("paths"), config_file.parent):
+                        yield from iter_config_lines(path, _depth=_depth + 1)
+                    continue
+            yield line
+
+
+# per-file parses for load_host_aliases: the aliases of each stretch of the file and the Include patterns
+# ending it, checked against the file's version so reloading a sharded config only re-reads changed shards
+_ALIAS_CACHE: dict[Path, tuple[tuple[int, int] | None, list[tuple[list[str], str]]]] = {}
+
+
+def _file_host_aliases(config_file: Path) -> list[tuple[list[str], str]]:
+    version = file_version(config_file)
+    cached = _ALIAS_CACHE.get(config_file)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    try:
+        f = config_file.open(encoding="utf-8", errors="replace")
+    except OSError:
+        _ALIAS_CACHE.pop(config_file, None)
+        return []
+    segments: list[tuple[list[str], str]] = []
+    aliases: list[str] = []
+    with f:
+        for raw_line in f:
+            if raw_line.startswith("Host"):
+                m = _HOST_ANY_RE.match(raw_line.rstrip("\r\n"))
+                if m:
+                    aliases.extend(m.group("aliases").split())
+            elif raw_line.lstrip()[:7].lower() == "include":
+                m = _INCLUDE_RE.match(raw_line.rstrip("\r\n"))
+                if m:
+                    segments.append((aliases, m.group("paths")))
+                    aliases = []
+    segments.append((aliases, ""))
+    _ALIAS_CACHE[config_file] = (version, segments)
+    return segments
+
+
+# forgets every parsed config, the next load_host_aliases reads its files again
+def clear_alias_cache() -> None:
+    _ALIAS_CACHE.clear()
+
+
+@traced("config.load_host_aliases", "parse")
+def load_host_aliases(config_file: Path, *, _depth: int = 0) -> list[str]:
+    aliases: list[str] = []
+    for found, include in _file_host_aliases(config_file):
+        aliases.extend(found)
+        if include and _depth < _MAX_INCLUDE_DEPTH:
+            for path in _include_paths(include, config_file.parent):
+                aliases.extend(load_host_aliases(path, _depth=_depth + 1))
     return aliases
 
 
-def find_aliases_for_nickname(nickname_upper: str, aliases: Iterable[str], *, 
+def find_aliases_for_nickname(nickname_upper: str, hosts: HostTree | Iterable[str], *, 
                               delimiter: str = GROUP_DELIMITER) -> list[str]:
+    tree = hosts if isinstance(hosts, HostTree) else build_host_tree(hosts, delimiter=delimiter)
     needle = nickname_upper.upper()
+    matches = list(tree.by_alias.get(needle, []))
+    matches.extend(alias for alias in tree.by_leaf.get(needle, []) if alias.upper() != needle)
+    return matches
+
+
+# resolve an alias or nickname to host aliases without parsing the whole config,
+# returns immediately on an exact alias match, otherwise every alias whose nickname matches
+def resolve_host_alias(query: str, config_file: Path, *,
+                       delimiter: str = GROUP_DELIMITER) -> list[str]:
+    needle = query.upper()
     matches: list[str] = []
-    for alias in aliases:
-        if alias.upper() == needle:
-            matches.append(alias)
+    if not config_file.exists():
+        return matches
+
+    for line in iter_config_lines(config_file):
+        if not line.startswith("Host"):
             continue
-        if delimiter in alias:
-            member = alias.split(delimiter, 1)[1].upper()
-            if member == needle:
+        m = _HOST_ANY_RE.match(line)
+        if not m:
+            continue
+        for alias in m.group("aliases").split():
+            upper = alias.upper()
+            if upper == needle:
+                return [alias]
+            if delimiter in upper and upper.rsplit(delimiter, 1)[1] == needle:
                 matches.append(alias)
     return matches
 
 
+# the file holding the `Host <alias>` block, the config itself or one it includes (shards included),
+# None when there is none; edits go to this file so the block ssh reads first is the one changed
+def host_block_file(alias: str, config_file: Path, *, _depth: int = 0) -> Path | None:
+    try:
+        f = config_file.open(encoding="utf-8", errors="replace")
+    except OSError:
+        return None
+    with f:
+        for raw_line in f:
+            line = raw_line.rstrip("\r\n")
+            if line.startswith("Host"):
+                m = _HOST_EXACT_RE.match(line)
+                if m and m.group("alias") == alias:
+                    return config_file
+            elif _depth < _MAX_INCLUDE_DEPTH and line.lstrip()[:7].lower() == "include":
+                m = _INCLUDE_RE.match(line)
+                if m:
+                    for path in _include_paths(m.group("paths"), config_file.parent):
+                        found = host_block_file(alias, path, _depth=_depth + 1)
+                        if found is not None:
+                            return found
+    return None
+
+
 def host_entry_exists(alias: str, config_file: Path) -> bool:
-    if not config_file.exists():
-        return False
-    text = config_file.read_text(encoding="utf-8", errors="replace")
-    for line in text.splitlines():
-        m = _HOST_EXACT_RE.match(line)
-        if m and m.group("alias") == alias:
-            return True
-    return False
+    return host_block_file(alias, config_file) is not None
+
 
+# (hostname, port, HostKeyAlgorithms, KexAlgorithms, MACs, User) of a host, empty strings for unset values
+@traced("config.read_host_values", "parse")
+def read_host_values(alias: str, config_file: Path) -> tuple[str, str, str, str, str, str]:
+    # a sharded host is looked up in its own shard first, then in the whole config for hand-placed blocks
+    own_file = host_config_file(alias, config_file)
+    if own_file != config_file:
+        values = _read_file_host_values(alias, own_file)
+        if any(values):
+            return values
+    return _read_file_host_values(alias, config_file)
 
-def read_host_values(alias: str, config_file: Path) -> tuple[str, str, str, str, str]:
+
+def _read_file_host_values(alias: str, config_file: Path) -> tuple[str, str, str, str, str, str]:
     hostname = ""
     port = ""
     hostkey = ""
     kex = ""
     macs = ""
+    user = ""
 
     in_block = False
-    for raw_line in config_file.read_text(encoding="utf-8", errors="replace").splitlines():
+    for raw_line in iter_config_lines(config_file):
         host_m = _HOST_ANY_RE.match(raw_line)
         if host_m:
             exact = _HOST_EXACT_RE.match(raw_line)
@@ -93,96 +308,432 @@ def read_host_values(alias: str, config_file: Path) -> tuple[str, str, str, str,
             kex = value
         elif key == "macs":
             macs = value
+        elif key == "user":
+            user = value
+
+    return hostname, port, hostkey, kex, macs, user
+
+
+def is_host_pattern(alias: str) -> bool:
+    return alias.startswith("!") or "*" in alias or "?" in alias
+
+
+# the aliases of a `Host` line, None for any other line
+def host_line_aliases(line: str) -> list[str] | None:
+    m = _HOST_ANY_RE.match(line.rstrip("\r\n")) if line.startswith("Host") else None
+    return m.group("aliases").split() if m else None
+
+
+# (lower-cased keyword, value) of a setting line, None for blank and comment lines
+def config_setting(line: str) -> tuple[str, str] | None:
+    kv = _KEYVAL_RE.match(line)
+    return (kv.group("key").lower(), kv.group("value")) if kv else None
+
+
+# every concrete host in a config (and its includes) in one streaming pass, patterns like `Host *` are skipped
+def iter_host_entries(config_file: Path) -> Iterator[HostEntry]:
+    aliases: list[str] = []
+    values: dict[str, str] = {}
+
+    def _entries() -> Iterator[HostEntry]:
+        # ports and algorithm lists repeat across most hosts, interning keeps one copy of each
+        for alias in aliases:
+            if not is_host_pattern(alias):
+                yield HostEntry(
+                    alias=alias,
+                    hostname=values.get("hostname", ""),
+                    port=sys.intern(values.get("port", "")),
+                    hostkey_algorithms=sys.intern(values.get("hostkeyalgorithms", "")),
+                    kex_algorithms=sys.intern(values.get("kexalgorithms", "")),
+                    macs=sys.intern(values.get("macs", "")),
+                    user=sys.intern(values.get("user", "")),
+                )
+
+    for line in iter_config_lines(config_file):
+        host_m = _HOST_ANY_RE.match(line) if line.startswith("Host") else None
+        if host_m:
+            yield from _entries()
+            aliases = host_m.group("aliases").split()
+            values = {}
+            continue
+        if not aliases:
+            continue
+        kv = _KEYVAL_RE.match(line)
+        if kv:
+            values.setdefault(kv.group("key").lower(), kv.group("value"))
+    yield from _entries()
+
+
+# (start, end) character ranges of the single-alias `Host <alias>` blocks for the given aliases,
+# a block runs up to the next Host line but leaves a trailing run of column-0 comments to the block after it
+def _host_block_spans(text: str, aliases: set[str]) -> dict[str, list[tuple[int, int]]]:
+    spans: dict[str, list[tuple[int, int]]] = {}
+    if not aliases:
+        return spans
+
+    # a few aliases (the editor's case) are located with str.find, so finding a block costs
+    # a memory scan of the file rather than a Python step per Host line
+    starts: list[tuple[int, str]] = []
+    if len(aliases) <= _TARGETED_SEARCH_MAX:
+        for alias in aliases:
+            pos = text.find(alias)
+            while pos != -1:
+                line_start = text.rfind("\n", 0, pos) + 1
+                m = _HOST_LINE_RE.match(text, line_start)
+                if m and m.group("aliases") == alias:
+                    starts.append((line_start, alias))
+                pos = text.find(alias, text.find("\n", pos) + 1 or len(text))
+        starts.sort()
+    else:
+        starts = [(m.start(), m.group("aliases")) for m in _HOST_LINE_RE.finditer(text)
+                  if m.group("aliases") in aliases]
+
+    for start, alias in starts:
+        next_host = _HOST_LINE_RE.search(text, text.find("\n", start) + 1 or len(text))
+        end = next_host.start() if next_host else len(text)
+        spans.setdefault(alias, []).append((start, block_end(text, start, end)))
+    return spans
+
+
+def block_end(text: str, start: int, end: int) -> int:
+    tail = end
+    comment_at = -1
+    # walk back over blank lines and unindented comments at the end of the block, those introduce the
+    # next block; an indented comment is part of the block it sits in and goes with it
+    while tail > start:
+        line_start = text.rfind("\n", start, tail - 1) + 1
+        stripped = text[line_start:tail].strip()
+        if line_start <= start or (stripped and not text.startswith("#", line_start)):
+            break
+        if stripped:
+            comment_at = line_start
+        tail = line_start
+    return comment_at if comment_at != -1 else end
+
+
+# replacement for an existing block: managed keys are updated where they are, every other line stays
+def _patch_block(block: str, entry: HostEntry, newline: str = "\n") -> str:
+    wanted = {
+        "hostname": ("Hostname", entry.hostname),
+        "port": ("Port", entry.port),
+        "user": ("User", entry.user),
+        "hostkeyalgorithms": ("HostKeyAlgorithms", entry.hostkey_algorithms),
+        "kexalgorithms": ("KexAlgorithms", entry.kex_algorithms),
+        "macs": ("MACs", entry.macs),
+    }
+    lines = block.splitlines(True)
+    out = [f"Host {entry.alias}{newline}"]
+    last_setting = 1
+    for line in lines[1:]:
+        kv = _KEYVAL_RE.match(line) if not line.lstrip().startswith("#") else None
+        key = kv.group("key").lower() if kv else ""
+        if key in wanted:
+            name, value = wanted.pop(key)
+            if not value:
+                continue
+            indent = line[:len(line) - len(line.lstrip())] or "    "
+            line = f"{indent}{name} {value}{newline}"
+        out.append(line)
+        if line.strip():
+            last_setting = len(out)
+
+    missing = [f"    {name} {value}{newline}" for name, value in wanted.values() if value]
+    if missing and not out[last_setting - 1].endswith("\n"):
+        out[last_setting - 1] += newline
+    out[last_setting:last_setting] = missing
+    return "".join(out)
 
-    return hostname, port, hostkey, kex, macs
 
+def _splice(text: str, edits: list[tuple[int, int, str]]) -> str:
+    parts: list[str] = []
+    pos = 0
+    for start, end, replacement in sorted(edits):
+        parts.append(text[pos:start])
+        parts.append(replacement)
+        pos = end
+    parts.append(text[pos:])
+    return "".join(parts)
 
+
+@traced("config.remove_host_entry", "parse")
 def remove_host_entry(alias: str, config_file: Path) -> None:
+    config_file = host_config_file(alias, config_file)
     if not config_file.exists():
         return
 
-    lines = config_file.read_text(encoding="utf-8", errors="replace").splitlines(True)
+    text = read_config_text(config_file)
+    spans = _host_block_spans(text, {alias}).get(alias)
+    if not spans:
+        return
+    write_config_text(config_file, _splice(text, [(s, e, "") for s, e in spans]),
+                      note=f"remove {alias}", previous=text)
 
-    out: list[str] = []
-    skip = False
-    for line in lines:
-        exact = _HOST_EXACT_RE.match(line.rstrip("\n"))
-        any_host = _HOST_ANY_RE.match(line.rstrip("\n"))
 
-        if any_host:
-            if skip:
-                skip = False
-            if exact and exact.group("alias") == alias:
-                skip = True
-                continue
+# config text exactly as stored, without newline translation, so a CRLF config is written back CRLF
+def read_config_text(config_file: Path) -> str:
+    with config_file.open(encoding="utf-8", errors="surrogateescape", newline="") as f:
+        return f.read()
 
-        if skip:
-            continue
-        out.append(line)
 
-    _atomic_write_text(config_file, "".join(out))
+# the line ending text already uses, lines added to it are written with the same one
+def line_ending(text: str) -> str:
+    first = text.find("\n")
+    return "\r\n" if first > 0 and text[first - 1] == "\r" else "\n"
 
 
-def append_host_entry(entry: HostEntry, config_file: Path) -> None:
-    prefix = ""
-    if config_file.exists() and config_file.stat().st_size > 0:
-        text = config_file.read_text(encoding="utf-8", errors="replace")
-        if not text.endswith("\n"):
-            prefix = "\n\n"
-        elif not text.endswith("\n\n"):
-            prefix = "\n"
+# blank-line separator needed before appending a block to text
+def block_prefix(text: str, newline: str = "\n") -> str:
+    if not text:
+        return ""
+    if not text.endswith("\n"):
+        return newline * 2
+    if not text.endswith(newline * 2):
+        return newline
+    return ""
+
 
+def format_host_block(entry: HostEntry, newline: str = "\n") -> list[str]:
     block_lines = [
-        f"{prefix}Host {entry.alias}\n",
-        f"    Hostname {entry.hostname}\n",
-        f"    Port {entry.port}\n",
+        f"Host {entry.alias}{newline}",
+        f"    Hostname {entry.hostname}{newline}",
+        f"    Port {entry.port}{newline}",
     ]
 
+    if entry.user:
+        block_lines.append(f"    User {entry.user}{newline}")
     if entry.hostkey_algorithms:
-        block_lines.append(f"    HostKeyAlgorithms {entry.hostkey_algorithms}\n")
+        block_lines.append(f"    HostKeyAlgorithms {entry.hostkey_algorithms}{newline}")
     if entry.kex_algorithms:
-        block_lines.append(f"    KexAlgorithms {entry.kex_algorithms}\n")
+        block_lines.append(f"    KexAlgorithms {entry.kex_algorithms}{newline}")
     if entry.macs:
-        block_lines.append(f"    MACs {entry.macs}\n")
+        block_lines.append(f"    MACs {entry.macs}{newline}")
+    return block_lines
 
-    with config_file.open("a", encoding="utf-8", newline="") as f:
-        f.writelines(block_lines)
+
+def append_host_entry(entry: HostEntry, config_file: Path) -> None:
+    write_host_entries([entry], config_file, note=f"add {entry.alias}")
+
+
+# add or update many entries in one write per file: a sharded config only has the shards of the entries'
+# groups rewritten (see _write_file_entries), every other file is left alone
+@traced("config.write_host_entries", "parse")
+def write_host_entries(entries: Iterable[HostEntry], config_file: Path, *,
+                       replace: set[str] | None = None, note: str = "") -> None:
+    entries = list(entries)
+    note = note or f"write {len(entries)} host(s)"
+    sharded = is_sharded(config_file)
+    if not sharded:
+        _write_file_entries(entries, config_file, replace=replace or set(), note=note)
+        return
+
+    by_file: dict[Path, tuple[list[HostEntry], set[str]]] = {}
+    for entry in entries:
+        by_file.setdefault(host_config_file(entry.alias, config_file, sharded=True), ([], set()))[0].append(entry)
+    for alias in replace or ():
+        by_file.setdefault(host_config_file(alias, config_file, sharded=True), ([], set()))[1].add(alias)
+    for path, (file_entries, file_replace) in by_file.items():
+        _write_file_entries(file_entries, path, replace=file_replace, note=note)
+
+
+# an entry whose alias already has a block (listed in replace) is patched where it stands, other blocks
+# for aliases in replace are dropped and new entries appended, everything else is left byte for byte;
+# added and patched lines take the file's own line ending
+def _write_file_entries(entries: list[HostEntry], config_file: Path, *, replace: set[str], note: str) -> None:
+    text = read_config_text(config_file) if config_file.exists() else ""
+    newline = line_ending(text)
+    spans = _host_block_spans(text, replace)
+
+    edits: list[tuple[int, int, str]] = []
+    appended: list[str] = []
+    for entry in entries:
+        found = spans.pop(entry.alias, None)
+        if not found:
+            appended.append(block_prefix(appended[-1] if appended else text, newline))
+            appended.append("".join(format_host_block(entry, newline)))
+            continue
+        start, end = found[0]
+        edits.append((start, end, _patch_block(text[start:end], entry, newline)))
+        edits.extend((s, e, "") for s, e in found[1:])
+    for found in spans.values():
+        edits.extend((s, e, "") for s, e in found)
+
+    if not edits and not appended:
+        return
+    if not edits and text:
+        append_config_text(config_file, "".join(appended), note=note, previous=text)
+        return
+
+    content = _splice(text, edits)
+    if appended:
+        appended[0] = block_prefix(content, newline)
+    write_config_text(config_file, content + "".join(appended), note=note, previous=text)
 
 
 def upsert_host_entry(entry: HostEntry, config_file: Path) -> None:
-    remove_host_entry(entry.alias, config_file)
-    append_host_entry(entry, config_file)
+    write_host_entries([entry], config_file, replace={entry.alias}, note=f"save {entry.alias}")
 
 
-# writes to a temporary config file and then moves it to the target path
-def _atomic_write_text(path: Path, content: str) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True) # use ensure_config_file?
-    with NamedTemporaryFile("w", delete=False, encoding="utf-8", newline="") as tmp:
-        tmp.write(content)
-        tmp_path = Path(tmp.name)
-    tmp_path.replace(path)
+def _record_baseline(config_file: Path, previous: str | None) -> None:
+    try:
+        record_baseline(config_file, content=previous)
+    except OSError:
+        pass
 
 
-def categorize_hosts(hosts: Iterable[str], *, 
-                         delimiter: str = GROUP_DELIMITER) -> CategorizedHosts:
-    main_hosts: list[str] = []
-    grouped: dict[str, list[str]] = {}
+def _record_snapshot(config_file: Path, content: str, note: str) -> None:
+    try:
+        record_snapshot(config_file, content, note=note)
+    except OSError:
+        pass
+
+
+# every config rewrite goes through here so it can be listed and undone with addhost history/undo,
+# a broken snapshot store never blocks the write itself; previous is the text the edit was based on
+def write_config_text(config_file: Path, content: str, *, note: str = "", previous: str | None = None) -> None:
+    _record_baseline(config_file, previous)
+    atomic_write_text(config_file, content)
+    _record_snapshot(config_file, content, note)
+
+
+# pure additions go straight onto the end of the file, the only edit where an in-place write is safe:
+# an interrupted append leaves every existing block intact
+def append_config_text(config_file: Path, addition: str, *, note: str = "", previous: str) -> None:
+    _record_baseline(config_file, previous)
+    with config_file.open("a", encoding="utf-8", errors="surrogateescape", newline="") as f:
+        f.write(addition)
+        f.flush()
+        os.fsync(f.fileno())
+    _record_snapshot(config_file, previous + addition, note)
+
+
+# writes a temporary file next to the target (so the rename stays on one filesystem), syncs it,
+# keeps the target's permissions and then renames it over the target; config text is read with
+# surrogateescape wherever it is written back, so bytes that aren't UTF-8 come out unchanged
+def atomic_write_text(path: Path, content: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True) # use ensure_config_file?
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    tmp_path = Path(tmp_name)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", errors="surrogateescape", newline="") as tmp:
+            tmp.write(content)
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        try:
+            shutil.copymode(path, tmp_path)
+        except OSError:
+            pass
+        tmp_path.replace(path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    _fsync_dir(path.parent)
+
+
+def _fsync_dir(directory: Path) -> None:
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return  # directories cannot be opened on Windows
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+# split an alias into its group path and the host's own name, groups are the leading lowercase
+# alphanumeric segments of an alias (site.cluster.NODE -> site.cluster, NODE)
+def split_alias(alias: str, *, delimiter: str = GROUP_DELIMITER) -> tuple[str, str]:
+    if delimiter not in alias:
+        return "", alias
+    parts = alias.split(delimiter)
+    depth = 0
+    while depth < len(parts) - 1 and _GROUP_RE.fullmatch(parts[depth]):
+        depth += 1
+    leaf = delimiter.join(parts[depth:])
+    if not leaf:
+        return "", alias
+    return delimiter.join(parts[:depth]), leaf
+
+
+# one pass over the aliases building the group hierarchy (see split_alias)
+def build_host_tree(hosts: Iterable[str], *,
+                    delimiter: str = GROUP_DELIMITER) -> HostTree:
+    root = GroupNode()
+    by_alias = AliasIndex()
+    by_leaf = AliasIndex()
 
     for host in hosts:
-        if delimiter in host:
-            group, member = host.split(delimiter, 1)
-            if group and member and re.fullmatch(r"[a-z0-9]+", group):
-                grouped.setdefault(group, []).append(host)
-                continue
-        main_hosts.append(host)
+        # nicknames are usually upper case already, then the alias itself is the key
+        key = host.upper()
+        by_alias.add(host if key == host else key, host)
+        if delimiter not in host:
+            root.count += 1
+            root.hosts.append(host)
+            continue
+
+        by_leaf.add(host.rsplit(delimiter, 1)[1].upper(), host)
+
+        group_path, _ = split_alias(host, delimiter=delimiter)
+        node = root
+        node.count += 1
+        if group_path:
+            parts = group_path.split(delimiter)
+            for i, part in enumerate(parts):
+                child = node.children.get(part)
+                if child is None:
+                    child = GroupNode(name=sys.intern(part), path=delimiter.join(parts[:i + 1]))
+                    node.children[part] = child
+                node = child
+                node.count += 1
+        node.hosts.append(host)
+
+    return HostTree(root=root, by_alias=by_alias, by_leaf=by_leaf)
 
-    main_hosts = sorted(main_hosts, key=str.casefold)
-    group_names = sorted(grouped.keys())
-    for g in group_names:
-        grouped[g] = sorted(grouped[g], key=str.casefold)
 
+def find_group(tree: HostTree, path: str, *,
+               delimiter: str = GROUP_DELIMITER) -> GroupNode | None:
+    node: GroupNode | None = tree.root
+    for part in path.split(delimiter):
+        node = node.children.get(part) if node is not None else None
+    return node if node is not tree.root else None
+
+
+class GroupMap(Mapping[str, list[str]]):
+    """Group path (e.g. `site` or `site.cluster`) -> sorted aliases in it and below it.
+
+    Member lists are only built for the groups that are looked up.
+    """
+
+    def __init__(self, tree: HostTree, *, delimiter: str = GROUP_DELIMITER) -> None:
+        self._tree = tree
+        self._delimiter = delimiter
+
+    def __getitem__(self, path: str) -> list[str]:
+        node = find_group(self._tree, path, delimiter=self._delimiter)
+        if node is None:
+            raise KeyError(path)
+        return node.all_hosts()
+
+    def __iter__(self) -> Iterator[str]:
+        stack = list(reversed(self._tree.root.sorted_children()))
+        while stack:
+            node = stack.pop()
+            yield node.path
+            stack.extend(reversed(node.sorted_children()))
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+@traced("config.categorize_hosts", "parse")
+def categorize_hosts(hosts: Iterable[str], *, 
+                         delimiter: str = GROUP_DELIMITER) -> CategorizedHosts:
+    tree = build_host_tree(hosts, delimiter=delimiter)
     return CategorizedHosts(
-        main_hosts=main_hosts,
-        group_map=grouped,
-        group_names=group_names,
+        main_hosts=tree.root.sorted_hosts(),
+        group_map=GroupMap(tree, delimiter=delimiter),
+        group_names=[child.name for child in tree.root.sorted_children()],
+        tree=tree,
     )
@@ -1,17 +1,24 @@
 from __future__ import annotations
 
+import errno
 import os
+import random
 import select
 import socket
 import subprocess
+import time
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Literal
+from typing import Callable, Literal
 
 from .ansi import clear_screen, Ansi, set_title
-from .prompting import prompt_text
+from .keys import raw_keys_available, raw_mode, read_key, wait_for_key_or_writable
+from .prompting import prompt_text, prompt_yes_no
 from .types import Transport
 from .config_utils import read_host_values
+from .usage_store import last_user, record_connection, remember_user
 from .menu_utils import format_host_display
+from .tracing import span, traced
 
 
 _RC_SUCCESS = 0
@@ -23,6 +30,14 @@ _RC_LOOKUP_FAILURE = -2
 
 _CONNECT_TIMEOUT_SECONDS = 10
 
+# wait-until-up polling: each probe gets a few seconds, the pause between probes doubles up to the cap
+_WAIT_PROBE_SECONDS = 3.0
+_WAIT_FIRST_DELAY = 2.0
+_WAIT_MAX_DELAY = 30.0
+
+# connect_ex results meaning the non-blocking connect is still in progress
+_CONNECT_PENDING = {errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EAGAIN, getattr(errno, "WSAEWOULDBLOCK", 10035)}
+
 
 def _parse_port(port_text: str, default: int) -> int:
     try:
@@ -31,6 +46,7 @@ def _parse_port(port_text: str, default: int) -> int:
         return default
 
 
+@traced("connect.tcp", "probe")
 def _tcp_connect_with_countdown(hostname: str, port: int, timeout_seconds: int) -> int:
     """Attempt a TCP connect with a simple countdown.
 
@@ -49,7 +65,8 @@ def _tcp_connect_with_countdown(hostname: str, port: int, timeout_seconds: int)
 
     try:
         # resolve once up front so obvious failures are immediate
-        addrinfos = socket.getaddrinfo(hostname, port, type=socket.SOCK_STREAM)
+        with span("connect.resolve", "resolve", host=hostname):
+            addrinfos = socket.getaddrinfo(hostname, port, type=socket.SOCK_STREAM)
     except KeyboardInterrupt:
         _clear_status_line()
         return _RC_CANCELLED
@@ -114,8 +131,128 @@ def _tcp_connect_with_countdown(hostname: str, port: int, timeout_seconds: int)
     return last_err
 
 
+def _format_elapsed(seconds: float) -> str:
+    minutes, secs = divmod(int(seconds), 60)
+    return f"{minutes}m{secs:02d}s" if minutes else f"{secs}s"
+
+
+# non-blocking connects to every address of hostname, an unresolvable name gives no sockets
+def _start_probes(hostname: str, port: int) -> list[socket.socket]:
+    try:
+        with span("connect.resolve", "resolve", host=hostname):
+            addrinfos = socket.getaddrinfo(hostname, port, type=socket.SOCK_STREAM)
+    except OSError:
+        return []
+    return connect_probes(addrinfos)
+
+
+# non-blocking connects to every resolved address, a socket turns writable once its connect finishes
+def connect_probes(addrinfos: list[tuple]) -> list[socket.socket]:
+    socks: list[socket.socket] = []
+    for family, socktype, proto, _, sockaddr in addrinfos:
+        try:
+            sock = socket.socket(family, socktype, proto)
+        except OSError:
+            continue
+        sock.setblocking(False)
+        try:
+            err = sock.connect_ex(sockaddr)
+        except OSError:
+            err = 1
+        # an immediate refusal is reported here, not through SO_ERROR later
+        if err != 0 and err not in _CONNECT_PENDING:
+            sock.close()
+            continue
+        socks.append(sock)
+    return socks
+
+
+@traced("connect.wait_until_up", "probe")
+def _wait_until_up(hostname: str, port: int) -> int:
+    """Poll a host until its port accepts connections, backing off between attempts.
+
+    Returns:
+      _RC_SUCCESS as soon as a probe connects
+      _RC_CANCELLED on any key (on a terminal) or Ctrl-C
+    """
+    display_host = f"{Ansi.GREEN}{hostname}{Ansi.RESET}:{Ansi.MAGENTA}{port}{Ansi.RESET}"
+    cancel_hint = "press any key to cancel" if raw_keys_available() else "Ctrl-C to cancel"
+    started = time.monotonic()
+    delay = _WAIT_FIRST_DELAY
+    attempt = 0
+
+    def _status(state: str) -> None:
+        elapsed = _format_elapsed(time.monotonic() - started)
+        print(f"\r\033[2KWaiting for {display_host} to come up... {elapsed} elapsed, {state} ({cancel_hint})",
+              end="", flush=True)
+
+    # sleeps in one second steps (to keep the elapsed time current) until the deadline, a key or a socket
+    def _wait(deadline: float, state: Callable[[], str], socks: list[socket.socket]) -> tuple[bool, list]:
+        while (left := deadline - time.monotonic()) > 0:
+            _status(state())
+            pressed, writable = wait_for_key_or_writable(min(1.0, left), socks)
+            if pressed or writable:
+                return pressed, writable
+        return False, []
+
+    try:
+        with raw_mode() if raw_keys_available() else nullcontext():
+            while True:
+                attempt += 1
+                socks = _start_probes(hostname, port)
+                try:
+                    deadline = time.monotonic() + _WAIT_PROBE_SECONDS
+                    while socks:
+                        pressed, writable = _wait(deadline, lambda: f"attempt {attempt}", socks)
+                        if pressed:
+                            read_key()
+                            return _RC_CANCELLED
+                        if not writable:
+                            break
+                        for sock in writable:
+                            if sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) == 0:
+                                return _RC_SUCCESS
+                            socks.remove(sock)
+                            sock.close()
+                finally:
+                    for sock in socks:
+                        sock.close()
+
+                # equal jitter: at least half the backoff, so many waiting clients don't probe in lockstep
+                pause = delay / 2 + random.uniform(0, delay / 2)
+                delay = min(delay * 2, _WAIT_MAX_DELAY)
+                next_at = time.monotonic() + pause
+                pressed, _ = _wait(next_at, lambda: f"next attempt in {max(0, next_at - time.monotonic()):.0f}s", [])
+                if pressed:
+                    read_key()
+                    return _RC_CANCELLED
+    except KeyboardInterrupt:
+        return _RC_CANCELLED
+    finally:
+        print("\r\033[2K", end="", flush=True)
+
+
+# connect once with the countdown, on a terminal a host that is down (timeout or refused) can then be
+# waited for; with wait it is polled until up straight away
+def _reach_host(host_alias: str, hostname: str, port: int, timeout_seconds: int, *, wait: bool) -> int:
+    if wait:
+        return _wait_until_up(hostname, port)
+    rc = _tcp_connect_with_countdown(hostname, port, timeout_seconds)
+    if rc in (_RC_SUCCESS, _RC_CANCELLED, _RC_LOOKUP_FAILURE) or not raw_keys_available():
+        return rc
+
+    print()
+    reason = "did not answer" if rc == _RC_TIMEOUT else "refused the connection"
+    try:
+        if not prompt_yes_no(f"{format_host_display(host_alias)} {reason}. Wait until it is up and connect?"):
+            return rc
+    except KeyboardInterrupt:
+        return _RC_CANCELLED
+    return _wait_until_up(hostname, port)
+
+
 # get MSYS2 ssh/telnet executable path if available, else default to windows version
-def _msys2_exe(name: str) -> str:
+def msys2_exe(name: str) -> str:
     usr_bin = os.environ.get("MSYS2_USR_BIN")
     if usr_bin:
         candidate = Path(usr_bin) / f"{name}.exe"
@@ -125,11 +262,20 @@ def _msys2_exe(name: str) -> str:
 
 
 def ssh_connect(host_alias: str, hostname: str, port: str, *, 
-                timeout_seconds: int = _CONNECT_TIMEOUT_SECONDS) -> int:
-    try:
-        user = prompt_text(f"{Ansi.MAGENTA}login{Ansi.RESET} as: ").strip()
-    except KeyboardInterrupt:
-        return _RC_CANCELLED
+                timeout_seconds: int = _CONNECT_TIMEOUT_SECONDS, user: str = "", wait: bool = False) -> int:
+    if not user:
+        default = last_user(host_alias)
+        prompt = f"{Ansi.MAGENTA}login{Ansi.RESET} as"
+        prompt += f" [{Ansi.GREEN}{default}{Ansi.RESET}]: " if default else ": "
+        try:
+            user = prompt_text(prompt).strip() or default
+        except KeyboardInterrupt:
+            return _RC_CANCELLED
+        if user:
+            try:
+                remember_user(host_alias, user)
+            except OSError:
+                pass
     if not user:
         return _RC_USERNAME_REQUIRED
 
@@ -138,15 +284,18 @@ def ssh_connect(host_alias: str, hostname: str, port: str, *,
     print(f"Connecting to {display_host} as {Ansi.MAGENTA}{user}{Ansi.RESET}...")
     set_title(f"{user}@{host_alias}")
     try:
-        rc = _tcp_connect_with_countdown(hostname, _parse_port(port, 22), timeout_seconds)
+        rc = _reach_host(host_alias, hostname, _parse_port(port, 22), timeout_seconds, wait=wait)
         if rc != _RC_SUCCESS:
             print()
             return rc
 
-        ssh_exe = _msys2_exe("ssh")
+        ssh_exe = msys2_exe("ssh")
         try:
             ssh_args = [ssh_exe, "-o", f"ConnectTimeout={timeout_seconds}", f"{user}@{host_alias}"]
-            result = subprocess.run(ssh_args)
+            # the whole session: ssh's handshake can't be told apart from the time spent logged in
+            with span("spawn.ssh", "spawn", host=host_alias) as spawned:
+                result = subprocess.run(ssh_args)
+                spawned.set(rc=result.returncode)
             return result.returncode
         except KeyboardInterrupt:
             return _RC_CANCELLED
@@ -155,21 +304,23 @@ def ssh_connect(host_alias: str, hostname: str, port: str, *,
 
 
 def telnet_connect(host_alias: str, hostname: str, port: str, *, 
-                   timeout_seconds: int = _CONNECT_TIMEOUT_SECONDS) -> int:
+                   timeout_seconds: int = _CONNECT_TIMEOUT_SECONDS, wait: bool = False) -> int:
 
     clear_screen()
     display_host = format_host_display(host_alias)
     print(f"Connecting to {display_host} via telnet...")
     set_title(f"telnet:{host_alias}")
     try:
-        rc = _tcp_connect_with_countdown(hostname, _parse_port(port, 23), timeout_seconds)
+        rc = _reach_host(host_alias, hostname, _parse_port(port, 23), timeout_seconds, wait=wait)
         if rc != _RC_SUCCESS:
             print()
             return rc
-        telnet_exe = _msys2_exe("telnet")
+        telnet_exe = msys2_exe("telnet")
         try:
             telnet_args = [telnet_exe, hostname, str(port or "23")]
-            result = subprocess.run(telnet_args)
+            with span("spawn.telnet", "spawn", host=host_alias) as spawned:
+                result = subprocess.run(telnet_args)
+                spawned.set(rc=result.returncode)
             return result.returncode
         except KeyboardInterrupt:
             return _RC_CANCELLED
@@ -178,25 +329,30 @@ def telnet_connect(host_alias: str, hostname: str, port: str, *,
 
 
 def attempt_connection(host_label: str, transport: Transport, *, 
-                       last_msg_out: list[str]) -> bool:
+                       last_msg_out: list[str], user: str = "", wait: bool = False) -> bool:
     
-    hostname, port, *_ = read_host_values(host_label, transport.config_file)
+    hostname, port, *_, config_user = read_host_values(host_label, transport.config_file)
     if not hostname:
         msg = _RC_NO_HOSTNAME
         return False
 
     if transport.key == "ssh":
-        rc = ssh_connect(host_label, hostname, port, timeout_seconds=_CONNECT_TIMEOUT_SECONDS)
+        rc = ssh_connect(host_label, hostname, port, timeout_seconds=_CONNECT_TIMEOUT_SECONDS, user=user or config_user, wait=wait)
         msg = _message_for_connect_rc(
             rc, host_label, protocol="ssh", timeout_seconds=_CONNECT_TIMEOUT_SECONDS
         )
     else:
-        rc = telnet_connect(host_label, hostname, port, timeout_seconds=_CONNECT_TIMEOUT_SECONDS)
+        rc = telnet_connect(host_label, hostname, port, timeout_seconds=_CONNECT_TIMEOUT_SECONDS, wait=wait)
         msg = _message_for_connect_rc(
             rc, host_label, protocol="telnet", timeout_seconds=_CONNECT_TIMEOUT_SECONDS
         )
 
     last_msg_out[:] = [""] if msg is None else msg
+    if rc == _RC_SUCCESS:
+        try:
+            record_connection(transport.key, host_label)
+        except OSError:
+            pass
     return rc == _RC_SUCCESS
 
 
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from .ansi import Ansi
+from .config_paths import ssh_config, telnet_config
+from .config_utils import resolve_host_alias
+from .connection import attempt_connection
+from .types import ConnectRequest, Transport
+
+
+_RC_OK = 0
+_RC_FAILED = 1
+_RC_USAGE = 2
+
+
+# parse `[--ssh|--telnet] [--wait] [-l user] <alias-or-nickname>`, returns None on bad usage
+def parse_connect_args(args: list[str]) -> ConnectRequest | None:
+    transport_key = ""
+    user = ""
+    query = ""
+    wait = False
+
+    it = iter(args)
+    for arg in it:
+        if arg in ("--ssh", "--telnet"):
+            if transport_key:
+                return None
+            transport_key = arg[2:]
+        elif arg in ("-w", "--wait"):
+            wait = True
+        elif arg == "-l":
+            user = next(it, "")
+            if not user:
+                return None
+        elif arg.startswith("-l") and len(arg) > 2:
+            user = arg[2:]
+        elif arg.startswith("-") or query:
+            return None
+        else:
+            query = arg
+
+    if not query:
+        return None
+    return ConnectRequest(query=query, transport_key=transport_key, user=user, wait=wait)
+
+
+def _candidate_transports(transport_key: str) -> list[Transport]:
+    if transport_key == "ssh":
+        return [ssh_config()]
+    if transport_key == "telnet":
+        return [telnet_config()]
+    return [ssh_config(), telnet_config()]
+
+
+# connect straight to a host from the command line, skipping the transport and host menus
+def run_direct_connect(args: list[str]) -> int:
+    request = parse_connect_args(args)
+    if request is None:
+        print("Usage: vmsmenu [--ssh|--telnet] [--wait] [-l user] <alias-or-nickname>")
+        return _RC_USAGE
+
+    for transport in _candidate_transports(request.transport_key):
+        matches = resolve_host_alias(request.query, transport.config_file)
+        if not matches:
+            continue
+        if len(matches) > 1:
+            print(f"{Ansi.RED}{request.query.upper()} matches multiple {transport.label} hosts:{Ansi.RESET}")
+            for alias in matches:
+                print(f"  {Ansi.GREEN}{alias}{Ansi.RESET}")
+            return _RC_USAGE
+
+        last_msg = [""]
+        if attempt_connection(matches[0], transport, last_msg_out=last_msg, user=request.user, wait=request.wait):
+            return _RC_OK
+        print(f"{Ansi.RED}{last_msg[0] or f'Could not connect to {matches[0]}'}{Ansi.RESET}")
+        return _RC_FAILED
+
+    print(f"{Ansi.RED}No host matching {request.query.upper()} found.{Ansi.RESET}")
+    return _RC_FAILED
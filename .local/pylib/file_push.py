@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+
+from .ansi import Ansi, write_frame
+from .config_paths import ssh_config
+from .config_utils import categorize_hosts, iter_host_entries, load_host_aliases
+from .connection import msys2_exe
+from .menu_utils import format_host_display
+from .prompting import prompt_text
+from .tracing import span
+from .usage_store import last_user
+
+
+PUSH_USAGE = (
+    "Usage: vmsmenu --push [--sftp] [-l user] [-j JOBS] [--retries N] <group> <local-path>... <remote-path>"
+)
+
+_DEFAULT_JOBS = 8
+_DEFAULT_RETRIES = 2
+_RETRY_DELAY_SECONDS = 2.0
+_CONNECT_TIMEOUT_SECONDS = 10
+
+# how often the progress table is redrawn while transfers run
+_REDRAW_SECONDS = 0.5
+
+_STATE_COLORS = {
+    "waiting": "",
+    "sending": Ansi.MAGENTA,
+    "retrying": Ansi.YELLOW,
+    "done": Ansi.GREEN,
+    "failed": Ansi.RED,
+}
+
+
+@dataclass
+class _Transfer:
+    alias: str
+    state: str = "waiting"
+    attempts: int = 0
+    started: float = 0.0
+    finished: float = 0.0
+    error: str = ""
+
+    def elapsed(self, now: float) -> float:
+        if not self.started:
+            return 0.0
+        return (self.finished or now) - self.started
+
+
+def _local_size(paths: list[Path]) -> int:
+    total = 0
+    for path in paths:
+        if path.is_dir():
+            for root, _, files in os.walk(path):
+                total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+        else:
+            total += path.stat().st_size
+    return total
+
+
+def _format_bytes(count: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if count < 1024 or unit == "GB":
+            return f"{count:.0f} {unit}" if unit == "B" else f"{count:.1f} {unit}"
+        count /= 1024
+    return f"{count:.1f} GB"
+
+
+# scp/sftp arguments and the sftp batch script; BatchMode keeps parallel transfers from prompting over
+# each other, and ssh's own config applies, so a ControlMaster connection that is already up is reused
+def _transfer_command(alias: str, user: str, sources: list[Path], remote: str, *,
+                      sftp: bool) -> tuple[list[str], str | None]:
+    target = f"{user}@{alias}"
+    options = ["-o", "BatchMode=yes", "-o", f"ConnectTimeout={_CONNECT_TIMEOUT_SECONDS}"]
+    if sftp:
+        script = "".join(f'put -r "{source}" "{remote}"\n' for source in sources)
+        return [msys2_exe("sftp"), *options, "-b", "-", target], script
+    return [msys2_exe("scp"), "-q", "-r", *options, *map(str, sources), f"{target}:{remote}"], None
+
+
+def _run_transfer(transfer: _Transfer, command: list[str], script: str | None,
+                  retries: int, lock: threading.Lock, stop: threading.Event) -> None:
+    for attempt in range(1, retries + 2):
+        if stop.is_set():
+            break
+        with lock:
+            transfer.state = "sending"
+            transfer.attempts = attempt
+            transfer.started = transfer.started or time.monotonic()
+        try:
+            with span(f"spawn.{Path(command[0]).stem}", "spawn", host=transfer.alias, attempt=attempt) as spawned:
+                result = subprocess.run(command, input=script, capture_output=True, text=True)
+                spawned.set(rc=result.returncode)
+            rc, error = result.returncode, result.stderr.strip()
+        except OSError as e:
+            rc, error = 127, str(e)
+        if rc == 0:
+            with lock:
+                transfer.state = "done"
+                transfer.finished = time.monotonic()
+            return
+
+        with lock:
+            transfer.error = error.splitlines()[-1] if error else f"exited with {rc}"
+            transfer.state = "retrying" if attempt <= retries else "failed"
+        if attempt <= retries:
+            stop.wait(_RETRY_DELAY_SECONDS * 2 ** (attempt - 1))
+    with lock:
+        transfer.finished = time.monotonic()
+
+
+def _summary(transfers: list[_Transfer], total_bytes: int, started: float) -> str:
+    now = time.monotonic()
+    done = sum(t.state == "done" for t in transfers)
+    failed = sum(t.state == "failed" for t in transfers)
+    elapsed = max(now - started, 1e-6)
+    rate = done * total_bytes / elapsed
+    return (f"{done}/{len(transfers)} done, {failed} failed, {_format_bytes(done * total_bytes)} sent "
+            f"in {elapsed:.1f}s ({_format_bytes(rate)}/s)")
+
+
+def _row(transfer: _Transfer, now: float) -> str:
+    color = _STATE_COLORS.get(transfer.state, "")
+    state = f"{color}{transfer.state:<8}{Ansi.RESET}"
+    detail = f"{transfer.elapsed(now):5.1f}s" if transfer.started else ""
+    if transfer.attempts > 1:
+        detail += f"  attempt {transfer.attempts}"
+    if transfer.state in ("retrying", "failed") and transfer.error:
+        detail += f"  {transfer.error[:60]}"
+    return f"  {format_host_display(transfer.alias)}  {state} {detail}"
+
+
+# running and failed hosts first, so the ones worth watching stay on screen in a large group
+def _progress_frame(title: str, transfers: list[_Transfer], total_bytes: int, started: float) -> list[str]:
+    now = time.monotonic()
+    order = {"sending": 0, "retrying": 1, "failed": 2, "waiting": 3, "done": 4}
+    room = max(3, shutil.get_terminal_size().lines - 8)
+    shown = sorted(transfers, key=lambda t: order.get(t.state, 5))[:room]
+    lines = [title, "", *(_row(t, now) for t in shown)]
+    if len(transfers) > len(shown):
+        lines.append(f"  ... {len(transfers) - len(shown)} more")
+    lines += ["", _summary(transfers, total_bytes, started)]
+    return lines
+
+
+def run_push(args: list[str]) -> int:
+    sftp = False
+    user = ""
+    jobs, retries = _DEFAULT_JOBS, _DEFAULT_RETRIES
+    positional: list[str] = []
+    it = iter(args)
+    try:
+        for arg in it:
+            if arg == "--sftp":
+                sftp = True
+            elif arg == "-l":
+                user = next(it)
+            elif arg in ("-j", "--jobs"):
+                jobs = max(1, int(next(it)))
+            elif arg == "--retries":
+                retries = max(0, int(next(it)))
+            elif arg.startswith("-") and arg != "-":
+                raise ValueError(arg)
+            else:
+                positional.append(arg)
+        if len(positional) < 3:
+            raise ValueError("arguments")
+    except (StopIteration, ValueError):
+        print(PUSH_USAGE)
+        return 2
+
+    group, sources, remote = positional[0].lower(), [Path(p) for p in positional[1:-1]], positional[-1]
+    missing = [str(p) for p in sources if not p.exists()]
+    if missing:
+        print(f"{Ansi.RED}Not found: {', '.join(missing)}{Ansi.RESET}")
+        return 2
+
+    config_file = ssh_config().config_file
+    categorized = categorize_hosts(load_host_aliases(config_file))
+    aliases = categorized.group_map.get(group)
+    if not aliases:
+        print(f"{Ansi.RED}No SSH hosts in group {group.upper()}.{Ansi.RESET}")
+        return 1
+
+    # -l wins, then each host's own User (the first one set, as ssh reads it), the prompt only covers
+    # the hosts that have neither
+    users: dict[str, str] = {}
+    if not user:
+        for e in iter_host_entries(config_file):
+            if e.user:
+                users.setdefault(e.alias, e.user)
+    if not user and any(alias not in users for alias in aliases):
+        default = last_user("*")
+        prompt = f"{Ansi.MAGENTA}login{Ansi.RESET} as"
+        prompt += f" [{Ansi.GREEN}{default}{Ansi.RESET}]: " if default else ": "
+        user = prompt_text(prompt).strip() or default
+        if not user:
+            print("Error: username required")
+            return 2
+
+    total_bytes = _local_size(sources)
+    transfers = [_Transfer(alias) for alias in aliases]
+    lock = threading.Lock()
+    title = (f"Pushing {_format_bytes(total_bytes)} to {Ansi.MAGENTA}{remote}{Ansi.RESET} on {len(transfers)} host(s) "
+             f"in {Ansi.ORANGE}{group.upper()}{Ansi.RESET} over {'sftp' if sftp else 'scp'}, {min(jobs, len(transfers))} at a time")
+    live = sys.stdout.isatty()
+    if not live:
+        print(title)
+
+    started = time.monotonic()
+    stop = threading.Event()
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        pending = {
+            pool.submit(_run_transfer, t, *_transfer_command(t.alias, users.get(t.alias, user), sources, remote, sftp=sftp),
+                        retries, lock, stop)
+            for t in transfers
+        }
+        try:
+            _watch(pending, transfers, lock, live=live, title=title, total_bytes=total_bytes, started=started)
+        except KeyboardInterrupt:
+            # running scp/sftp get the Ctrl-C themselves, queued hosts and retries are dropped
+            stop.set()
+            pool.shutdown(cancel_futures=True)
+            print()
+
+    failed = [t for t in transfers if t.state != "done"]
+    print(_summary(transfers, total_bytes, started))
+    for t in failed:
+        print(f"{Ansi.RED}  {format_host_display(t.alias)}: {t.error or 'not sent'}{Ansi.RESET}")
+    return 1 if failed else 0
+
+
+def _watch(pending: set, transfers: list[_Transfer], lock: threading.Lock, *,
+           live: bool, title: str, total_bytes: int, started: float) -> None:
+    reported: dict[str, str] = {}
+    while True:
+        with lock:
+            if live:
+                write_frame(_progress_frame(title, transfers, total_bytes, started))
+            else:
+                # without a terminal only finished, failed and retried hosts are logged
+                for t in transfers:
+                    key = f"{t.state}{t.attempts}"
+                    if t.state in ("done", "failed", "retrying") and reported.get(t.alias) != key:
+                        reported[t.alias] = key
+                        print(_row(t, time.monotonic()))
+        if not pending:
+            return
+        _, pending = wait(pending, timeout=_REDRAW_SECONDS, return_when=FIRST_COMPLETED)
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import queue
+import socket
+import threading
+
+from .ansi import Ansi
+from .menu_utils import format_host_display
+from .types import HostEntry
+
+
+_DEFAULT_PORTS = {"ssh": "22", "telnet": "23"}
+_CHECK_TIMEOUT_SECONDS = 5
+_BANNER_MAX_BYTES = 255
+
+
+# resolve, connect and (for ssh) read the server banner, returns (ok, detail)
+def check_host(transport_key: str, hostname: str, port: str, *,
+               timeout: float = _CHECK_TIMEOUT_SECONDS) -> tuple[bool, str]:
+    port = port or _DEFAULT_PORTS.get(transport_key, "")
+    try:
+        infos = socket.getaddrinfo(hostname, int(port), type=socket.SOCK_STREAM)
+    except (OSError, ValueError):
+        return False, f"{hostname} does not resolve"
+    if not infos:
+        return False, f"{hostname} does not resolve"
+
+    family, socktype, proto, _, addr = infos[0]
+    try:
+        with socket.socket(family, socktype, proto) as sock:
+            sock.settimeout(timeout)
+            sock.connect(addr)
+            if transport_key != "ssh":
+                return True, f"port {port} open on {addr[0]}"
+            banner = sock.recv(_BANNER_MAX_BYTES).split(b"\n", 1)[0].decode("ascii", errors="replace").strip()
+    except socket.timeout:
+        return False, f"no answer from {addr[0]}:{port}"
+    except OSError as e:
+        return False, f"{addr[0]}:{port} {e.strerror or e}"
+
+    if not banner.startswith("SSH-"):
+        return False, f"{addr[0]}:{port} open but did not send an SSH banner"
+    return True, banner
+
+
+class HostChecker:
+    """Runs check_host for saved entries on daemon threads and collects the results."""
+
+    def __init__(self) -> None:
+        self.results: queue.SimpleQueue[str] = queue.SimpleQueue()
+        self.pending = 0
+        self.lock = threading.Lock()
+
+    def _run(self, transport_key: str, entry: HostEntry) -> None:
+        try:
+            ok, detail = check_host(transport_key, entry.hostname, entry.port)
+        except Exception as e:
+            ok, detail = False, f"check failed ({e})"
+        color = Ansi.GREEN if ok else Ansi.RED
+        self.results.put(f"Check {format_host_display(entry.alias)}: {color}{detail}{Ansi.RESET}")
+        with self.lock:
+            self.pending -= 1
+
+    # daemon threads so quitting the editor never waits on a slow host
+    def submit(self, transport_key: str, entry: HostEntry) -> None:
+        with self.lock:
+            self.pending += 1
+        threading.Thread(target=self._run, args=(transport_key, entry), daemon=True).start()
+
+    # finished results since the last call, plus a note for checks still running
+    def drain(self) -> list[str]:
+        lines: list[str] = []
+        while True:
+            try:
+                lines.append(self.results.get_nowait())
+            except queue.Empty:
+                break
+        with self.lock:
+            pending = self.pending
+        if pending:
+            lines.append(f"{Ansi.YELLOW}{pending} host check(s) still running...{Ansi.RESET}")
+        return lines
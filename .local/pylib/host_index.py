@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import ipaddress
+import mmap
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+from .ansi import Ansi
+from .config_paths import concrete_transports, state_dir
+from .config_utils import atomic_write_text, config_version, iter_host_entries, split_alias
+from .types import Transport
+
+
+FIND_USAGE = (
+    "Usage: find [--ssh|--telnet] <query>\n"
+    "  query: an IP, a CIDR range (10.1.0.0/16), a hostname or part of one, a port,\n"
+    "         an algorithm, or host:/ip:/port:/algo: followed by a value to pick the kind"
+)
+
+_DEFAULT_PORTS = {"ssh": "22", "telnet": "23"}
+
+_HEADER = "# vmsmenu host index v1\t"
+
+# key prefixes, one sorted run each: hostnames, IPv4 and IPv6 addresses (fixed-width hex, so text
+# order is numeric order and a CIDR range is one contiguous run), ports (zero-padded) and algorithms
+_HOST, _IPV4, _IPV6, _PORT, _ALGO = "h:", "4:", "6:", "p:", "a:"
+
+
+@dataclass(frozen=True, slots=True)
+class HostMatch:
+    alias: str
+    transport: str
+    hostname: str
+    port: str
+    matched: str  # the indexed value the query hit
+
+
+def index_file() -> Path:
+    return state_dir() / "host_index"
+
+
+def _versions(transports: list[Transport]) -> str:
+    return ";".join(f"{t.key}={t.config_file}={config_version(t.config_file)}" for t in transports)
+
+
+def _address_key(value: str) -> str | None:
+    try:
+        ip = ipaddress.ip_address(value)
+    except ValueError:
+        return None
+    if ip.version == 4:
+        return f"{_IPV4}{int(ip):08x}"
+    return f"{_IPV6}{int(ip):032x}"
+
+
+def _algorithms(*lists: str) -> set[str]:
+    return {a.lstrip("+-^").lower() for value in lists for a in value.split(",") if a.strip("+-^ ")}
+
+
+# one line per indexed value: key, alias, transport, hostname, port; sorted, so lookups are binary searches
+def build_index(transports: list[Transport]) -> str:
+    lines: list[str] = []
+    for transport in transports:
+        if not transport.config_file.exists():
+            continue
+        for e in iter_host_entries(transport.config_file):
+            port = e.port or _DEFAULT_PORTS.get(transport.key, "")
+            row = f"\t{e.alias}\t{transport.key}\t{e.hostname}\t{port}\n"
+            if e.hostname:
+                lines.append((_address_key(e.hostname) or f"{_HOST}{e.hostname.lower()}") + row)
+            if port.isdigit():
+                lines.append(f"{_PORT}{int(port):05d}{row}")
+            lines.extend(f"{_ALGO}{algo}{row}" for algo in _algorithms(e.hostkey_algorithms, e.kex_algorithms, e.macs))
+    lines.sort()
+    return "".join(lines)
+
+
+class HostIndex:
+    """Sorted index file over the parsed configs, searched in place through mmap without loading it."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    @classmethod
+    def open(cls, transports: list[Transport] | None = None) -> HostIndex:
+        transports = transports or concrete_transports()
+        path = index_file()
+        header = _HEADER + _versions(transports) + "\n"
+        try:
+            with path.open(encoding="utf-8") as f:
+                current = f.readline() == header
+        except OSError:
+            current = False
+        # rebuilt whenever a config (or one of its shards) changed since the index was written
+        if not current:
+            atomic_write_text(path, header + build_index(transports))
+        return cls(path)
+
+    # lines with keys from low to high (inclusive), just low when no high is given
+    def _scan(self, low: str, high: str | None = None) -> Iterator[tuple[str, list[str]]]:
+        lo_key, hi_key = low.encode("utf-8"), (high or low).encode("utf-8")
+        with self.path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pos = _seek(mm, mm.find(b"\n") + 1, lo_key)
+            while pos < len(mm):
+                end = mm.find(b"\n", pos)
+                end = len(mm) if end == -1 else end
+                line = mm[pos:end]
+                if line.split(b"\t", 1)[0] > hi_key:
+                    return
+                key, *fields = line.decode("utf-8").split("\t")
+                yield key, fields
+                pos = end + 1
+
+    # hostnames containing text, found with a memory search of the hostname run rather than line by line
+    def _substring(self, text: str) -> Iterator[tuple[str, list[str]]]:
+        needle = text.lower().encode("utf-8")
+        with self.path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            body = mm.find(b"\n") + 1
+            pos, end = _seek(mm, body, _HOST.encode()), _seek(mm, body, b"h;")
+            while (pos := mm.find(needle, pos, end)) != -1:
+                start = mm.rfind(b"\n", 0, pos) + 1
+                line_end = mm.find(b"\n", pos)
+                # only a hit inside the hostname counts, not one in the alias after it
+                if pos + len(needle) <= mm.find(b"\t", start, line_end):
+                    key, *fields = mm[start + len(_HOST):line_end].decode("utf-8").split("\t")
+                    yield _HOST + key, fields
+                pos = line_end + 1
+
+    def find(self, query: str) -> list[HostMatch]:
+        hits = list(self._lookup(query.strip()))
+        seen: set[tuple[str, str]] = set()
+        matches: list[HostMatch] = []
+        for key, (alias, transport, hostname, port) in hits:
+            if (alias, transport) in seen:
+                continue
+            seen.add((alias, transport))
+            matches.append(HostMatch(alias, transport, hostname, port, _describe(key)))
+        return matches
+
+    def _lookup(self, query: str) -> Iterator[tuple[str, list[str]]]:
+        kind, _, value = query.partition(":")
+        kind = kind.lower()
+        if value and kind in ("host", "ip", "port", "algo"):
+            query = value
+        else:
+            kind = ""
+
+        if kind in ("", "ip") and "/" in query:
+            try:
+                net = ipaddress.ip_network(query, strict=False)
+            except ValueError:
+                net = None
+            if net is not None:
+                prefix = _IPV4 if net.version == 4 else _IPV6
+                width = 8 if net.version == 4 else 32
+                yield from self._scan(f"{prefix}{int(net.network_address):0{width}x}",
+                                      f"{prefix}{int(net.broadcast_address):0{width}x}")
+                return
+        address = _address_key(query) if kind in ("", "ip", "host") else None
+        if address is not None:
+            yield from self._scan(address)
+            return
+        if kind == "port" or (not kind and query.isdigit()):
+            if query.isdigit():
+                yield from self._scan(f"{_PORT}{int(query):05d}")
+            return
+        if kind == "algo":
+            yield from self._scan(f"{_ALGO}{query.lower()}")
+            return
+
+        # a name: exact hostname first, then an algorithm of that name, then hostnames containing it
+        exact = list(self._scan(f"{_HOST}{query.lower()}"))
+        if exact:
+            yield from exact
+            return
+        if not kind:
+            algos = list(self._scan(f"{_ALGO}{query.lower()}"))
+            if algos:
+                yield from algos
+                return
+        yield from self._substring(query)
+
+
+# offset of the first line whose key sorts at or after key, by bisecting line starts in the mapped file
+def _seek(mm: mmap.mmap, lo: int, key: bytes) -> int:
+    hi = len(mm)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        start = mm.rfind(b"\n", lo, mid) + 1 or lo
+        end = mm.find(b"\n", start)
+        end = len(mm) if end == -1 else end
+        if mm[start:end].split(b"\t", 1)[0] < key:
+            lo = end + 1
+        else:
+            hi = start
+    return lo
+
+
+def _describe(key: str) -> str:
+    kind, value = key[:2], key[2:]
+    if kind == _IPV4:
+        return str(ipaddress.IPv4Address(int(value, 16)))
+    if kind == _IPV6:
+        return str(ipaddress.IPv6Address(int(value, 16)))
+    if kind == _PORT:
+        return f"port {int(value)}"
+    if kind == _ALGO:
+        return f"algorithm {value}"
+    return value
+
+
+def format_match(match: HostMatch) -> str:
+    group, _ = split_alias(match.alias)
+    line = f"{Ansi.GREEN}{match.alias.upper()}{Ansi.RESET} [{match.transport.upper()}] {match.hostname}:{match.port}"
+    if group:
+        line += f"  {Ansi.ORANGE}{group.upper()} CLUSTER{Ansi.RESET}"
+    if match.matched not in (match.hostname.lower(), match.hostname):
+        line += f"  ({match.matched})"
+    return line
+
+
+def run_find(args: list[str]) -> int:
+    transports = concrete_transports()
+    words: list[str] = []
+    for arg in args:
+        if arg in ("--ssh", "--telnet"):
+            transports = [t for t in transports if t.key == arg[2:]]
+        elif arg in ("-h", "--help") or arg.startswith("--"):
+            print(FIND_USAGE)
+            return 0 if arg in ("-h", "--help") else 2
+        else:
+            words.append(arg)
+    if not words:
+        print(FIND_USAGE)
+        return 2
+
+    started = time.perf_counter()
+    index = HostIndex.open(transports)
+    matches = index.find(" ".join(words))
+    elapsed = time.perf_counter() - started
+    for match in matches:
+        print(f"  {format_match(match)}")
+    print(f"{len(matches)} match(es) in {elapsed * 1000:.1f} ms")
+    return 0 if matches else 1
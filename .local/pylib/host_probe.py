@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import os
+import selectors
+import socket
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from .config_paths import concrete_transports
+from .config_utils import atomic_write_text, iter_host_entries, split_alias
+from .connection import connect_probes
+
+try:
+    import resource
+except ImportError:
+    resource = None  # type: ignore[assignment]
+
+
+PROBE_USAGE = "Usage: probe --export <file.prom> [--interval SECONDS] [-j JOBS] [--timeout SECONDS]"
+
+_DEFAULT_PORTS = {"ssh": "22", "telnet": "23"}
+_DEFAULT_JOBS = 512
+_DEFAULT_TIMEOUT_SECONDS = 3.0
+_RESOLVE_WORKERS = 32
+
+# select() on Windows takes at most 512 sockets
+_WINDOWS_MAX_SOCKETS = 500
+
+
+@dataclass(slots=True)
+class _Target:
+    transport: str
+    alias: str
+    hostname: str
+    port: int
+    latency: float | None = None  # seconds to connect, None while down
+
+
+# one target per (transport, alias): repeated blocks for a host merge the way ssh reads them, the first
+# Hostname and Port set win, so every series in the export is unique
+def _targets() -> list[_Target]:
+    targets: list[_Target] = []
+    for transport in concrete_transports():
+        if not transport.config_file.exists():
+            continue
+        hosts: dict[str, list[str]] = {}
+        for entry in iter_host_entries(transport.config_file):
+            values = hosts.setdefault(entry.alias, ["", ""])
+            values[0] = values[0] or entry.hostname
+            values[1] = values[1] or entry.port
+        for alias, (hostname, port) in hosts.items():
+            port = port or _DEFAULT_PORTS.get(transport.key, "")
+            if hostname and port.isdigit():
+                targets.append(_Target(transport.key, alias, hostname, int(port)))
+    return targets
+
+
+# sockets open at once: a host in flight holds one per resolved address, so the budget is counted in
+# sockets, kept under the open file limit (and select's 512 on Windows)
+def _max_sockets() -> int | None:
+    if sys.platform == "win32":
+        return _WINDOWS_MAX_SOCKETS
+    if resource is not None:
+        soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft != resource.RLIM_INFINITY:
+            return max(1, soft - 64)
+    return None
+
+
+# names are resolved up front on a few threads, one lookup per distinct (hostname, port)
+def _resolve(targets: list[_Target]) -> dict[tuple[str, int], list[tuple]]:
+    def _lookup(key: tuple[str, int]) -> list[tuple]:
+        try:
+            return socket.getaddrinfo(key[0], key[1], type=socket.SOCK_STREAM)
+        except OSError:
+            return []
+
+    keys = list({(t.hostname, t.port) for t in targets})
+    with ThreadPoolExecutor(max_workers=_RESOLVE_WORKERS) as pool:
+        return dict(zip(keys, pool.map(_lookup, keys)))
+
+
+# one pass over every target with non-blocking connects, at most jobs hosts and max_sockets sockets in
+# flight at a time; all probes share one timeout so the oldest one in flight is always the next to expire
+def probe_all(targets: list[_Target], *, jobs: int, timeout: float, max_sockets: int | None = None) -> None:
+    addrinfos = _resolve(targets)
+    selector = selectors.DefaultSelector()
+    in_flight: dict[int, tuple[float, list[socket.socket]]] = {}
+    order: deque[int] = deque()
+    next_idx = 0
+    open_sockets = 0
+
+    def _close(sock: socket.socket) -> None:
+        nonlocal open_sockets
+        selector.unregister(sock)
+        sock.close()
+        open_sockets -= 1
+
+    def _finish(idx: int, latency: float | None) -> None:
+        _, socks = in_flight.pop(idx)
+        for sock in socks:
+            _close(sock)
+        targets[idx].latency = latency
+
+    try:
+        while True:
+            while len(in_flight) < jobs and next_idx < len(targets):
+                target = targets[next_idx]
+                infos = addrinfos[target.hostname, target.port]
+                if max_sockets is not None:
+                    # a host with more addresses than the whole budget only tries the first ones
+                    infos = infos[:max_sockets]
+                    if open_sockets + len(infos) > max_sockets:
+                        break
+                idx = next_idx
+                next_idx += 1
+                target.latency = None
+                socks = connect_probes(infos)
+                if not socks:
+                    continue
+                open_sockets += len(socks)
+                in_flight[idx] = (time.monotonic(), socks)
+                order.append(idx)
+                for sock in socks:
+                    selector.register(sock, selectors.EVENT_WRITE, idx)
+            if not in_flight:
+                break
+
+            while order and order[0] not in in_flight:
+                order.popleft()
+            wait = in_flight[order[0]][0] + timeout - time.monotonic()
+            for key, _ in selector.select(max(0.0, wait)):
+                idx = key.data
+                if idx not in in_flight:
+                    continue
+                started, socks = in_flight[idx]
+                sock = key.fileobj
+                if sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) == 0:  # type: ignore[union-attr]
+                    _finish(idx, time.monotonic() - started)
+                    continue
+                _close(sock)  # type: ignore[arg-type]
+                socks.remove(sock)  # type: ignore[arg-type]
+                if not socks:
+                    in_flight.pop(idx)
+
+            now = time.monotonic()
+            while order and (order[0] not in in_flight or in_flight[order[0]][0] + timeout <= now):
+                idx = order.popleft()
+                if idx in in_flight:
+                    _finish(idx, None)
+    finally:
+        for idx in list(in_flight):
+            _finish(idx, None)
+        selector.close()
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_metrics(targets: list[_Target], *, duration: float, finished: float) -> str:
+    lines = [
+        "# HELP vmsmenu_host_up Whether the host's port accepted a TCP connection in the last probe.",
+        "# TYPE vmsmenu_host_up gauge",
+    ]
+    labels = []
+    for t in targets:
+        group, _ = split_alias(t.alias)
+        labels.append(f'host="{_label(t.alias)}",group="{_label(group)}",transport="{t.transport}"')
+    lines.extend(f"vmsmenu_host_up{{{lb}}} {int(t.latency is not None)}" for t, lb in zip(targets, labels))
+    lines += [
+        "# HELP vmsmenu_host_connect_seconds TCP connect time of the last probe, only for hosts that are up.",
+        "# TYPE vmsmenu_host_connect_seconds gauge",
+    ]
+    lines.extend(f"vmsmenu_host_connect_seconds{{{lb}}} {t.latency:.6f}"
+                 for t, lb in zip(targets, labels) if t.latency is not None)
+    lines += [
+        "# HELP vmsmenu_probe_duration_seconds Time the last probe cycle over all hosts took.",
+        "# TYPE vmsmenu_probe_duration_seconds gauge",
+        f"vmsmenu_probe_duration_seconds {duration:.3f}",
+        "# HELP vmsmenu_probe_last_run_timestamp_seconds When the last probe cycle finished.",
+        "# TYPE vmsmenu_probe_last_run_timestamp_seconds gauge",
+        f"vmsmenu_probe_last_run_timestamp_seconds {finished:.3f}",
+        "# EOF",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+# the collector reads the file while it is rewritten, so it is replaced in one rename; a new file
+# is opened up to other users since the exporter usually runs as its own account
+def _write_export(path: Path, content: str) -> None:
+    new = not path.exists()
+    atomic_write_text(path, content)
+    if new:
+        try:
+            os.chmod(path, 0o644)
+        except OSError:
+            pass
+
+
+def run_probe(args: list[str]) -> int:
+    export: Path | None = None
+    interval = 0.0
+    jobs, timeout = _DEFAULT_JOBS, _DEFAULT_TIMEOUT_SECONDS
+    it = iter(args)
+    try:
+        for arg in it:
+            if arg == "--export":
+                export = Path(next(it)).expanduser()
+            elif arg == "--interval":
+                interval = max(0.0, float(next(it)))
+            elif arg in ("-j", "--jobs"):
+                jobs = max(1, int(next(it)))
+            elif arg == "--timeout":
+                timeout = max(0.1, float(next(it)))
+            else:
+                raise ValueError(arg)
+        if export is None:
+            raise ValueError("--export")
+    except (StopIteration, ValueError):
+        print(PROBE_USAGE)
+        return 2
+
+    max_sockets = _max_sockets()
+    try:
+        while True:
+            started = time.monotonic()
+            # the configs are read every cycle, hosts added or removed show up in the next export
+            targets = _targets()
+            probe_all(targets, jobs=jobs, timeout=timeout, max_sockets=max_sockets)
+            duration = time.monotonic() - started
+            try:
+                _write_export(export, format_metrics(targets, duration=duration, finished=time.time()))
+            except OSError as e:
+                print(f"probe: could not write {export}: {e}", file=sys.stderr)
+                return 1
+            up = sum(t.latency is not None for t in targets)
+            print(f"probe: {up}/{len(targets)} up in {duration:.1f}s, wrote {export}", flush=True)
+            if not interval:
+                return 0
+            if duration > interval:
+                print(f"probe: cycle took longer than the {interval:g}s interval, raise -j or lower --timeout",
+                      file=sys.stderr)
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        return 130
@@ -21,3 +21,16 @@ def normalize_identifier(raw: str, *,
     if case_mode == "lower":
         return NormalizeResult(ok=True, value=trimmed.lower())
     return NormalizeResult(ok=True, value=trimmed)
+
+
+# port text from a prompt or import, empty falls back to default when one is given
+def normalize_port(raw: str, *, default: str = "") -> NormalizeResult:
+    trimmed = (raw or "").strip()
+    if trimmed == "":
+        if default:
+            return NormalizeResult(ok=True, value=default)
+        return NormalizeResult(ok=False, error="empty")
+
+    if not trimmed.isdigit() or not (1 <= int(trimmed) <= 65535):
+        return NormalizeResult(ok=False, error="range")
+    return NormalizeResult(ok=True, value=trimmed)
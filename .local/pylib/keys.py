@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None  # type: ignore[assignment]
+
+import select
+
+try:
+    import termios
+    import tty
+except ImportError:
+    termios = None  # type: ignore[assignment]
+
+
+# names returned by read_key for non-character keys
+UP = "up"
+DOWN = "down"
+PGUP = "pgup"
+PGDN = "pgdn"
+HOME = "home"
+END = "end"
+ENTER = "enter"
+ESC = "esc"
+
+# second byte after a 0x00/0xe0 prefix from msvcrt.getwch
+_WIN_KEYS = {"H": UP, "P": DOWN, "I": PGUP, "Q": PGDN, "G": HOME, "O": END}
+
+# escape sequences after ESC from xterm-style terminals
+_ESC_KEYS = {
+    "[A": UP, "[B": DOWN, "OA": UP, "OB": DOWN,
+    "[5~": PGUP, "[6~": PGDN,
+    "[H": HOME, "[F": END, "OH": HOME, "OF": END, "[1~": HOME, "[4~": END,
+    # application keypad, which settings.json turns on for the numpad
+    "OM": ENTER, "On": ".", **{f"O{chr(ord('p') + n)}": str(n) for n in range(10)},
+}
+
+# how long the rest of an escape sequence may take to arrive after the ESC
+_ESC_WAIT_SECONDS = 0.05
+
+
+# raw single-key input needs a real console on both ends, set VMSMENU_LINE_INPUT=1 to opt out
+def raw_keys_available() -> bool:
+    if os.environ.get("VMSMENU_LINE_INPUT"):
+        return False
+    try:
+        if not (sys.stdin.isatty() and sys.stdout.isatty()):
+            return False
+    except (AttributeError, ValueError):
+        return False
+    return msvcrt is not None or termios is not None
+
+
+@contextmanager
+def raw_mode() -> Iterator[None]:
+    sys.stdout.write("\033[?25l")
+    sys.stdout.flush()
+    saved = None
+    if msvcrt is None and termios is not None:
+        fd = sys.stdin.fileno()
+        saved = termios.tcgetattr(fd)
+        # cbreak keeps ISIG so Ctrl-C still raises KeyboardInterrupt
+        tty.setcbreak(fd)
+    try:
+        yield
+    finally:
+        if saved is not None:
+            termios.tcsetattr(sys.stdin.fileno(), termios.TCSADRAIN, saved)
+        sys.stdout.write("\033[?25h")
+        sys.stdout.flush()
+
+
+# collects the rest of an escape sequence, a lone ESC has nothing following it; unknown sequences
+# are dropped rather than read as ESC (which means Back)
+def _read_escape(pending: Callable[[], bool], read: Callable[[], str]) -> str:
+    seq = ""
+    while pending():
+        seq += read()
+        # the sequence ends at a letter or ~ after its first character ("O" or "[")
+        if len(seq) > 1 and (seq[-1].isalpha() or seq[-1] == "~"):
+            break
+    return _ESC_KEYS.get(seq, ESC if not seq else "")
+
+
+def _read_posix_key() -> str:
+    fd = sys.stdin.fileno()
+    ch = os.read(fd, 1).decode("utf-8", errors="replace")
+    if ch != "\x1b":
+        return ch
+    return _read_escape(lambda: bool(select.select([fd], [], [], _ESC_WAIT_SECONDS)[0]),
+                        lambda: os.read(fd, 1).decode("utf-8", errors="replace"))
+
+
+# Windows Terminal sends VT sequences (the numpad ones from settings.json) as plain characters
+def _windows_key_pending() -> bool:
+    deadline = time.monotonic() + _ESC_WAIT_SECONDS
+    while not msvcrt.kbhit():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def _read_windows_key() -> str:
+    ch = msvcrt.getwch()
+    if ch in ("\x00", "\xe0"):
+        return _WIN_KEYS.get(msvcrt.getwch(), "")
+    if ch == "\x1b":
+        return _read_escape(_windows_key_pending, msvcrt.getwch)
+    return ch
+
+
+# read one keypress, returns a key name constant or the typed character
+def read_key() -> str:
+    key = _read_windows_key() if msvcrt is not None else _read_posix_key()
+    if key == "\x03":
+        raise KeyboardInterrupt
+    if key in ("\r", "\n"):
+        return ENTER
+    if key == "\x1b":
+        return ESC
+    return key
+
+
+# blocks up to timeout seconds until a key is pressed (left unread) or one of the sockets' connects
+# finishes, returns (key waiting, finished sockets: check SO_ERROR); without a console it only waits
+# for the sockets
+def wait_for_key_or_writable(timeout: float, sockets: list | None = None) -> tuple[bool, list]:
+    sockets = sockets or []
+    watch_keys = raw_keys_available()
+    if msvcrt is None:
+        readable = [sys.stdin.fileno()] if watch_keys else []
+        if not readable and not sockets:
+            time.sleep(timeout)
+            return False, []
+        ready, writable, _ = select.select(readable, sockets, [], timeout)
+        return bool(ready), writable
+
+    # the Windows console can't be selected on, so kbhit is checked between short socket waits; winsock
+    # reports a failed non-blocking connect in the except set rather than as writable
+    deadline = time.monotonic() + timeout
+    while True:
+        if watch_keys and msvcrt.kbhit():
+            return True, []
+        step = min(0.1, deadline - time.monotonic())
+        if step <= 0:
+            return False, []
+        if sockets:
+            _, writable, failed = select.select([], sockets, sockets, step)
+            if writable or failed:
+                return False, writable + [s for s in failed if s not in writable]
+        else:
+            time.sleep(step)
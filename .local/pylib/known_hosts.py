@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import atexit
+import base64
+import hashlib
+import hmac
+import os
+import shutil
+import subprocess
+from fnmatch import fnmatchcase
+from pathlib import Path
+
+from .config_paths import state_dir
+from .config_utils import atomic_write_text, config_version, file_version, iter_host_entries
+
+
+TRUSTED = "trusted"
+UNKNOWN = "unknown"
+CHANGED = "changed"
+
+_HASHED_PREFIX = "|1|"
+
+# HMAC-SHA1 key pads, a salt's padded keys are hashed once and the states copied for every name tried
+_IPAD = bytes(b ^ 0x36 for b in range(256))
+_OPAD = bytes(b ^ 0x5C for b in range(256))
+_SHA1_BLOCK = 64
+
+_STATUS_HEADER = "# vmsmenu known_hosts status v1\n"
+
+_KEYSCAN_TIMEOUT_SECONDS = 2
+
+# (key type, base64 key)
+HostKey = tuple[str, str]
+
+
+# the files ssh reads by default, user ones first
+def known_hosts_files() -> list[Path]:
+    ssh_dir = Path.home() / ".ssh"
+    return [ssh_dir / "known_hosts", ssh_dir / "known_hosts2",
+            Path("/etc/ssh/ssh_known_hosts"), Path("/etc/ssh/ssh_known_hosts2")]
+
+
+def known_hosts_version() -> tuple[tuple[int, int] | None, ...]:
+    return tuple(file_version(p) for p in known_hosts_files())
+
+
+# the name ssh looks a host up by: the hostname, in brackets with the port when it is not 22
+def known_host_name(hostname: str, port: str) -> str:
+    hostname = hostname.lower()
+    return hostname if port in ("", "22") else f"[{hostname}]:{port}"
+
+
+class KnownHostsIndex:
+    """Host keys from known_hosts text, plain names in a dict and hashed names grouped per salt."""
+
+    def __init__(self, text: str) -> None:
+        self.plain: dict[str, set[HostKey]] = {}
+        # salt -> (inner pad state, outer pad state, {name digest: keys})
+        self.hashed: dict[bytes, tuple[object, object, dict[bytes, set[HostKey]]]] = {}
+        # wildcard and negated patterns, matched one by one (rare in practice)
+        self.patterns: list[tuple[list[str], list[str], set[HostKey]]] = []
+
+        for line in text.splitlines():
+            fields = line.split()
+            if not fields or fields[0].startswith("#"):
+                continue
+            if fields[0].startswith("@"):
+                # revoked keys only matter against a live key, CA lines vouch for the hosts they match
+                if fields[0] != "@cert-authority":
+                    continue
+                fields = fields[1:]
+            if len(fields) < 3:
+                continue
+            self._add(fields[0], (fields[1], fields[2]))
+
+    def _add(self, hosts: str, key: HostKey) -> None:
+        if hosts.startswith(_HASHED_PREFIX):
+            try:
+                _, _, salt_b64, digest_b64 = hosts.split("|")
+                salt, digest = base64.b64decode(salt_b64), base64.b64decode(digest_b64)
+            except ValueError:
+                return
+            entry = self.hashed.get(salt)
+            if entry is None:
+                padded = salt.ljust(_SHA1_BLOCK, b"\0") if len(salt) <= _SHA1_BLOCK else hashlib.sha1(salt).digest().ljust(_SHA1_BLOCK, b"\0")
+                entry = (hashlib.sha1(padded.translate(_IPAD)), hashlib.sha1(padded.translate(_OPAD)), {})
+                self.hashed[salt] = entry
+            entry[2].setdefault(digest, set()).add(key)
+            return
+
+        names = hosts.lower().split(",")
+        if not any("*" in n or "?" in n or n.startswith("!") for n in names):
+            for name in names:
+                self.plain.setdefault(name, set()).add(key)
+            return
+        positive = [n for n in names if not n.startswith("!")]
+        negative = [n[1:] for n in names if n.startswith("!")]
+        self.patterns.append((positive, negative, {key}))
+
+    def keys_for(self, name: str) -> set[HostKey]:
+        name = name.lower()
+        keys = set(self.plain.get(name, ()))
+        for positive, negative, pattern_keys in self.patterns:
+            if any(fnmatchcase(name, p) for p in positive) and not any(fnmatchcase(name, n) for n in negative):
+                keys |= pattern_keys
+        raw = name.encode("utf-8")
+        for inner, outer, digests in self.hashed.values():
+            i = inner.copy()  # type: ignore[attr-defined]
+            i.update(raw)
+            o = outer.copy()  # type: ignore[attr-defined]
+            o.update(i.digest())
+            found = digests.get(o.digest())
+            if found:
+                keys |= found
+        return keys
+
+
+class _TrustCache:
+    """Trust status per known-host name, kept on disk against the known_hosts contents it was built from.
+
+    Appending to known_hosts (what ssh does) keeps the statuses, an unknown name remembers how much of
+    the text it was checked against so only the lines added since are searched again; any other change
+    starts over. Names are stored as salted HMACs like a hashed known_hosts.
+    """
+
+    def __init__(self) -> None:
+        self.path = state_dir() / "known_hosts.status"
+        self.version: tuple[tuple[int, int] | None, ...] | None = None
+        self.text = ""
+        self.index: KnownHostsIndex | None = None
+        # indexes of the text added after an offset, for unknown names checked against less of it
+        self.tails: dict[int, KnownHostsIndex] = {}
+        self.salt = b""
+        self.statuses: dict[str, str] = {}
+        self.dirty = False
+        self.save_registered = False
+
+    def _digest(self, name: str) -> str:
+        return hmac.digest(self.salt, name.encode("utf-8"), "sha1").hex()[:20]
+
+    def refresh(self) -> None:
+        files = known_hosts_files()
+        version = known_hosts_version()
+        if version == self.version:
+            return
+        self.version = version
+        parts = []
+        for path in files:
+            try:
+                parts.append(path.read_text(encoding="utf-8", errors="replace"))
+            except OSError:
+                continue
+        text = "".join(p if p.endswith("\n") else p + "\n" for p in parts if p)
+        self.index = None
+        self.tails = {}
+
+        if not self.statuses:
+            self._load(text)
+        elif not text.startswith(self.text):
+            self.statuses = {}
+        self.text = text
+        self.dirty = True
+        self._register_save()
+
+    def _load(self, text: str) -> None:
+        try:
+            lines = self.path.read_text(encoding="utf-8").splitlines()
+        except OSError:
+            lines = []
+        if len(lines) >= 2 and lines[0] + "\n" == _STATUS_HEADER:
+            size, prefix_hash, salt_hex = (lines[1].split("\t") + ["", "", ""])[:3]
+            prefix = text[:int(size)] if size.isdigit() else None
+            if prefix is not None and hashlib.sha1(prefix.encode("utf-8")).hexdigest() == prefix_hash:
+                self.salt = bytes.fromhex(salt_hex)
+                self.statuses = dict(line.split("\t", 1) for line in lines[2:] if "\t" in line)
+                return
+        self.salt = os.urandom(16)
+        self.statuses = {}
+
+    # statuses are "trusted", "changed" (from a live check, kept until known_hosts is rewritten)
+    # or "unknown:<length of the text it was checked against>"
+    def status(self, name: str) -> str:
+        if self.version is None:
+            self.refresh()
+        digest = self._digest(name)
+        status = self.statuses.get(digest)
+        if status is not None and not status.startswith(UNKNOWN):
+            return status
+
+        if status is None:
+            if self.index is None:
+                self.index = KnownHostsIndex(self.text)
+            known = bool(self.index.keys_for(name))
+        else:
+            checked = int(status.partition(":")[2] or 0)
+            if checked >= len(self.text):
+                return UNKNOWN
+            tail = self.tails.get(checked)
+            if tail is None:
+                tail = self.tails[checked] = KnownHostsIndex(self.text[checked:])
+            known = bool(tail.keys_for(name))
+        self.statuses[digest] = TRUSTED if known else f"{UNKNOWN}:{len(self.text)}"
+        self.dirty = True
+        return TRUSTED if known else UNKNOWN
+
+    def keys_for(self, name: str) -> set[HostKey]:
+        self.refresh()
+        if self.index is None:
+            self.index = KnownHostsIndex(self.text)
+        return self.index.keys_for(name)
+
+    def record(self, name: str, status: str) -> None:
+        self.refresh()
+        self.statuses[self._digest(name)] = f"{UNKNOWN}:{len(self.text)}" if status == UNKNOWN else status
+        self.dirty = True
+
+    def _register_save(self) -> None:
+        if not self.save_registered:
+            self.save_registered = True
+            atexit.register(self.save)
+
+    def save(self) -> None:
+        if not self.dirty or not self.salt:
+            return
+        prefix_hash = hashlib.sha1(self.text.encode("utf-8")).hexdigest()
+        lines = [_STATUS_HEADER, f"{len(self.text)}\t{prefix_hash}\t{self.salt.hex()}\n"]
+        lines.extend(f"{d}\t{s}\n" for d, s in self.statuses.items())
+        try:
+            atomic_write_text(self.path, "".join(lines))
+        except OSError:
+            return
+        self.dirty = False
+
+
+_cache: _TrustCache | None = None
+
+# alias -> known-host name for the ssh config the menus show, rebuilt when the config changes
+_names: dict[str, str] = {}
+_names_version: tuple[Path, tuple[int, int] | None] | None = None
+
+
+def _trust_cache() -> _TrustCache:
+    global _cache
+    if _cache is None:
+        _cache = _TrustCache()
+    return _cache
+
+
+def host_key_status(hostname: str, port: str) -> str:
+    cache = _trust_cache()
+    cache.refresh()
+    return cache.status(known_host_name(hostname, port))
+
+
+# picks up changes to known_hosts and the ssh config, called once per menu redraw rather than per row
+def refresh_key_status(config_file: Path) -> None:
+    global _names, _names_version
+    version = (config_file, config_version(config_file))
+    if version != _names_version:
+        _names = {e.alias: known_host_name(e.hostname, e.port) for e in iter_host_entries(config_file) if e.hostname}
+        _names_version = version
+    _trust_cache().refresh()
+
+
+# trust status of an ssh alias for the menus, "" when known_hosts doesn't exist at all
+def alias_key_status(alias: str, config_file: Path) -> str:
+    if _names_version is None or _names_version[0] != config_file:
+        refresh_key_status(config_file)
+    name = _names.get(alias)
+    cache = _trust_cache()
+    if name is None or not cache.text:
+        return ""
+    return cache.status(name)
+
+
+# asks the host for its keys with ssh-keyscan and compares them with known_hosts the way ssh would:
+# a different key of a type that is already known means the key changed; None when the host can't be asked
+def check_live_key(hostname: str, port: str, *, timeout: int = _KEYSCAN_TIMEOUT_SECONDS) -> str | None:
+    keyscan = shutil.which("ssh-keyscan")
+    if keyscan is None:
+        return None
+    try:
+        result = subprocess.run([keyscan, "-T", str(timeout), "-p", port or "22", hostname],
+                                capture_output=True, text=True, timeout=timeout + 2)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    scanned: set[HostKey] = set()
+    for line in result.stdout.splitlines():
+        fields = line.split()
+        if len(fields) >= 3 and not fields[0].startswith("#"):
+            scanned.add((fields[1], fields[2]))
+    if not scanned:
+        return None
+
+    name = known_host_name(hostname, port)
+    cache = _trust_cache()
+    known = cache.keys_for(name)
+    known_types = {key_type for key_type, _ in known}
+    if any(key_type in known_types and (key_type, key) not in known for key_type, key in scanned):
+        status = CHANGED
+    elif scanned & known:
+        status = TRUSTED
+    else:
+        status = UNKNOWN
+    cache.record(name, status)
+    return status
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import gc
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+from .ansi import Ansi
+from .config_utils import build_host_tree, format_host_block, iter_host_entries
+from .menu_utils import populate_menu_vars
+from .types import HostEntry, MenuVars, Transport
+
+
+# retained bytes per host for each stage, checked against the synthetic inventory below
+MEMORY_BUDGET_BYTES_PER_HOST: dict[str, float] = {
+    "tree": 250.0,
+    "menu": 250.0,
+    "entries": 250.0,
+}
+
+_DEFAULT_HOSTS = 100_000
+
+_ALGORITHMS = (
+    ("ssh-rsa", "diffie-hellman-group14-sha1", "hmac-sha1"),
+    ("ssh-ed25519", "curve25519-sha256", "hmac-sha2-256"),
+    ("", "", ""),
+)
+
+
+# site.cluster.NODE aliases spread over a few hundred groups, plus some ungrouped hosts
+def synthetic_entries(count: int) -> list[HostEntry]:
+    entries: list[HostEntry] = []
+    for i in range(count):
+        if i % 20 == 0:
+            alias = f"N{i}"
+        else:
+            alias = f"site{i % 17}.c{i % 23}.N{i}"
+        hostkey, kex, macs = _ALGORITHMS[i % len(_ALGORITHMS)]
+        entries.append(HostEntry(
+            alias=alias,
+            hostname=f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}",
+            port="22",
+            hostkey_algorithms=hostkey,
+            kex_algorithms=kex,
+            macs=macs,
+        ))
+    return entries
+
+
+# (retained bytes, seconds) for building whatever build() returns, the result is kept alive while measuring
+def measure(build: Callable[[], object]) -> tuple[int, float]:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        result = build()
+        elapsed = time.perf_counter() - started
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del result
+    return retained, elapsed
+
+
+def _menu_vars(aliases: list[str]) -> MenuVars:
+    menu_vars = MenuVars(
+        main_hosts=[], group_map={}, group_names=[], labels=[], types=[], values=[],
+        transport=Transport(key="ssh", label="SSH", config_file=Path("/nonexistent")),
+    )
+    populate_menu_vars(menu_vars, hosts=aliases)
+    # open every group once, the way browsing the whole menu would
+    stack = list(menu_vars.tree.root.children.values()) if menu_vars.tree else []
+    while stack:
+        node = stack.pop()
+        node.sorted_hosts()
+        stack.extend(node.children.values())
+    return menu_vars
+
+
+def run_memory_report(args: list[str]) -> int:
+    count = _DEFAULT_HOSTS
+    if "--hosts" in args:
+        idx = args.index("--hosts")
+        if idx + 1 < len(args) and args[idx + 1].isdigit():
+            count = max(1, int(args[idx + 1]))
+
+    entries = synthetic_entries(count)
+    aliases = [e.alias for e in entries]
+    with tempfile.TemporaryDirectory() as tmp:
+        config_file = Path(tmp) / "config"
+        with config_file.open("w", encoding="utf-8", newline="") as f:
+            for entry in entries:
+                f.writelines(format_host_block(entry))
+                f.write("\n")
+        del entries
+
+        stages: dict[str, Callable[[], object]] = {
+            "tree": lambda: build_host_tree(aliases),
+            "menu": lambda: _menu_vars(aliases),
+            "entries": lambda: list(iter_host_entries(config_file)),
+        }
+
+        over_budget = False
+        print(f"{count} synthetic hosts")
+        print(f"{'stage':<10}{'retained MB':>12}{'bytes/host':>12}{'budget':>9}{'seconds':>9}")
+        for stage, build in stages.items():
+            retained, elapsed = measure(build)
+            per_host = retained / count
+            budget = MEMORY_BUDGET_BYTES_PER_HOST[stage]
+            status = f"{Ansi.GREEN}ok{Ansi.RESET}" if per_host <= budget else f"{Ansi.RED}OVER{Ansi.RESET}"
+            over_budget = over_budget or per_host > budget
+            print(f"{stage:<10}{retained / 1e6:>12.1f}{per_host:>12.0f}{budget:>9.0f}{elapsed:>9.2f}  {status}")
+
+    return 1 if over_budget else 0
@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import os
+import secrets
+import socket
+import tempfile
+import time
+from pathlib import Path
+
+from .config_paths import server_file, ssh_config, telnet_config
+from .config_utils import build_host_tree, config_version, load_host_aliases, read_host_values
+from .direct_connect import parse_connect_args
+from .types import HostTree, Transport
+from .usage_store import last_user, record_connection, remember_user
+
+
+_DNS_TTL_SECONDS = 300
+_CLIENT_TIMEOUT_SECONDS = 5
+_MAX_REQUEST_BYTES = 64 * 1024
+
+
+class _HostIndex:
+    """Alias and nickname lookup for one config file, rebuilt when the file changes."""
+
+    def __init__(self, transport: Transport) -> None:
+        self.transport = transport
+        self.version: tuple[int, int] | None = None
+        self.tree: HostTree = build_host_tree([])
+        self.values: dict[str, tuple[str, str, str]] = {}
+
+    def refresh(self) -> None:
+        version = config_version(self.transport.config_file)
+        if version == self.version:
+            return
+        self.version = version
+        self.tree = build_host_tree(load_host_aliases(self.transport.config_file))
+        self.values = {}
+
+    def lookup(self, query: str) -> list[str]:
+        self.refresh()
+        upper = query.upper()
+        if upper in self.tree.by_alias:
+            return self.tree.by_alias[upper][:1]
+        return self.tree.by_leaf.get(upper, [])
+
+    # (hostname, port, user)
+    def host_values(self, alias: str) -> tuple[str, str, str]:
+        if alias not in self.values:
+            hostname, port, *_, user = read_host_values(alias, self.transport.config_file)
+            self.values[alias] = (hostname, port, user)
+        return self.values[alias]
+
+
+class MenuServer:
+    """Resident process that answers direct-connect lookups from warm caches.
+
+    Requests and replies are single tab-separated lines so the bash client can
+    talk to it over /dev/tcp without starting python.
+    """
+
+    def __init__(self) -> None:
+        self.token = secrets.token_hex(16)
+        self.indexes = {t.key: _HostIndex(t) for t in (ssh_config(), telnet_config())}
+        self.dns: dict[str, tuple[float, str]] = {}
+        self.running = True
+
+    def _resolve_addr(self, hostname: str, port: str) -> str:
+        cached = self.dns.get(hostname)
+        now = time.monotonic()
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        try:
+            infos = socket.getaddrinfo(hostname, port or None, type=socket.SOCK_STREAM)
+        except OSError:
+            return hostname
+        addr = str(infos[0][4][0]) if infos else hostname
+        self.dns[hostname] = (now + _DNS_TTL_SECONDS, addr)
+        return addr
+
+    def _connect(self, args: list[str]) -> str:
+        request = parse_connect_args(args)
+        if request is None:
+            return "ERROR\tUsage: vmsmenu [--ssh|--telnet] [--wait] [-l user] <alias-or-nickname>"
+        if request.wait:
+            # polling a rebooting host is done by python itself, the launcher falls back to it
+            return "LOCAL\twait"
+
+        keys = [request.transport_key] if request.transport_key else ["ssh", "telnet"]
+        for key in keys:
+            index = self.indexes[key]
+            matches = index.lookup(request.query)
+            if not matches:
+                continue
+            if len(matches) > 1:
+                return f"ERROR\t{request.query.upper()} matches multiple hosts: {' '.join(matches)}"
+
+            alias = matches[0]
+            hostname, port, user = index.host_values(alias)
+            if not hostname:
+                return f"ERROR\tNo hostname/IP configured for {alias}"
+            if key == "ssh":
+                # the launcher asks for a user only when neither -l nor the config gives one
+                return f"SSH\t{alias}\t{request.user or user}\t{last_user(alias)}"
+            return f"TELNET\t{alias}\t{self._resolve_addr(hostname, port)}\t{port or '23'}"
+
+        return f"ERROR\tNo host matching {request.query.upper()} found."
+
+    # the token is compared as bytes, any local process can connect and send whatever it likes
+    def handle(self, raw: bytes) -> str:
+        token, _, request = raw.rstrip(b"\r\n").partition(b"\t")
+        if not request or not secrets.compare_digest(token, self.token.encode("ascii")):
+            return "ERROR\tbad token"
+        try:
+            parts = request.decode("utf-8").split("\t")
+        except UnicodeDecodeError:
+            return "ERROR\tbad request"
+
+        op, args = parts[0], [a for a in parts[1:] if a]
+        if op == "ping":
+            return f"OK\t{os.getpid()}"
+        if op == "connect":
+            return self._connect(args)
+        if op == "record" and len(args) in (2, 3) and args[0] in self.indexes:
+            try:
+                record_connection(args[0], args[1])
+                if len(args) == 3:
+                    remember_user(args[1], args[2])
+            except OSError:
+                pass
+            return "OK"
+        if op == "stop":
+            self.running = False
+            return "OK"
+        return f"ERROR\tunknown request {op}"
+
+    def serve(self, state_path: Path) -> None:
+        with socket.create_server(("127.0.0.1", 0)) as listener:
+            port = listener.getsockname()[1]
+            _write_state(state_path, f"{port} {self.token}\n")
+
+            # warm the caches before the first request
+            for index in self.indexes.values():
+                index.refresh()
+
+            try:
+                while self.running:
+                    conn, _ = listener.accept()
+                    with conn:
+                        conn.settimeout(_CLIENT_TIMEOUT_SECONDS)
+                        try:
+                            with conn.makefile("rwb") as stream:
+                                reply = self.handle(stream.readline(_MAX_REQUEST_BYTES))
+                                stream.write(reply.encode("utf-8") + b"\n")
+                        except OSError:
+                            continue
+            finally:
+                state_path.unlink(missing_ok=True)
+
+
+# the token is written to a temp file created 0600 (mkstemp) and renamed into place, so it is never
+# readable by others, not even briefly; always LF, the bash client's `read` would keep a trailing CR
+def _write_state(state_path: Path, content: str) -> None:
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=state_path.parent, prefix=f".{state_path.name}.")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="\n") as f:
+            f.write(content)
+        os.replace(tmp_name, state_path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def _send(line: str, *, state_path: Path) -> str | None:
+    try:
+        port, token = state_path.read_text(encoding="utf-8").split()
+        with socket.create_connection(("127.0.0.1", int(port)), timeout=_CLIENT_TIMEOUT_SECONDS) as conn:
+            with conn.makefile("rw", encoding="utf-8", newline="\n") as stream:
+                stream.write(f"{token}\t{line}\n")
+                stream.flush()
+                return stream.readline().rstrip("\n")
+    except (OSError, ValueError):
+        return None
+
+
+def run_menu_server(option: str) -> int:
+    state_path = server_file()
+
+    if option == "--serve":
+        if _send("ping", state_path=state_path):
+            print("vmsmenu server is already running.")
+            return 1
+        print(f"vmsmenu server listening (state in {state_path}), Ctrl-C to stop.")
+        try:
+            MenuServer().serve(state_path)
+        except KeyboardInterrupt:
+            print()
+        return 0
+
+    reply = _send("stop" if option == "--stop-server" else "ping", state_path=state_path)
+    if reply is None or not reply.startswith("OK"):
+        print("vmsmenu server is not running.")
+        return 1
+    print("vmsmenu server stopped." if option == "--stop-server" else f"vmsmenu server running (pid {reply.split()[1]}).")
+    return 0
@@ -1,37 +1,152 @@
 from __future__ import annotations
 
+import shutil
 from pathlib import Path
-
-from .ansi import Ansi, clear_screen
-from .config_utils import GROUP_DELIMITER, load_host_aliases, read_host_values, categorize_hosts, remove_host_entry
+from typing import Sequence, overload
+
+from .ansi import Ansi, clear_screen, write_frame
+from .config_paths import concrete_transports, transport_config_files
+from .config_utils import (
+    GROUP_DELIMITER,
+    config_version,
+    load_host_aliases,
+    read_host_values,
+    categorize_hosts,
+    remove_host_entry,
+)
 from .transport_menu import select_transport
-from .types import HostAction, MenuVars, Transport
-from .prompting import SelectionBack, SelectionExit, SelectionInvalid, SelectionOk, prompt_selection, prompt_text
+from .types import GroupNode, HostAction, MenuVars, SelectionResult, Transport
+from .prompting import (
+    SelectionBack,
+    SelectionExit,
+    SelectionInvalid,
+    SelectionOk,
+    SelectionRecent,
+    SelectionSearch,
+    prompt_selection,
+    prompt_text,
+)
+from .tracing import span, traced
+from .usage_store import top_hosts
+from .keys import DOWN, END, ENTER, ESC, HOME, PGDN, PGUP, UP, raw_keys_available, raw_mode, read_key
+from .known_hosts import (
+    CHANGED,
+    TRUSTED,
+    UNKNOWN,
+    alias_key_status,
+    check_live_key,
+    host_key_status,
+    known_hosts_version,
+    refresh_key_status,
+)
 
 
 _RC_EXIT = 0
 _RC_BACK = 1
 
+# menu rows keyed by the identity of the label sequence they were built from,
+# label sequences are rebuilt whenever the config changes so this is a per-config-version cache;
+# rows with host key tags are also rebuilt when known_hosts changes
+_ROW_CACHE_SIZE = 8
+_row_cache: dict[int, tuple[Sequence[str], Sequence[str] | None, object, _MenuRows]] = {}
 
-def _build_menu_lists(
-        main_hosts: list[str], 
-        group_names: list[str]
-) -> tuple[list[str], list[str], list[str]]:
-    labels: list[str] = []
-    types: list[str] = []
-    values: list[str] = []
+_TRANSPORT_COLORS = {"ssh": Ansi.GREEN, "telnet": Ansi.YELLOW}
+
+_KEY_TAGS = {
+    TRUSTED: f" {Ansi.GREEN}[KEY OK]{Ansi.RESET}",
+    UNKNOWN: f" {Ansi.YELLOW}[NEW KEY]{Ansi.RESET}",
+    CHANGED: f" {Ansi.RED}[KEY CHANGED]{Ansi.RESET}",
+}
+
+
+def _transport_tag(transports: list[Transport]) -> str:
+    tags = "/".join(f"{_TRANSPORT_COLORS.get(t.key, '')}{t.label.upper()}{Ansi.RESET}" for t in transports)
+    return f" [{tags}]"
+
+
+# whether ssh already trusts the host's key, only for ssh hosts and only once known_hosts exists
+def _key_tag(host: str, ssh_config: Path | None, host_transports: dict[str, list[Transport]]) -> str:
+    if ssh_config is None:
+        return ""
+    if host_transports and not any(t.key == "ssh" for t in host_transports.get(host, [])):
+        return ""
+    return _KEY_TAGS.get(alias_key_status(host, ssh_config), "")
+
+
+def _host_label(host: str, display: str, host_transports: dict[str, list[Transport]],
+                ssh_config: Path | None = None) -> str:
+    label = display.upper() + _key_tag(host, ssh_config, host_transports)
+    if not host_transports:
+        return label
+    return label + _transport_tag(host_transports.get(host, []))
+
+
+class _MenuLabels(Sequence[str]):
+    """Row labels for hosts followed by groups, each label is built when a row is drawn."""
+
+    __slots__ = ("hosts", "groups", "host_transports", "strip", "ssh_config")
+
+    def __init__(self, hosts: Sequence[str], groups: Sequence[str],
+                 host_transports: dict[str, list[Transport]], *, strip: int = 0,
+                 ssh_config: Path | None = None) -> None:
+        self.hosts = hosts
+        self.groups = groups
+        self.host_transports = host_transports
+        self.strip = strip  # length of the group path shown in the title, cut from host labels
+        self.ssh_config = ssh_config  # set to tag ssh hosts with their known_hosts status
+
+    def __len__(self) -> int:
+        return len(self.hosts) + len(self.groups)
+
+    @overload
+    def __getitem__(self, idx: int) -> str: ...
+    @overload
+    def __getitem__(self, idx: slice) -> list[str]: ...
+    def __getitem__(self, idx: int | slice) -> str | list[str]:
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        if idx < len(self.hosts):
+            host = self.hosts[idx]
+            return _host_label(host, host[self.strip:], self.host_transports, self.ssh_config)
+        return self.groups[idx - len(self.hosts)].upper()
+
+
+class _MenuTypes(Sequence[str]):
+    """"host" for the first host_count rows, "group" for the rest."""
 
-    for host in main_hosts:
-        labels.append(host.upper())
-        types.append("host")
-        values.append(host)
+    __slots__ = ("host_count", "total")
 
-    for group in group_names:
-        labels.append(group.upper())
-        types.append("group")
-        values.append(group)
+    def __init__(self, host_count: int, total: int) -> None:
+        self.host_count = host_count
+        self.total = total
 
-    return labels, types, values
+    def __len__(self) -> int:
+        return self.total
+
+    @overload
+    def __getitem__(self, idx: int) -> str: ...
+    @overload
+    def __getitem__(self, idx: slice) -> list[str]: ...
+    def __getitem__(self, idx: int | slice) -> str | list[str]:
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(self.total))]
+        if not -self.total <= idx < self.total:
+            raise IndexError(idx)
+        return "host" if idx % self.total < self.host_count else "group"
+
+
+def build_menu_lists(
+        main_hosts: list[str], 
+        group_names: list[str],
+        host_transports: dict[str, list[Transport]] | None = None,
+        *,
+        ssh_config: Path | None = None,
+) -> tuple[Sequence[str], Sequence[str], list[str]]:
+    labels = _MenuLabels(main_hosts, group_names, host_transports or {}, ssh_config=ssh_config)
+    types = _MenuTypes(len(main_hosts), len(main_hosts) + len(group_names))
+    return labels, types, main_hosts + group_names
 
 
 def _clear_menu_vars(menu_vars: MenuVars) -> None:
@@ -41,9 +156,47 @@ def _clear_menu_vars(menu_vars: MenuVars) -> None:
     menu_vars.labels = []
     menu_vars.types = []
     menu_vars.values = []
+    menu_vars.recent = []
+    menu_vars.tree = None
+    menu_vars.host_transports = {}
+
+
+# aliases for a transport, for the "all" view both configs are parsed and merged with each alias
+# tagged by the transports it is configured for
+def _load_hosts(transport: Transport) -> tuple[list[str], dict[str, list[Transport]]]:
+    if transport.key != "all":
+        return load_host_aliases(transport.config_file), {}
+
+    transports = concrete_transports()
+    host_transports: dict[str, list[Transport]] = {}
+    for t in transports:
+        for alias in load_host_aliases(t.config_file):
+            tagged = host_transports.setdefault(alias, [])
+            if t not in tagged:
+                tagged.append(t)
+    return list(host_transports), host_transports
+
+
+# the ssh config whose hosts get a host key tag, none for the telnet menu
+def _key_config(transport: Transport) -> Path | None:
+    if transport.key == "ssh":
+        return transport.config_file
+    if transport.key == "all":
+        return next((t.config_file for t in concrete_transports() if t.key == "ssh"), None)
+    return None
+
+
+def _menu_version(transport: Transport) -> tuple[int, int] | None:
+    if transport.key != "all":
+        return config_version(transport.config_file)
+    versions = [config_version(t.config_file) for t in concrete_transports()]
+    if any(v is None for v in versions):
+        return None
+    return max(v[0] for v in versions), sum(v[1] for v in versions)
 
 
-def _populate_menu_vars(menu_vars: MenuVars, *, hosts: list[str]) -> bool:
+def populate_menu_vars(menu_vars: MenuVars, *, hosts: list[str],
+                        host_transports: dict[str, list[Transport]] | None = None) -> bool:
     if not hosts:
         _clear_menu_vars(menu_vars)
         return False
@@ -52,28 +205,40 @@ def _populate_menu_vars(menu_vars: MenuVars, *, hosts: list[str]) -> bool:
     menu_vars.main_hosts = categorized.main_hosts
     menu_vars.group_map = categorized.group_map
     menu_vars.group_names = categorized.group_names
+    menu_vars.tree = categorized.tree
+    menu_vars.host_transports = host_transports or {}
 
-    labels, types, values = _build_menu_lists(menu_vars.main_hosts, menu_vars.group_names)
+    labels, types, values = build_menu_lists(menu_vars.main_hosts, menu_vars.group_names, menu_vars.host_transports,
+                                              ssh_config=_key_config(menu_vars.transport))
     menu_vars.labels = labels
     menu_vars.types = types
     menu_vars.values = values
+    menu_vars.recent = top_hosts(menu_vars.transport.key, set(hosts))
     return True
 
 
 def _refresh_menu(menu_vars: MenuVars) -> bool:
-    hosts = load_host_aliases(menu_vars.transport.config_file)
-    return _populate_menu_vars(menu_vars, hosts=hosts)
+    # skip the reload (and keep the cached rows) while the config file is unchanged
+    version = _menu_version(menu_vars.transport)
+    if version is not None and version == menu_vars.config_version and menu_vars.labels:
+        return True
+
+    hosts, host_transports = _load_hosts(menu_vars.transport)
+    menu_vars.config_version = version
+    return populate_menu_vars(menu_vars, hosts=hosts, host_transports=host_transports)
 
 
-def setup_menu() -> MenuVars | None:
-    transport = select_transport()
+def setup_menu(*, allow_all: bool = False) -> MenuVars | None:
+    transport = select_transport(allow_all=allow_all)
     if transport is None:
         clear_screen()
         return None
 
-    hosts = load_host_aliases(transport.config_file)
+    version = _menu_version(transport)
+    hosts, host_transports = _load_hosts(transport)
     if not hosts:
-        print(f"{Ansi.RED}No hosts found in {transport.config_file}{Ansi.RESET}")
+        where = " or ".join(map(str, transport_config_files(transport)))
+        print(f"{Ansi.RED}No hosts found in {where}{Ansi.RESET}")
         return None
 
     categorized = categorize_hosts(hosts)
@@ -83,7 +248,8 @@ def setup_menu() -> MenuVars | None:
         categorized.group_names,
     )
 
-    labels, types, values = _build_menu_lists(main_hosts, group_names)
+    labels, types, values = build_menu_lists(main_hosts, group_names, host_transports,
+                                              ssh_config=_key_config(transport))
 
     return MenuVars(
         main_hosts=main_hosts,
@@ -92,33 +258,282 @@ def setup_menu() -> MenuVars | None:
         labels=labels,
         types=types,
         values=values,
-        transport=transport
+        transport=transport,
+        config_version=version,
+        recent=top_hosts(transport.key, set(hosts)),
+        tree=categorized.tree,
+        host_transports=host_transports,
     )
 
 
+class _MenuRows(Sequence[str]):
+    """Numbered, colored menu rows, formatted on first use and kept for the next redraw."""
+
+    __slots__ = ("labels", "types", "done")
+
+    def __init__(self, labels: Sequence[str], types: Sequence[str] | None) -> None:
+        self.labels = labels
+        self.types = types
+        self.done: dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    @overload
+    def __getitem__(self, idx: int) -> str: ...
+    @overload
+    def __getitem__(self, idx: slice) -> list[str]: ...
+    def __getitem__(self, idx: int | slice) -> str | list[str]:
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        row = self.done.get(idx)
+        if row is None:
+            label = self.labels[idx]
+            if self.types and self.types[idx] == "group":
+                row = f"{idx + 1}) {Ansi.ORANGE}{label} CLUSTER{Ansi.RESET}"
+            else:
+                row = f"{idx + 1}) {Ansi.GREEN}{label}{Ansi.RESET}"
+            self.done[idx] = row
+        return row
+
+
+def _formatted_rows(labels: Sequence[str], types: Sequence[str] | None) -> _MenuRows:
+    keys = None
+    if isinstance(labels, _MenuLabels) and labels.ssh_config:
+        refresh_key_status(labels.ssh_config)
+        keys = known_hosts_version()
+    cached = _row_cache.get(id(labels))
+    if (cached is not None and cached[0] is labels and cached[1] is types and cached[2] == keys
+            and len(cached[3]) == len(labels)):
+        return cached[3]
+
+    rows = _MenuRows(labels, types)
+    _row_cache.pop(id(labels), None)
+    if len(_row_cache) >= _ROW_CACHE_SIZE:
+        _row_cache.pop(next(iter(_row_cache)))
+    _row_cache[id(labels)] = (labels, types, keys, rows)
+    return rows
+
+
+def _menu_header(title: str, subtitle: str, recent: list[str] | None) -> list[str]:
+    lines = ["", f"------------------------{title}------------------------", ""]
+    if subtitle:
+        lines.extend(subtitle.split("\n"))
+        lines.append("")
+
+    if recent:
+        lines.append(f"{Ansi.MAGENTA}Recent and frequent:{Ansi.RESET}")
+        lines.extend(f"R{idx}) {format_host_display(host)}" for idx, host in enumerate(recent, start=1))
+        lines.append("")
+    return lines
+
+
+def _menu_footer(message: str) -> list[str]:
+    if not message:
+        return []
+    return [""] + [f"{Ansi.RED}{msg_line}{Ansi.RESET}" for msg_line in message.split("\n")]
+
+
 # render the menu with title, subtitle, labels, optional types, and optional message
+# the frame is written in one go and only lines that changed since the last frame are redrawn
+@traced("menu.render_menu", "render")
 def render_menu(
         title: str, 
         subtitle: str, 
-        labels: list[str], 
+        labels: Sequence[str], 
         *, 
-        types: list[str] | None = None, 
-        message: str = ""
+        types: Sequence[str] | None = None, 
+        message: str = "",
+        recent: list[str] | None = None,
 ) -> None:
-    clear_screen()
-    print(f"\n------------------------{title}------------------------\n")
-    if subtitle:
-        print(f"{subtitle}\n")
+    write_frame(_menu_header(title, subtitle, recent) + list(_formatted_rows(labels, types)) + _menu_footer(message))
+
+
+def _highlight_row(row: str, number: int) -> str:
+    prefix = f"{number})"
+    return f"\033[7m{prefix}{Ansi.RESET}{row[len(prefix):]}"
+
+
+# single-keystroke selection: arrows/PgUp/PgDn move, Enter picks, digits jump and pick as soon as
+# the number is unambiguous, E/B exit/back and R# picks a recent host
+def _select_with_keys(
+        title: str,
+        subtitle: str,
+        labels: Sequence[str],
+        *,
+        types: Sequence[str] | None,
+        message: str,
+        recent: list[str],
+        allow_back: bool,
+        allow_search: bool = False,
+) -> SelectionResult:
+    rows = _formatted_rows(labels, types)
+    header = _menu_header(title, subtitle, recent)
+    footer = _menu_footer(message)
+    hint = f"{Ansi.MAGENTA}Arrows/PgUp/PgDn{Ansi.RESET} move, {Ansi.GREEN}Enter{Ansi.RESET}/number select"
+    if recent:
+        hint += f", {Ansi.MAGENTA}R#{Ansi.RESET} recent"
+    if allow_search:
+        hint += f", {Ansi.MAGENTA}/{Ansi.RESET} search"
+    if allow_back:
+        hint += f", {Ansi.MAGENTA}B{Ansi.RESET} back"
+    hint += f", {Ansi.RED}E{Ansi.RESET} exit"
+
+    count = len(rows)
+    cursor = 0
+    top = 0
+    digits = ""
+    recent_pending = False
+
+    with raw_mode():
+        while True:
+            # only as many rows as fit, so every keypress is a diff redraw of a couple of lines
+            page = max(3, shutil.get_terminal_size().lines - len(header) - len(footer) - 7)
+            if cursor < top:
+                top = cursor
+            elif cursor >= top + page:
+                top = cursor - page + 1
+
+            with span("menu.frame", "render"):
+                window = rows[top:top + page]
+                if top <= cursor < top + page:
+                    window[cursor - top] = _highlight_row(rows[cursor], cursor + 1)
+                more = f" ({top + 1}-{top + len(window)}/{count})" if count > page else ""
+                write_frame(header + window + footer + ["", hint + more])
+
+            key = read_key()
+            if key in (UP, DOWN, PGUP, PGDN, HOME, END):
+                digits = ""
+                recent_pending = False
+                step = {UP: -1, DOWN: 1, PGUP: -page, PGDN: page, HOME: -count, END: count}[key]
+                cursor = min(max(cursor + step, 0), count - 1)
+                continue
+            if key == ENTER:
+                if not recent_pending:
+                    return SelectionOk(cursor + 1)
+                continue
+            if key == "\x1a" or key.lower() == "e":
+                return SelectionExit()
+            if allow_back and (key == ESC or key.lower() == "b"):
+                return SelectionBack()
+            if allow_search and key == "/":
+                return SelectionSearch("")
+            if recent and key.lower() == "r":
+                recent_pending = True
+                digits = ""
+                continue
+            if not key.isdigit():
+                continue
 
-    for idx, label in enumerate(labels, start=1):
-        kind = (types[idx - 1] if types else "")
-        if kind == "group":
-            print(f"{idx}) {Ansi.ORANGE}{label} CLUSTER{Ansi.RESET}")
-        else:
-            print(f"{idx}) {Ansi.GREEN}{label}{Ansi.RESET}")
+            if recent_pending:
+                recent_pending = False
+                if 1 <= int(key) <= len(recent):
+                    return SelectionRecent(int(key))
+                continue
 
-    if message:
-        print(f"\n{Ansi.RED}{message}{Ansi.RESET}")
+            digits += key
+            if not 1 <= int(digits) <= count:
+                digits = key if 1 <= int(key) <= count else ""
+            if not digits:
+                continue
+            cursor = int(digits) - 1
+            # pick immediately once no further digit could name another entry
+            if int(digits) * 10 > count:
+                return SelectionOk(int(digits))
+
+
+# shows a menu and reads a selection, by single keystrokes on a terminal or a typed line otherwise
+def _prompt_menu(
+        title: str,
+        subtitle: str,
+        labels: Sequence[str],
+        *,
+        types: Sequence[str] | None = None,
+        message: str = "",
+        recent: list[str] | None = None,
+        allow_back: bool = False,
+        allow_search: bool = False,
+) -> SelectionResult:
+    recent = recent or []
+    if raw_keys_available() and labels:
+        return _select_with_keys(
+            title, subtitle, labels, types=types, message=message, recent=recent, allow_back=allow_back,
+            allow_search=allow_search,
+        )
+
+    render_menu(title, subtitle, labels, types=types, message=message, recent=recent)
+    print()
+    if allow_back:
+        prompt = f"Enter number ({Ansi.MAGENTA}B{Ansi.RESET} to go back or {Ansi.RED}E{Ansi.RESET} to exit): "
+    else:
+        recent_hint = f", {Ansi.MAGENTA}R#{Ansi.RESET} for recent" if recent else ""
+        recent_hint += f", {Ansi.MAGENTA}/{Ansi.RESET} to search" if allow_search else ""
+        prompt = f"Enter number{recent_hint} (or {Ansi.RED}E{Ansi.RESET} to exit): "
+    return prompt_selection(prompt, max_value=len(labels), allow_back=allow_back, recent_count=len(recent),
+                            allow_search=allow_search)
+
+
+# transport of a selected host row, in the "all" view a host configured for both asks which to use
+def _row_transport(host: str, menu_vars: MenuVars) -> Transport | None:
+    if menu_vars.transport.key != "all":
+        return menu_vars.transport
+    options = menu_vars.host_transports.get(host, [])
+    if len(options) <= 1:
+        return options[0] if options else None
+
+    choices = ", ".join(f"{i}) {_TRANSPORT_COLORS.get(t.key, '')}{t.label}{Ansi.RESET}" for i, t in enumerate(options, start=1))
+    sel = prompt_text(f"{format_host_display(host)} is configured for {choices} [{Ansi.GREEN}1{Ansi.RESET}]: ").strip()
+    if sel == "":
+        return options[0]
+    if sel.isdigit() and 1 <= int(sel) <= len(options):
+        return options[int(sel) - 1]
+    return None
+
+
+def _select_host(host: str, menu_vars: MenuVars, last_msg: list[str], *, on_host_selected: HostAction) -> bool:
+    transport = _row_transport(host, menu_vars)
+    if transport is None:
+        last_msg[0] = "Invalid selection."
+        return False
+    return on_host_selected(host, transport, last_msg_out=last_msg)
+
+
+# the menu's "search by IP": hosts of the menu's configs by address, CIDR range, hostname, port or
+# algorithm, from the same index as the find command; returns True once a host was acted on or on exit
+def _search_hosts(query: str, menu_vars: MenuVars, last_msg: list[str], *, on_host_selected: HostAction) -> bool:
+    # imported here so the direct connect path (which loads this module) doesn't pay for it
+    from .host_index import HostIndex, format_match
+
+    if not query:
+        query = prompt_text(f"Search by {Ansi.MAGENTA}IP{Ansi.RESET}, CIDR range, hostname, port or algorithm: ").strip()
+        if not query:
+            return False
+    transports = concrete_transports() if menu_vars.transport.key == "all" else [menu_vars.transport]
+    matches = HostIndex.open(transports).find(query)
+    if not matches:
+        last_msg[0] = f"No hosts match {query}."
+        return False
+
+    by_key = {t.key: t for t in transports}
+    labels = [format_match(m) for m in matches]
+    subtitle = f"{len(matches)} host(s) matching {Ansi.MAGENTA}{query}{Ansi.RESET}:"
+    while True:
+        msg = last_msg[0]
+        last_msg[0] = ""
+        match _prompt_menu("SEARCH", subtitle, labels, message=msg, allow_back=True):
+            case SelectionExit():
+                clear_screen()
+                return True
+            case SelectionOk(value=n):
+                found = matches[n - 1]
+                if on_host_selected(found.alias, by_key[found.transport], last_msg_out=last_msg):
+                    return True
+            case SelectionBack():
+                return False
+            case _:
+                last_msg[0] = f"Invalid selection, enter a number between 1 and {len(labels)}, B to go back, or E to exit."
 
 
 # main connect menu loop, returns 0 on successful connection or exit
@@ -130,23 +545,21 @@ def main_menu(
     *,
     on_host_selected: HostAction,
     refresh_menu: bool = True,
+    show_recent: bool = False,
 ) -> int:
     while True:
         if refresh_menu:
             if not _refresh_menu(menu_vars):
-                last_msg[0] = f"No hosts found in {menu_vars.transport.config_file}"
+                last_msg[0] = f"No hosts found in {' or '.join(map(str, transport_config_files(menu_vars.transport)))}"
                 clear_screen()
                 return _RC_EXIT
 
+        recent = menu_vars.recent if show_recent else []
         msg = last_msg[0]
         last_msg[0] = ""
-        render_menu(main_title, main_subtitle, menu_vars.labels, types=menu_vars.types, message=msg)
-
-        print()
-        sel = prompt_selection(
-            f"Enter number (or {Ansi.RED}E{Ansi.RESET} to exit): ",
-            max_value=len(menu_vars.labels),
-            allow_back=False,
+        sel = _prompt_menu(
+            main_title, main_subtitle, menu_vars.labels, types=menu_vars.types, message=msg, recent=recent,
+            allow_search=True,
         )
 
         match sel:
@@ -156,51 +569,56 @@ def main_menu(
             case SelectionInvalid() | SelectionBack():
                 last_msg[0] = f"Invalid selection, enter a number between 1 and {len(menu_vars.labels)} or E to exit."
                 continue
+            case SelectionRecent(value=r):
+                if _select_host(recent[r - 1], menu_vars, last_msg, on_host_selected=on_host_selected):
+                    return _RC_EXIT
+                continue
+            case SelectionSearch(query=query):
+                if _search_hosts(query, menu_vars, last_msg, on_host_selected=on_host_selected):
+                    return _RC_EXIT
+                continue
             case SelectionOk(value=n):
                 idx = n - 1
         if menu_vars.types[idx] == "host":
-            if on_host_selected(menu_vars.values[idx], menu_vars.transport, last_msg_out=last_msg):
+            if _select_host(menu_vars.values[idx], menu_vars, last_msg, on_host_selected=on_host_selected):
                 return _RC_EXIT
             continue
-        result = group_menu(last_msg, idx, menu_vars, on_host_selected=on_host_selected)
+        node = menu_vars.tree.root.children.get(menu_vars.values[idx]) if menu_vars.tree else None
+        if node is None:
+            last_msg[0] = f"No hosts in group {menu_vars.values[idx].upper()}"
+            continue
+        result = group_menu(last_msg, node, menu_vars, on_host_selected=on_host_selected)
         if result == _RC_EXIT:
             return _RC_EXIT
 
-# group menu loop, returns 0 on successful connection, 1 to go back to main menu
+# group menu loop for one level of the group tree, returns 0 on successful connection or exit,
+# 1 to go back to the parent menu
 def group_menu(
     last_msg: list[str],
-    idx: int,
+    node: GroupNode,
     menu_vars: MenuVars,
     *,
     on_host_selected: HostAction,
 ) -> int:
-    group = menu_vars.values[idx]
-    group_entries = menu_vars.group_map.get(group, [])
-    if not group_entries:
-        last_msg[0] = f"No hosts in group {group.upper()}"
-        return _RC_EXIT
-
-    group_labels: list[str] = []
-    group_values: list[str] = []
-    for host_item in group_entries:
-        display = host_item.split(GROUP_DELIMITER, 1)[1] if GROUP_DELIMITER in host_item else host_item
-        group_labels.append(display.upper())
-        group_values.append(host_item)
+    if not node.count:
+        last_msg[0] = f"No hosts in group {node.path.upper()}"
+        return _RC_BACK
+
+    # only this level's hosts and subgroups are listed, deeper levels open their own menu
+    hosts = node.sorted_hosts()
+    children = node.sorted_children()
+    group_labels = _MenuLabels(hosts, [child.name for child in children], menu_vars.host_transports,
+                               strip=len(node.path) + 1, ssh_config=_key_config(menu_vars.transport))
+    group_types = _MenuTypes(len(hosts), len(group_labels))
 
     group_title = "GROUP"
-    group_subtitle = f"{Ansi.ORANGE}{group.upper()} CLUSTER{Ansi.RESET} - select {Ansi.GREEN}host{Ansi.RESET}:"
+    group_subtitle = f"{Ansi.ORANGE}{node.path.upper()} CLUSTER{Ansi.RESET} ({node.count} hosts) - select {Ansi.GREEN}host{Ansi.RESET}"
+    group_subtitle += f" or {Ansi.ORANGE}group{Ansi.RESET}:" if children else ":"
 
     while True:
         msg2 = last_msg[0]
         last_msg[0] = ""
-        render_menu(group_title, group_subtitle, group_labels, message=msg2)
-
-        print()
-        sel2 = prompt_selection(
-            f"Enter number ({Ansi.MAGENTA}B{Ansi.RESET} to go back or {Ansi.RED}E{Ansi.RESET} to exit): ",
-            max_value=len(group_labels),
-            allow_back=True,
-        )
+        sel2 = _prompt_menu(group_title, group_subtitle, group_labels, types=group_types, message=msg2, allow_back=True)
 
         match sel2:
             case SelectionExit():
@@ -208,17 +626,21 @@ def group_menu(
                 return _RC_EXIT
             case SelectionBack():
                 return _RC_BACK
-            case SelectionInvalid():
+            case SelectionInvalid() | SelectionRecent() | SelectionSearch():
                 last_msg[0] = (
                     f"Invalid selection, enter a number between 1 and {len(group_labels)}, "
                     "B to go back, or E to exit."
                 )
                 continue
             case SelectionOk(value=n2):
-                chosen_host = group_values[n2 - 1]
-        if on_host_selected(chosen_host, menu_vars.transport, last_msg_out=last_msg):
+                idx = n2 - 1
+        if idx >= len(hosts):
+            if group_menu(last_msg, children[idx - len(hosts)], menu_vars, on_host_selected=on_host_selected) == _RC_EXIT:
+                return _RC_EXIT
+            continue
+        if _select_host(hosts[idx], menu_vars, last_msg, on_host_selected=on_host_selected):
             return _RC_EXIT
-        
+
 
 def add_or_list_menu(
     config_file: Path,
@@ -269,12 +691,14 @@ def show_host_details(
     last_msg_out: list[str],
     edit_host_out: list[str] | None = None,
 ) -> bool:
-    hostname, port, hostkey, kex, macs = read_host_values(host_label, transport.config_file)
+    hostname, port, hostkey, kex, macs, user = read_host_values(host_label, transport.config_file)
 
     clear_screen()
     print("\n---------------------HOST DETAILS---------------------\n")
     print(f"Host: {format_host_display(host_label)}\n\n")
-    format_host_details(hostname, port, hostkey, kex, macs)
+    format_host_details(hostname, port, hostkey, kex, macs, user)
+    if transport.key == "ssh" and hostname:
+        print_host_key_status(hostname, port)
 
     prompt_display = f"\nType {Ansi.GREEN}E{Ansi.RESET} to edit "
     prompt_display += f"or {Ansi.MAGENTA}B{Ansi.RESET} to go back to the previous menu."
@@ -292,18 +716,38 @@ def show_host_details(
     return False
 
 
-def format_host_details(hostname: str, port: str, hostkey: str, kex: str, macs: str) -> None:
+def format_host_details(hostname: str, port: str, hostkey: str, kex: str, macs: str, user: str = "") -> None:
     print(f"  Hostname/IP: {Ansi.MAGENTA}{hostname}{Ansi.RESET}")
-    print(f"  Port: {Ansi.MAGENTA}{port or '<default>'}{Ansi.RESET}\n")
+    print(f"  Port: {Ansi.MAGENTA}{port or '<default>'}{Ansi.RESET}")
+    if user:
+        print(f"  User: {Ansi.MAGENTA}{user}{Ansi.RESET}")
+    print()
     print(format_algo_display(hostkey, 'Host Key Algorithm'))
     print(format_algo_display(kex, 'Key Exchange Algorithms'))
     print(format_algo_display(macs, 'MAC Algorithms'))
     print()
 
 
+_KEY_STATUS_TEXT = {
+    TRUSTED: f"{Ansi.GREEN}trusted{Ansi.RESET} (in known_hosts)",
+    UNKNOWN: f"{Ansi.YELLOW}unknown{Ansi.RESET} (ssh will ask to trust it on first connect)",
+    CHANGED: f"{Ansi.RED}CHANGED{Ansi.RESET} (the host sent a different key than known_hosts has)",
+}
+
+
+# the known_hosts status, then a live check of the key the host sends now when it answers quickly
+def print_host_key_status(hostname: str, port: str) -> None:
+    status = host_key_status(hostname, port)
+    print(f"  Host key: {_KEY_STATUS_TEXT[status]}", end="", flush=True)
+    live = check_live_key(hostname, port)
+    if live is not None and live != status:
+        print(f"\r\033[K  Host key: {_KEY_STATUS_TEXT[live]}", end="")
+    print("\n")
+
+
 def format_host_display(host: str, *, delimiter: str=GROUP_DELIMITER) -> str:
     if delimiter in host:
-        group, member = host.split(GROUP_DELIMITER, 1)
+        group, member = host.rsplit(delimiter, 1)
         return f"{Ansi.ORANGE}{group.upper()}{Ansi.RESET} {Ansi.GREEN}{member.upper()}{Ansi.RESET}"
     return f"{Ansi.GREEN}{host.upper()}{Ansi.RESET}"
 
@@ -5,7 +5,9 @@ from .types import (
     SelectionExit,
     SelectionInvalid,
     SelectionOk,
+    SelectionRecent,
     SelectionResult,
+    SelectionSearch,
 )
 
 
@@ -30,7 +32,8 @@ def prompt_yes_no(prompt: str, *,
 
 def prompt_selection(prompt: str, *,
                      max_value: int, allow_back: bool = False, 
-                     allow_exit: bool = True) -> SelectionResult:
+                     allow_exit: bool = True, recent_count: int = 0,
+                     allow_search: bool = False) -> SelectionResult:
     try:
         sel = input(prompt).strip()
     except EOFError:
@@ -43,6 +46,15 @@ def prompt_selection(prompt: str, *,
         return SelectionExit()
     if allow_back and sel.lower() == "b":
         return SelectionBack()
+    # "/" opens the host search, optionally with the query right after it ("/10.1.2.3")
+    if allow_search and sel.startswith("/"):
+        return SelectionSearch(sel[1:].strip())
+    # recent/frequent entries are picked as R1, R2, ...
+    if recent_count and sel[:1].lower() == "r" and sel[1:].isdigit():
+        n = int(sel[1:])
+        if 1 <= n <= recent_count:
+            return SelectionRecent(n)
+        return SelectionInvalid()
     if sel.isdigit():
         n = int(sel)
         if 1 <= n <= max_value:
@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import time
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+
+from .config_paths import state_dir
+
+
+# a page ends after roughly one block in 256 / _PAGE_BOUNDARY (about 64 hosts per page)
+_PAGE_BOUNDARY = 4
+
+_HOST_START_RE = re.compile(r"^Host", re.MULTILINE)
+
+_HEADER = "# vmsmenu snapshots v1: id<TAB>time<TAB>content-sha256<TAB>manifest<TAB>blocks<TAB>note\n"
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    id: int
+    time: int
+    content_hash: str
+    manifest: str
+    blocks: int
+    note: str
+
+
+def snapshot_dir() -> Path:
+    return state_dir() / "snapshots"
+
+
+# one history log per config file, named after its absolute path
+def _log_path(config_file: Path, root: Path) -> Path:
+    key = hashlib.sha1(str(config_file.expanduser().absolute()).encode("utf-8")).hexdigest()[:16]
+    return root / f"{key}.log"
+
+
+# snapshots hold a config's exact bytes: text comes in decoded with surrogateescape (as the config
+# writers read it), so bytes that aren't UTF-8 are stored and restored as they were
+def _encode(content: str) -> bytes:
+    return content.encode("utf-8", errors="surrogateescape")
+
+
+def _object_path(digest: str, root: Path) -> Path:
+    return root / "objects" / digest[:2] / digest[2:]
+
+
+def _put_object(data: str, root: Path, *, known: set[str] | frozenset[str] = frozenset()) -> str:
+    raw = _encode(data)
+    digest = hashlib.sha256(raw).hexdigest()
+    if digest in known:
+        return digest
+    path = _object_path(digest, root)
+    if path.exists():
+        return digest
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}")
+    tmp.write_bytes(zlib.compress(raw))
+    tmp.replace(path)
+    return digest
+
+
+def _get_object(digest: str, root: Path) -> str:
+    return zlib.decompress(_object_path(digest, root).read_bytes()).decode("utf-8", errors="surrogateescape")
+
+
+# the text before the first Host line, then one chunk per Host block (with its trailing blank lines)
+def split_blocks(content: str) -> list[str]:
+    cuts = [m.start() for m in _HOST_START_RE.finditer(content) if m.start()]
+    return [content[a:b] for a, b in zip([0] + cuts, cuts + [len(content)]) if a != b]
+
+
+# groups blocks into pages that end where a block's Host line hashes low, so inserting or deleting a
+# host only changes the page around it and every other page is shared with the previous version
+def split_pages(blocks: list[str]) -> list[str]:
+    pages: list[str] = []
+    current: list[str] = []
+    for block in blocks:
+        current.append(block)
+        if zlib.crc32(_encode(block[:block.find("\n")])) & 0xFF < _PAGE_BOUNDARY:
+            pages.append("".join(current))
+            current = []
+    if current:
+        pages.append("".join(current))
+    return pages
+
+
+def list_snapshots(config_file: Path, *, root: Path | None = None) -> list[Snapshot]:
+    root = root or snapshot_dir()
+    try:
+        text = _log_path(config_file, root).read_text(encoding="utf-8")
+    except OSError:
+        return []
+
+    snapshots: list[Snapshot] = []
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        parts = line.split("\t", 5)
+        if len(parts) != 6:
+            continue
+        try:
+            snapshots.append(Snapshot(int(parts[0]), int(parts[1]), parts[2], parts[3], int(parts[4]), parts[5]))
+        except ValueError:
+            continue
+    return snapshots
+
+
+def snapshot_pages(snapshot: Snapshot, *, root: Path | None = None) -> list[str]:
+    root = root or snapshot_dir()
+    return [d for d in _get_object(snapshot.manifest, root).split("\n") if d]
+
+
+# (added, removed) host blocks between two versions, only the pages that differ are read
+def block_changes(old: Snapshot | None, new: Snapshot, *, root: Path | None = None) -> tuple[int, int]:
+    root = root or snapshot_dir()
+    old_pages = Counter(snapshot_pages(old, root=root)) if old else Counter()
+    new_pages = Counter(snapshot_pages(new, root=root))
+    old_blocks: Counter[str] = Counter()
+    new_blocks: Counter[str] = Counter()
+    for digest in (old_pages - new_pages).elements():
+        old_blocks.update(split_blocks(_get_object(digest, root)))
+    for digest in (new_pages - old_pages).elements():
+        new_blocks.update(split_blocks(_get_object(digest, root)))
+    return sum((new_blocks - old_blocks).values()), sum((old_blocks - new_blocks).values())
+
+
+def load_snapshot(snapshot: Snapshot, *, root: Path | None = None) -> str:
+    root = root or snapshot_dir()
+    content = "".join(_get_object(d, root) for d in snapshot_pages(snapshot, root=root))
+    if hashlib.sha256(_encode(content)).hexdigest() != snapshot.content_hash:
+        raise OSError(f"snapshot #{snapshot.id} is damaged")
+    return content
+
+
+# page digests for content, the previous version's pages that content still starts and ends with are
+# reused as they are, so only the edited region in between is split into blocks and stored again
+def _paginate(content: str, previous: Snapshot | None, root: Path) -> list[str]:
+    if previous is None:
+        return [_put_object(page, root) for page in split_pages(split_blocks(content))]
+
+    old = snapshot_pages(previous, root=root)
+    texts = [_get_object(d, root) for d in old]
+
+    # a reused page has to end (head) or start (tail) exactly on a block boundary of the new content
+    def _boundary(at: int) -> bool:
+        return at in (0, len(content)) or (content[at - 1] == "\n" and content.startswith("Host", at))
+
+    head, pos = 0, 0
+    while head < len(old) and content.startswith(texts[head], pos) and _boundary(pos + len(texts[head])):
+        pos += len(texts[head])
+        head += 1
+    tail, end = len(old), len(content)
+    while tail > head:
+        start = end - len(texts[tail - 1])
+        if start < pos or not content.startswith(texts[tail - 1], start) or not _boundary(start):
+            break
+        end = start
+        tail -= 1
+
+    known = set(old)
+    middle = [_put_object(page, root, known=known) for page in split_pages(split_blocks(content[pos:end]))]
+    return old[:head] + middle + old[tail:]
+
+
+# adds content as a new version unless it matches the latest one
+def record_snapshot(config_file: Path, content: str, *, note: str = "",
+                    now: float | None = None, root: Path | None = None) -> Snapshot | None:
+    root = root or snapshot_dir()
+    content_hash = hashlib.sha256(_encode(content)).hexdigest()
+    history = list_snapshots(config_file, root=root)
+    if history and history[-1].content_hash == content_hash:
+        return None
+
+    pages = _paginate(content, history[-1] if history else None, root)
+    manifest = _put_object("\n".join(pages), root)
+    snapshot = Snapshot(
+        id=history[-1].id + 1 if history else 1,
+        time=int(time.time() if now is None else now),
+        content_hash=content_hash,
+        manifest=manifest,
+        blocks=content.count("\nHost") + 1 if content else 0,
+        note=note.replace("\t", " ").replace("\n", " "),
+    )
+
+    log_path = _log_path(config_file, root)
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    with log_path.open("a", encoding="utf-8", newline="\n") as f:
+        if not history:
+            f.write(_HEADER)
+            f.write(f"# config {config_file.expanduser().absolute()}\n")
+        f.write(f"{snapshot.id}\t{snapshot.time}\t{snapshot.content_hash}\t{snapshot.manifest}\t"
+                f"{snapshot.blocks}\t{snapshot.note}\n")
+    return snapshot
+
+
+# keeps the state before a write restorable, including hand edits made since the last snapshot
+def record_baseline(config_file: Path, *, content: str | None = None,
+                    root: Path | None = None) -> Snapshot | None:
+    if content is None:
+        try:
+            content = config_file.read_bytes().decode("utf-8", errors="surrogateescape")
+        except OSError:
+            return None
+    note = "edited outside addhost" if list_snapshots(config_file, root=root) else "first snapshot"
+    return record_snapshot(config_file, content, note=note, root=root)
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+from .ansi import Ansi
+
+
+# import-time budget per entry point (cumulative ms reported by `python -X importtime`)
+STARTUP_BUDGET_MS: dict[str, float] = {
+    "help": 15.0,
+    "vmsmenu": 150.0,
+    "direct": 150.0,
+    "addhost": 150.0,
+}
+
+# module each subcommand imports before doing any work
+_ENTRY_MODULES: dict[str, str] = {
+    "help": "pylib.__main__",
+    "vmsmenu": "pylib.vmsmenu_app",
+    "direct": "pylib.direct_connect",
+    "addhost": "pylib.addhost_app",
+}
+
+
+@dataclass(frozen=True)
+class ImportTiming:
+    module: str
+    self_us: int
+    cumulative_us: int
+
+
+def _parse_importtime(stderr: str) -> list[ImportTiming]:
+    timings: list[ImportTiming] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        timings.append(ImportTiming(parts[2].strip(), int(parts[0]), int(parts[1])))
+    return timings
+
+
+def measure_imports(module: str) -> list[ImportTiming]:
+    env = dict(os.environ)
+    pkg_parent = str(Path(__file__).resolve().parent.parent)
+    env["PYTHONPATH"] = pkg_parent + (os.pathsep + env["PYTHONPATH"] if env.get("PYTHONPATH") else "")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    return _parse_importtime(result.stderr)
+
+
+def run_startup_report(args: list[str]) -> int:
+    top = 5
+    if "--top" in args:
+        idx = args.index("--top")
+        if idx + 1 < len(args) and args[idx + 1].isdigit():
+            top = int(args[idx + 1])
+
+    over_budget = False
+    print(f"{'entry':<10}{'module':<24}{'import ms':>10}{'budget ms':>11}")
+    for entry, module in _ENTRY_MODULES.items():
+        timings = measure_imports(module)
+        total = next((t.cumulative_us for t in reversed(timings) if t.module == module), 0) / 1000
+        budget = STARTUP_BUDGET_MS[entry]
+        status = f"{Ansi.GREEN}ok{Ansi.RESET}" if total <= budget else f"{Ansi.RED}OVER{Ansi.RESET}"
+        over_budget = over_budget or total > budget
+        print(f"{entry:<10}{module:<24}{total:>10.1f}{budget:>11.1f}  {status}")
+
+        for t in sorted(timings, key=lambda t: t.self_us, reverse=True)[:top]:
+            print(f"    {t.self_us / 1000:>8.1f} ms self  {t.module}")
+
+    return 1 if over_budget else 0
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import json
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+
+from .ansi import Ansi
+from .tracing import TRACE_ENV, trace_file
+
+
+TRACE_SUMMARY_USAGE = "Usage: trace-summary [--last N] [--clear] [trace-file]"
+
+# stages in the order a connection goes through them
+_STAGES = ("command", "parse", "render", "resolve", "probe", "spawn")
+
+
+@dataclass
+class _Event:
+    name: str
+    cat: str
+    pid: int
+    tid: int
+    ts: int
+    dur: int
+    self_us: int = 0
+
+
+def read_events(path: Path) -> tuple[list[_Event], dict[int, str]]:
+    events: list[_Event] = []
+    processes: dict[int, str] = {}
+    with path.open(encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.strip().rstrip(",")
+            if not line or line in ("[", "]"):
+                continue
+            try:
+                raw = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by a process that was killed mid-write
+            if raw.get("ph") == "M" and raw.get("name") == "process_name":
+                processes[raw.get("pid", 0)] = raw.get("args", {}).get("name", "")
+            elif raw.get("ph") == "X":
+                events.append(_Event(raw.get("name", "?"), raw.get("cat", ""), raw.get("pid", 0),
+                                     raw.get("tid", 0), int(raw.get("ts", 0)), int(raw.get("dur", 0))))
+    return events, processes
+
+
+# time spent in a span minus its child spans on the same thread, so the stages add up to the wall time
+def _self_times(events: list[_Event]) -> None:
+    by_thread: dict[tuple[int, int], list[_Event]] = defaultdict(list)
+    for event in events:
+        event.self_us = event.dur
+        by_thread[event.pid, event.tid].append(event)
+    for thread_events in by_thread.values():
+        stack: list[_Event] = []
+        for event in sorted(thread_events, key=lambda e: (e.ts, -e.dur)):
+            while stack and stack[-1].ts + stack[-1].dur <= event.ts:
+                stack.pop()
+            if stack:
+                stack[-1].self_us = max(0, stack[-1].self_us - event.dur)
+            stack.append(event)
+
+
+def _percentile(values: list[int], fraction: float) -> int:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run_trace_summary(args: list[str]) -> int:
+    path: Path | None = None
+    last = 0
+    clear = False
+    it = iter(args)
+    try:
+        for arg in it:
+            if arg == "--last":
+                last = max(1, int(next(it)))
+            elif arg == "--clear":
+                clear = True
+            elif arg.startswith("-"):
+                raise ValueError(arg)
+            else:
+                path = Path(arg).expanduser()
+    except (StopIteration, ValueError):
+        print(TRACE_SUMMARY_USAGE)
+        return 2
+
+    path = path or trace_file()
+    if clear:
+        path.unlink(missing_ok=True)
+        print(f"Removed {path}.")
+        return 0
+    try:
+        events, processes = read_events(path)
+    except OSError:
+        print(f"No trace at {path}. Run with {TRACE_ENV}=1 (or {TRACE_ENV}=<file>) to record one.")
+        return 1
+
+    # runs are told apart by process id, in the order they first wrote to the file
+    pids = list(dict.fromkeys([*processes, *(e.pid for e in events)]))
+    if last:
+        keep = set(pids[-last:])
+        events = [e for e in events if e.pid in keep]
+        pids = [p for p in pids if p in keep]
+    if not events:
+        print(f"No spans in {path}.")
+        return 1
+    _self_times(events)
+
+    print(f"Trace {Ansi.MAGENTA}{path}{Ansi.RESET}: {len(events)} span(s) from {len(pids)} run(s)")
+    for pid in pids[-5:]:
+        print(f"  {pid}: {processes.get(pid, '?')}")
+    if len(pids) > 5:
+        print(f"  ... and {len(pids) - 5} earlier run(s), --last N limits the summary")
+
+    stage_self: dict[str, int] = defaultdict(int)
+    stage_count: dict[str, int] = defaultdict(int)
+    for event in events:
+        stage_self[event.cat] += event.self_us
+        stage_count[event.cat] += 1
+    total = sum(stage_self.values()) or 1
+    print()
+    print(f"{'stage':<10}{'spans':>8}{'self ms':>12}{'share':>8}")
+    for cat in sorted(stage_self, key=lambda c: (_STAGES.index(c) if c in _STAGES else len(_STAGES), c)):
+        print(f"{cat or '-':<10}{stage_count[cat]:>8}{stage_self[cat] / 1000:>12.1f}{stage_self[cat] / total:>8.0%}")
+    if "command" in stage_self:
+        print("(command is the time outside the other stages: imports, prompts, the menu waiting for a key)")
+
+    by_name: dict[tuple[str, str], list[_Event]] = defaultdict(list)
+    for event in events:
+        by_name[event.cat, event.name].append(event)
+    print()
+    print(f"{'span':<32}{'stage':<9}{'count':>6}{'mean ms':>10}{'p95 ms':>10}{'max ms':>10}{'self ms':>10}")
+    for (cat, name), group in sorted(by_name.items(), key=lambda kv: -sum(e.self_us for e in kv[1])):
+        durs = [e.dur for e in group]
+        print(f"{name[:31]:<32}{cat:<9}{len(group):>6}{sum(durs) / len(durs) / 1000:>10.2f}"
+              f"{_percentile(durs, 0.95) / 1000:>10.2f}{max(durs) / 1000:>10.2f}"
+              f"{sum(e.self_us for e in group) / 1000:>10.1f}")
+    return 0
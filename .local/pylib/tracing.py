@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import functools
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, TypeVar
+
+from .config_paths import state_dir
+
+
+# set VMSMENU_TRACE=1 (or to a file path) to record spans; unset (or 0/false), tracing costs a flag check
+# per span and nothing at all for decorated functions, which are left unwrapped
+TRACE_ENV = "VMSMENU_TRACE"
+
+_OFF_VALUES = ("", "0", "false", "no", "off")
+
+_F = TypeVar("_F", bound=Callable[..., Any])
+
+
+# the file spans go to: the variable's value when it names a file, the state directory's trace.json otherwise
+def trace_file() -> Path:
+    value = os.environ.get(TRACE_ENV, "").strip()
+    if value.lower() not in _OFF_VALUES + ("1", "true", "yes", "on"):
+        return Path(value).expanduser()
+    return state_dir() / "trace.json"
+
+
+enabled = os.environ.get(TRACE_ENV, "").strip().lower() not in _OFF_VALUES
+
+_fd: int | None = None
+_lock = threading.Lock()
+
+
+# events go out as Chrome trace-event JSON (an array whose closing bracket may be left off, so every
+# process can just append), one event per line for trace-summary
+def _emit(event: dict) -> None:
+    global _fd
+    import json
+
+    line = (json.dumps(event, separators=(",", ":")) + ",\n").encode("utf-8")
+    with _lock:
+        if _fd is None:
+            path = trace_file()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            _fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            head = b"[\n" if os.fstat(_fd).st_size == 0 else b""
+            prog = Path(sys.argv[0]).name
+            name = " ".join(["pylib" if prog == "__main__.py" else prog, *sys.argv[1:]])
+            meta = {"name": "process_name", "ph": "M", "pid": os.getpid(), "args": {"name": name}}
+            os.write(_fd, head + (json.dumps(meta) + ",\n").encode("utf-8"))
+        os.write(_fd, line)
+
+
+class _Span:
+    """A timed region, written out as one complete ("X") event when it ends."""
+
+    __slots__ = ("name", "cat", "args", "start_us", "started")
+
+    def __init__(self, name: str, cat: str, args: dict) -> None:
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    # extra details known only inside the span (an exit code, a count)
+    def set(self, **args: Any) -> None:
+        self.args.update(args)
+
+    def __enter__(self) -> _Span:
+        self.start_us = time.time_ns() // 1000
+        self.started = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        event = {
+            "name": self.name,
+            "cat": self.cat,
+            "ph": "X",
+            "ts": self.start_us,
+            "dur": (time.perf_counter_ns() - self.started) // 1000,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        if self.args:
+            event["args"] = self.args
+        try:
+            _emit(event)
+        except OSError:
+            pass
+
+
+class _NullSpan:
+    """Stands in for a span while tracing is off."""
+
+    __slots__ = ()
+
+    def set(self, **args: Any) -> None:
+        pass
+
+    def __enter__(self) -> _NullSpan:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+# cat is the stage the time is reported under by trace-summary: parse, render, resolve, probe, spawn, command
+def span(name: str, cat: str, **args: Any) -> _Span | _NullSpan:
+    if not enabled:
+        return _NULL_SPAN
+    return _Span(name, cat, args)
+
+
+def traced(name: str, cat: str) -> Callable[[_F], _F]:
+    def decorate(func: _F) -> _F:
+        if not enabled:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with _Span(name, cat, {}):
+                return func(*args, **kwargs)
+        return wrapper  # type: ignore[return-value]
+    return decorate
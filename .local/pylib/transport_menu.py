@@ -1,18 +1,21 @@
 from __future__ import annotations
 
 from .ansi import Ansi, clear_screen
-from .config_paths import ensure_config_file, ssh_config, telnet_config
+from .config_paths import all_config, concrete_transports, ensure_config_file, ssh_config, telnet_config
 from .prompting import prompt_text
 from .types import Transport
 
 
-# prompt user to select transport method (ssh/telnet), returns Transport or None if cancelled
-def select_transport() -> Transport | None:
+# prompt user to select transport method (ssh/telnet, or both when allow_all), returns Transport or None if cancelled
+def select_transport(*, allow_all: bool = False) -> Transport | None:
     while True:
         clear_screen()
         print("\n------------SELECT CONNECTION METHOD------------\n")
         print(f"1) {Ansi.GREEN}SSH{Ansi.RESET} (default)")
-        print(f"2) {Ansi.YELLOW}Telnet{Ansi.RESET}\n")
+        print(f"2) {Ansi.YELLOW}Telnet{Ansi.RESET}")
+        if allow_all:
+            print(f"3) {Ansi.MAGENTA}All{Ansi.RESET} ({Ansi.GREEN}SSH{Ansi.RESET} and {Ansi.YELLOW}Telnet{Ansi.RESET} hosts together)")
+        print()
         sel = prompt_text(
             f"Enter number (or {Ansi.RED}E{Ansi.RESET} to exit) [{Ansi.GREEN}1{Ansi.RESET}]: "
         ).strip()
@@ -24,6 +27,10 @@ def select_transport() -> Transport | None:
             cfg = telnet_config()
             ensure_config_file(cfg.config_file)
             return cfg
+        if sel == "3" and allow_all:
+            for cfg in concrete_transports():
+                ensure_config_file(cfg.config_file)
+            return all_config()
         if sel.lower() == "e":
             return None
         print(f"{Ansi.RED}Invalid selection.{Ansi.RESET}")
@@ -1,8 +1,8 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Generic, Literal, Protocol, TypeAlias, TypeVar
+from typing import Generic, Iterator, Literal, Mapping, Protocol, Sequence, TypeAlias, TypeVar
 
 
 # ---- config-related types ----
@@ -11,10 +11,10 @@ from typing import Generic, Literal, Protocol, TypeAlias, TypeVar
 class Transport:
     key: str
     label: str
-    config_file: Path
+    config_file: Path | None  # None only for the merged "all" view, which has no file of its own
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class HostEntry:
     alias: str
     hostname: str
@@ -22,6 +22,15 @@ class HostEntry:
     hostkey_algorithms: str = ""
     kex_algorithms: str = ""
     macs: str = ""
+    user: str = ""  # ssh login user, connects without asking when set
+
+
+@dataclass(frozen=True)
+class ConnectRequest:
+    query: str
+    transport_key: str = ""  # "ssh", "telnet" or "" to try both
+    user: str = ""
+    wait: bool = False  # poll until the host is up instead of failing after one attempt
 
 
 @dataclass(frozen=True)
@@ -31,22 +40,111 @@ class NormalizeResult:
     error: str = ""
 
 
+@dataclass(eq=False, slots=True)
+class GroupNode:
+    """One level of the group hierarchy (e.g. `site` or `site.cluster`), children and hosts sort lazily."""
+
+    name: str = ""
+    path: str = ""
+    children: dict[str, GroupNode] = field(default_factory=dict)
+    hosts: list[str] = field(default_factory=list)  # aliases directly in this group
+    count: int = 0  # hosts in this group and every group below it
+    _sorted_children: list[GroupNode] | None = field(default=None, repr=False)
+    _hosts_sorted: bool = field(default=False, repr=False)
+    _all_hosts: list[str] | None = field(default=None, repr=False)
+
+    def sorted_children(self) -> list[GroupNode]:
+        if self._sorted_children is None:
+            self._sorted_children = sorted(self.children.values(), key=lambda c: c.name)
+        return self._sorted_children
+
+    # aliases directly in this group, sorted in place the first time they are needed
+    def sorted_hosts(self) -> list[str]:
+        if not self._hosts_sorted:
+            self.hosts.sort(key=str.casefold)
+            self._hosts_sorted = True
+        return self.hosts
+
+    # the alias without this group's path (site.cluster.NODE -> NODE in site.cluster)
+    def leaf(self, alias: str) -> str:
+        return alias[len(self.path) + 1:] if self.path else alias
+
+    # every alias in this group and below it, sorted
+    def all_hosts(self) -> list[str]:
+        if self._all_hosts is None:
+            found: list[str] = []
+            stack = [self]
+            while stack:
+                node = stack.pop()
+                found.extend(node.hosts)
+                stack.extend(node.children.values())
+            self._all_hosts = sorted(found, key=str.casefold)
+        return self._all_hosts
+
+
+class AliasIndex(Mapping[str, list[str]]):
+    """Upper-cased key -> aliases, a key with a single alias (nearly all of them) stores the bare string."""
+
+    __slots__ = ("_one", "_many")
+
+    def __init__(self) -> None:
+        self._one: dict[str, str] = {}
+        self._many: dict[str, list[str]] = {}
+
+    def add(self, key: str, alias: str) -> None:
+        many = self._many.get(key)
+        if many is not None:
+            many.append(alias)
+        elif key in self._one:
+            self._many[key] = [self._one.pop(key), alias]
+        else:
+            self._one[key] = alias
+
+    def __getitem__(self, key: str) -> list[str]:
+        alias = self._one.get(key)
+        if alias is not None:
+            return [alias]
+        return self._many[key]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._one or key in self._many
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._one
+        yield from self._many
+
+    def __len__(self) -> int:
+        return len(self._one) + len(self._many)
+
+
+@dataclass(eq=False)
+class HostTree:
+    root: GroupNode
+    by_alias: AliasIndex  # upper-cased alias -> aliases
+    by_leaf: AliasIndex  # upper-cased nickname (last segment) -> aliases
+
+
 @dataclass(frozen=True)
 class CategorizedHosts:
     main_hosts: list[str]
-    group_map: dict[str, list[str]]
+    group_map: Mapping[str, list[str]]
     group_names: list[str]
+    tree: HostTree | None = None
 
 
 @dataclass
 class MenuVars:
     main_hosts: list[str]
-    group_map: dict[str, list[str]]
+    group_map: Mapping[str, list[str]]
     group_names: list[str]
-    labels: list[str]
-    types: list[str]
+    labels: Sequence[str]
+    types: Sequence[str]
     values: list[str]
     transport: Transport
+    config_version: tuple[int, int] | None = None
+    recent: list[str] = field(default_factory=list)
+    tree: HostTree | None = None
+    host_transports: dict[str, list[Transport]] = field(default_factory=dict)  # only for the "all" view
 
 
 # ---- menu callback types ----
@@ -85,6 +183,12 @@ class SelectionOk:
     status: Literal["ok"] = "ok"
 
 
+@dataclass(frozen=True)
+class SelectionRecent:
+    value: int
+    status: Literal["recent"] = "recent"
+
+
 @dataclass(frozen=True)
 class SelectionBack:
     status: Literal["back"] = "back"
@@ -100,7 +204,15 @@ class SelectionInvalid:
     status: Literal["invalid"] = "invalid"
 
 
-SelectionResult: TypeAlias = SelectionOk | SelectionBack | SelectionExit | SelectionInvalid
+@dataclass(frozen=True)
+class SelectionSearch:
+    query: str  # typed after the "/", empty to ask for it
+    status: Literal["search"] = "search"
+
+
+SelectionResult: TypeAlias = (
+    SelectionOk | SelectionRecent | SelectionBack | SelectionExit | SelectionInvalid | SelectionSearch
+)
 
 
 @dataclass(frozen=True)
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import heapq
+import math
+import time
+from pathlib import Path
+
+from .config_paths import usage_file, users_file
+from .config_utils import atomic_write_text
+
+
+# a connection counts half as much after this long
+_HALF_LIFE_SECONDS = 7 * 24 * 60 * 60
+_DECAY = math.log(2) / _HALF_LIFE_SECONDS
+
+# oldest/lowest scoring entries are dropped past this size
+_MAX_ENTRIES = 500
+
+_HEADER = "# vmsmenu usage v1: transport<TAB>alias<TAB>log-score<TAB>last-used\n"
+_USERS_HEADER = "# vmsmenu login users v1: alias<TAB>user, * is the last user typed for any host\n"
+
+# (transport key, alias) -> (log score, last used epoch seconds)
+UsageTable = dict[tuple[str, str], tuple[float, int]]
+
+
+# the score is stored as log(sum(exp(decay * t_i))) over every connection time t_i,
+# which ranks hosts exactly like a decaying sum but never needs to be re-aged
+def _bump(log_score: float, now: float) -> float:
+    hit = _DECAY * now
+    if log_score == -math.inf:
+        return hit
+    hi, lo = max(log_score, hit), min(log_score, hit)
+    return hi + math.log1p(math.exp(lo - hi))
+
+
+def load_usage(path: Path | None = None) -> UsageTable:
+    path = path or usage_file()
+    table: UsageTable = {}
+    try:
+        text = path.read_text(encoding="utf-8", errors="replace")
+    except OSError:
+        return table
+
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        parts = line.split("\t")
+        if len(parts) != 4:
+            continue
+        try:
+            table[(parts[0], parts[1])] = (float(parts[2]), int(parts[3]))
+        except ValueError:
+            continue
+    return table
+
+
+def save_usage(table: UsageTable, path: Path | None = None) -> None:
+    path = path or usage_file()
+    items = table.items()
+    if len(table) > _MAX_ENTRIES:
+        items = heapq.nlargest(_MAX_ENTRIES, items, key=lambda item: item[1][0])
+
+    lines = [_HEADER]
+    for (transport_key, alias), (log_score, last_used) in items:
+        lines.append(f"{transport_key}\t{alias}\t{log_score:.6f}\t{last_used}\n")
+    atomic_write_text(path, "".join(lines))
+
+
+def record_connection(transport_key: str, alias: str, *,
+                      now: float | None = None, path: Path | None = None) -> None:
+    now = time.time() if now is None else now
+    table = load_usage(path)
+    log_score, _ = table.get((transport_key, alias), (-math.inf, 0))
+    table[(transport_key, alias)] = (_bump(log_score, now), int(now))
+    save_usage(table, path)
+
+
+# top hosts for a transport ("all" for every transport) by frecency, limited to aliases
+# that still exist in the config
+def top_hosts(transport_key: str, known_aliases: set[str], *,
+              limit: int = 9, table: UsageTable | None = None) -> list[str]:
+    table = load_usage() if table is None else table
+    best: dict[str, float] = {}
+    for (key, alias), (log_score, _) in table.items():
+        if (key == transport_key or transport_key == "all") and alias in known_aliases:
+            best[alias] = max(log_score, best.get(alias, log_score))
+    return heapq.nlargest(limit, best, key=best.__getitem__)
+
+
+def load_users(path: Path | None = None) -> dict[str, str]:
+    path = path or users_file()
+    users: dict[str, str] = {}
+    try:
+        text = path.read_text(encoding="utf-8", errors="replace")
+    except OSError:
+        return users
+    for line in text.splitlines():
+        parts = line.split("\t")
+        if len(parts) == 2 and not line.startswith("#"):
+            users[parts[0]] = parts[1]
+    return users
+
+
+# the login user last typed for alias, or for any host when it has never been connected to
+def last_user(alias: str, *, path: Path | None = None) -> str:
+    users = load_users(path)
+    return users.get(alias) or users.get("*", "")
+
+
+def remember_user(alias: str, user: str, *, path: Path | None = None) -> None:
+    users = load_users(path)
+    if users.get(alias) == user and users.get("*") == user:
+        return
+    # most recent last, so trimming drops the hosts not connected to for the longest
+    users.pop(alias, None)
+    users.pop("*", None)
+    users[alias] = user
+    users["*"] = user
+    if len(users) > _MAX_ENTRIES:
+        users = dict(list(users.items())[-_MAX_ENTRIES:])
+    atomic_write_text(path or users_file(), _USERS_HEADER + "".join(f"{a}\t{u}\n" for a, u in users.items()))
@@ -9,7 +9,7 @@ from .menu_utils import main_menu
 def run_vmsmenu() -> int:
     last_msg = [""]
 
-    menu_vars = setup_menu()
+    menu_vars = setup_menu(allow_all=True)
     if menu_vars is None:
         return 0
 
@@ -26,5 +26,6 @@ def run_vmsmenu() -> int:
         menu_vars,
         on_host_selected=attempt_connection,
         refresh_menu=False,
+        show_recent=True,
     )
     return rc